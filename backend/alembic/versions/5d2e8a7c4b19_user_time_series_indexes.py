@@ -0,0 +1,32 @@
+"""user_time_series_indexes
+
+Revision ID: 5d2e8a7c4b19
+Revises: c1f3b109a2f1
+Create Date: 2026-10-18 14:03:27.118540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8a7c4b19'
+down_revision: Union[str, Sequence[str], None] = 'c1f3b109a2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # sleep_records and activity_records are already covered by their
+    # unique (user_id, date) indexes
+    op.create_index('ix_vital_records_user_recorded_at', 'vital_records', ['user_id', 'recorded_at'], unique=False)
+    op.create_index('ix_body_measurements_user_measured_at', 'body_measurements', ['user_id', 'measured_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_body_measurements_user_measured_at', table_name='body_measurements')
+    op.drop_index('ix_vital_records_user_recorded_at', table_name='vital_records')
@@ -0,0 +1,38 @@
+"""unique_user_date_sleep_activity
+
+Revision ID: c1f3b109a2f1
+Revises: 4fd1a263f6fd
+Create Date: 2026-10-18 09:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f3b109a2f1'
+down_revision: Union[str, Sequence[str], None] = '4fd1a263f6fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Older imports could store the same day twice; keep the first row so the
+    # unique index can be built
+    for table in ('sleep_records', 'activity_records'):
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY user_id, date)"
+        )
+
+    op.create_index('uq_sleep_records_user_date', 'sleep_records', ['user_id', 'date'], unique=True)
+    op.create_index('uq_activity_records_user_date', 'activity_records', ['user_id', 'date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_activity_records_user_date', table_name='activity_records')
+    op.drop_index('uq_sleep_records_user_date', table_name='sleep_records')
@@ -32,6 +32,24 @@ class Settings:
     APP_NAME: str = os.getenv("APP_NAME", "MediCareAI")
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
     
+    # Health Data Import
+    HEALTH_IMPORT_WORKERS: int = int(os.getenv("HEALTH_IMPORT_WORKERS", "2"))
+    # Processes used to parse one large export (1 disables parallel parsing)
+    HEALTH_IMPORT_PROCESSES: int = int(os.getenv("HEALTH_IMPORT_PROCESSES", str(os.cpu_count() or 1)))
+    # Days of raw vital samples to keep once they are rolled up (0 keeps them forever)
+    VITAL_RAW_RETENTION_DAYS: int = int(os.getenv("VITAL_RAW_RETENTION_DAYS", "0"))
+    # Per-user dashboard summary cache lifetime; writes invalidate it sooner (0 disables)
+    DASHBOARD_CACHE_TTL_SECONDS: int = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+
+    # Account / health data erasure jobs
+    ERASURE_WORKERS: int = int(os.getenv("ERASURE_WORKERS", "1"))
+    # Rows, points or files deleted per short transaction / request
+    ERASURE_BATCH_SIZE: int = int(os.getenv("ERASURE_BATCH_SIZE", "500"))
+    # Pause between batches so API writers get the database in between
+    ERASURE_BATCH_PAUSE_MS: int = int(os.getenv("ERASURE_BATCH_PAUSE_MS", "20"))
+    # How long an erasure waits for the user's running health import to finish
+    ERASURE_IMPORT_WAIT_SECONDS: int = int(os.getenv("ERASURE_IMPORT_WAIT_SECONDS", "900"))
+    
     # Email Configuration (Gmail SMTP)
     SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
@@ -15,6 +15,9 @@ from app.modules.doctors.router import router as doctors_router
 from app.modules.admin.router import router as admin_router
 from app.modules.reviews.router import router as reviews_router
 from app.modules.notifications.router import router as notifications_router
+from app.modules.privacy.router import router as privacy_router
+from app.modules.dashboard.import_jobs import import_job_runner
+from app.modules.privacy.erasure import erasure_job_runner
 from app.services.rag_service import rag_service
 
 # Import all models to ensure they are registered with Base
@@ -28,6 +31,7 @@ from app.modules.voice_agent import models as voice_agent_models
 from app.modules.dashboard import models as dashboard_models
 from app.modules.doctors import models as doctors_models
 from app.modules.reviews import models as reviews_models
+from app.modules.privacy import models as privacy_models
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -41,6 +45,9 @@ async def startup_event():
         rag_service.initialize_collection()
     except Exception as e:
         print(f"Failed to initialize RAG service: {e}")
+    # Imports and erasures interrupted by a restart are picked up again
+    import_job_runner.resume_pending()
+    erasure_job_runner.resume_pending()
 
 # CORS Configuration
 origins = [
@@ -74,6 +81,7 @@ app.include_router(doctors_router, prefix="/api/doctors", tags=["Doctors"])
 app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 app.include_router(reviews_router, prefix="/api/reviews", tags=["Reviews"])
 app.include_router(notifications_router, prefix="/api/notifications", tags=["Notifications"])
+app.include_router(privacy_router, prefix="/api/privacy", tags=["Privacy"])
 
 # Mount static files
 from fastapi.staticfiles import StaticFiles
@@ -6,5 +6,5 @@ from app.modules.medications.models import Medication
 from app.modules.appointments.models import Appointment, DoctorSchedule
 from app.modules.voice_agent.models import VoiceSession
 from app.modules.dashboard.models import (
-    HealthProfile, SleepRecord, ActivityRecord, VitalRecord, BodyMeasurement
+    HealthProfile, SleepRecord, ActivityRecord, VitalRecord, VitalRollup, BodyMeasurement
 )
@@ -6,6 +6,7 @@ from app.modules.appointments import schemas
 from app.modules.appointments.models import Appointment
 from app.modules.appointments import service
 from app.modules.doctors.models import Doctor
+from app.modules.privacy.erasure import erasure_pending
 from app.modules.auth.models import User
 from typing import List
 from datetime import date, time as time_type
@@ -32,6 +33,8 @@ def book_appointment(
     db: Session = Depends(get_db)
 ):
     """Book an appointment (patient endpoint)"""
+    if erasure_pending(db, current_user.id, scopes=("account",)):
+        raise HTTPException(status_code=409, detail="Your account is being erased")
     # Use current_user directly
     user = current_user
     
@@ -0,0 +1,225 @@
+"""
+Background Apple Health import jobs.
+
+/api/health/upload saves the export to disk and returns a job id straight away;
+a small worker pool then runs the parse / insert / RAG indexing stages of
+DashboardService.import_health_file. Stage changes are persisted on
+HealthImportJob. Row counters for jobs running in this process are kept in
+memory, so progress reads never contend with the import's write transaction.
+Jobs cut off by a restart are picked up again at startup (resume_pending).
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.modules.dashboard import models
+from app.modules.dashboard.service import dashboard_service
+from app.modules.privacy.erasure import erasure_pending
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobRunner:
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="health-import")
+        # Live counters for jobs running in this process: {job_id: {...}}
+        self._live: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, db: Session, user_id: int, file_path: str, filename: str,
+               full_reimport: bool = False) -> models.HealthImportJob:
+        """Record a queued job for a saved export and hand it to the worker pool"""
+        job = models.HealthImportJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            full_reimport=full_reimport,
+            stage="queued",
+            records_processed=0,
+            records_skipped=0,
+            rows_written=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        self.executor.submit(self._run, job.id)
+        logger.info(f"Queued health import job {job.id} for user {user_id}")
+        return job
+
+    def resume_pending(self) -> int:
+        """
+        Deal with jobs a restart left queued or running (run at startup): re-queue
+        those whose saved upload is still on disk and fail the rest. Importing a
+        file again is safe, since rows are upserted and watermarks only move forward.
+        Returns the number of jobs re-queued.
+        """
+        db = SessionLocal()
+        try:
+            jobs = db.query(models.HealthImportJob).filter(
+                models.HealthImportJob.stage.notin_(("completed", "failed"))
+            ).all()
+            requeued = []
+            for job in jobs:
+                if job.file_path and os.path.exists(job.file_path):
+                    job.stage = "queued"
+                    job.records_processed = job.records_skipped = job.rows_written = 0
+                    job.started_at = None
+                    requeued.append(job.id)
+                else:
+                    job.stage = "failed"
+                    job.error = "Interrupted by a restart and the upload is gone; upload the export again"
+                    job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+        for job_id in requeued:
+            self.executor.submit(self._run, job_id)
+        if jobs:
+            logger.info(f"Re-queued {len(requeued)} and failed {len(jobs) - len(requeued)} interrupted health import jobs")
+        return len(requeued)
+
+    def get_job(self, db: Session, job_id: str, user_id: int) -> Optional[models.HealthImportJob]:
+        return db.query(models.HealthImportJob).filter(
+            models.HealthImportJob.id == job_id,
+            models.HealthImportJob.user_id == user_id
+        ).first()
+
+    def describe(self, job: models.HealthImportJob) -> Dict:
+        """Job status with live counters and throughput"""
+        with self._lock:
+            live = dict(self._live.get(job.id) or {})
+
+        stage = live.get("stage", job.stage)
+        records_processed = live.get("records_processed", job.records_processed or 0)
+        records_skipped = live.get("records_skipped", job.records_skipped or 0)
+        rows_written = live.get("rows_written", job.rows_written or 0)
+
+        if live:
+            elapsed = time.monotonic() - live["started"]
+        elif job.started_at:
+            elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+        else:
+            elapsed = None
+
+        return {
+            "job_id": job.id,
+            "filename": job.filename,
+            "stage": stage,
+            "records_processed": records_processed,
+            "records_skipped": records_skipped,
+            "rows_written": rows_written,
+            "elapsed_seconds": round(elapsed, 2) if elapsed is not None else None,
+            "records_per_second": round(records_processed / elapsed, 1) if elapsed else None,
+            "summary": json.loads(job.summary) if job.summary else None,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+
+    def _persist(self, job_id: str, **fields):
+        """Write job fields in their own short transaction"""
+        db = SessionLocal()
+        try:
+            db.query(models.HealthImportJob).filter(models.HealthImportJob.id == job_id).update(fields)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self, job_id: str):
+        db = SessionLocal()
+        job = db.query(models.HealthImportJob).filter(models.HealthImportJob.id == job_id).first()
+        if not job:
+            db.close()
+            return
+        user_id, file_path, full_reimport = job.user_id, job.file_path, bool(job.full_reimport)
+
+        # Claim the job only while it is still queued, so it either starts before an
+        # erasure of the user's data (which then waits for it) or not at all
+        cancelled = erasure_pending(db, user_id)
+        update = {"stage": "failed", "error": "Cancelled: data erasure requested", "finished_at": datetime.utcnow()} \
+            if cancelled else {"stage": "parsing", "started_at": datetime.utcnow()}
+        claimed = db.query(models.HealthImportJob).filter(
+            models.HealthImportJob.id == job_id,
+            models.HealthImportJob.stage == "queued"
+        ).update(update, synchronize_session=False)
+        db.commit()
+        if cancelled or not claimed:
+            logger.info(f"Health import job {job_id} for user {user_id} cancelled by a data erasure")
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            db.close()
+            return
+
+        with self._lock:
+            self._live[job_id] = {
+                "stage": "parsing",
+                "records_processed": 0,
+                "records_skipped": 0,
+                "rows_written": 0,
+                "started": time.monotonic()
+            }
+
+        def on_progress(stage: str, **counters):
+            with self._lock:
+                live = self._live[job_id]
+                stage_changed = live["stage"] != stage
+                live["stage"] = stage
+                live.update(counters)
+            # Only stage changes hit the database; counters stay in memory
+            if stage_changed:
+                self._persist(job_id, stage=stage)
+
+        try:
+            result = dashboard_service.import_health_file(
+                db, user_id, file_path, on_progress=on_progress, full_reimport=full_reimport
+            )
+            with self._lock:
+                live = self._live[job_id]
+            self._persist(
+                job_id,
+                stage="completed",
+                records_processed=live["records_processed"],
+                records_skipped=live["records_skipped"],
+                rows_written=live["rows_written"],
+                summary=json.dumps(result["summary"]),
+                finished_at=datetime.utcnow()
+            )
+            logger.info(f"Health import job {job_id} completed: {result['summary']}")
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Health import job {job_id} failed: {error}")
+            with self._lock:
+                live = self._live[job_id]
+            self._persist(
+                job_id,
+                stage="failed",
+                records_processed=live["records_processed"],
+                records_skipped=live["records_skipped"],
+                rows_written=live["rows_written"],
+                error=error,
+                finished_at=datetime.utcnow()
+            )
+        finally:
+            with self._lock:
+                self._live.pop(job_id, None)
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            db.close()
+
+
+import_job_runner = ImportJobRunner(max_workers=settings.HEALTH_IMPORT_WORKERS)
@@ -0,0 +1,319 @@
+"""
+Bulk ingestion of parsed Apple Health data.
+
+Instead of one existence query per sleep day, activity day and vital sample,
+the ingestor loads the keys that already exist for the import's date range in
+a single query per table and writes rows in batched executemany statements
+(INSERT ... ON CONFLICT where the dialect supports it).
+
+Vital samples are also folded into hourly and daily VitalRollup buckets as they
+are written, so trend and dashboard reads never have to scan raw samples.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.modules.dashboard import models
+
+BATCH_SIZE = 1000
+VITAL_DEDUP_WINDOW = timedelta(minutes=1)
+
+ACTIVITY_FIELDS = ('steps', 'distance', 'flights_climbed', 'active_calories', 'basal_calories')
+VITAL_METRICS = ('heart_rate', 'oxygen_saturation')
+ROLLUP_GRANULARITIES = ('hour', 'day')
+ROLLUP_KEY = ['user_id', 'metric', 'granularity', 'bucket_start']
+
+
+def _batches(rows: List[Dict], size: int = BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def bucket_start(recorded_at: datetime, granularity: str) -> datetime:
+    """Wall-clock start of the hour or day a sample was recorded in"""
+    local = recorded_at.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        local = local.replace(hour=0)
+    return local
+
+
+def raw_vitals_cutoff(keep_days: int) -> datetime:
+    """Midnight keep_days ago; raw samples before it fall outside the retention window"""
+    return datetime.combine(date.today() - timedelta(days=keep_days), time.min)
+
+
+def aggregate_vitals(rows: Iterable[Dict]) -> Dict[Tuple[str, str, datetime], Dict]:
+    """Fold vital samples into {(metric, granularity, bucket_start): min/max/sum/count}"""
+    buckets = {}
+    for row in rows:
+        for metric in VITAL_METRICS:
+            value = row.get(metric)
+            if value is None:
+                continue
+            for granularity in ROLLUP_GRANULARITIES:
+                key = (metric, granularity, bucket_start(row['recorded_at'], granularity))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = {'min_value': value, 'max_value': value, 'sum_value': value, 'sample_count': 1}
+                else:
+                    bucket['min_value'] = min(bucket['min_value'], value)
+                    bucket['max_value'] = max(bucket['max_value'], value)
+                    bucket['sum_value'] += value
+                    bucket['sample_count'] += 1
+    return buckets
+
+
+class HealthDataIngestor:
+    """Writes one user's parsed health data using set-based queries"""
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.dialect = db.get_bind().dialect.name
+
+    def _upsert_statement(self, model):
+        """INSERT ... ON CONFLICT for dialects that have it, otherwise None"""
+        if self.dialect == 'sqlite':
+            return sqlite.insert(model.__table__)
+        if self.dialect == 'postgresql':
+            return postgresql.insert(model.__table__)
+        return None
+
+    def _existing_dates(self, model, dates) -> Dict:
+        """Map date -> id for rows this user already has in the import's date range"""
+        if not dates:
+            return {}
+        rows = self.db.query(model.date, model.id).filter(
+            model.user_id == self.user_id,
+            model.date >= min(dates),
+            model.date <= max(dates)
+        ).all()
+        return {row.date: row.id for row in rows}
+
+    def upsert_sleep_records(self, sleep_records: List[Dict]) -> int:
+        """Insert nightly sleep summaries that are not stored yet. Returns rows inserted."""
+        existing = self._existing_dates(models.SleepRecord, [s['date'] for s in sleep_records])
+        rows = [
+            {'user_id': self.user_id, **sleep_data}
+            for sleep_data in sleep_records
+            if sleep_data['date'] not in existing
+        ]
+
+        stmt = self._upsert_statement(models.SleepRecord)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=['user_id', 'date'])
+        else:
+            stmt = insert(models.SleepRecord.__table__)
+
+        for batch in _batches(rows):
+            self.db.execute(stmt, batch)
+        return len(rows)
+
+    def upsert_activity_records(self, activity_records: List[Dict]) -> int:
+        """Insert new daily activity totals and overwrite existing ones. Returns rows inserted."""
+        existing = self._existing_dates(models.ActivityRecord, [a['date'] for a in activity_records])
+        rows = [{'user_id': self.user_id, **activity_data} for activity_data in activity_records]
+        new_count = sum(1 for row in rows if row['date'] not in existing)
+
+        stmt = self._upsert_statement(models.ActivityRecord)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'date'],
+                set_={
+                    **{field: getattr(stmt.excluded, field) for field in ACTIVITY_FIELDS},
+                    'updated_at': func.now()
+                }
+            )
+            for batch in _batches(rows):
+                self.db.execute(stmt, batch)
+        else:
+            new_rows = [row for row in rows if row['date'] not in existing]
+            updates = [
+                {'id': existing[row['date']], **{field: row[field] for field in ACTIVITY_FIELDS}}
+                for row in rows if row['date'] in existing
+            ]
+            for batch in _batches(new_rows):
+                self.db.execute(insert(models.ActivityRecord.__table__), batch)
+            for batch in _batches(updates):
+                self.db.bulk_update_mappings(models.ActivityRecord, batch)
+        return new_count
+
+    def insert_vital_records(self, vital_records: List[Dict], not_before: Optional[datetime] = None) -> List[Dict]:
+        """
+        Insert vital samples that have no stored sample within a minute.
+        Samples recorded before not_before (wall-clock) are not stored raw, so a re-import
+        does not bring back raw data removed by retention; unrolled_vitals_before picks
+        them up for the rollups. Returns the rows that were written.
+        """
+        if not_before is not None:
+            vital_records = [v for v in vital_records if v['recorded_at'].replace(tzinfo=None) >= not_before]
+        if not vital_records:
+            return []
+
+        timestamps = [v['recorded_at'] for v in vital_records]
+        existing = sorted(
+            row.recorded_at for row in self.db.query(models.VitalRecord.recorded_at).filter(
+                models.VitalRecord.user_id == self.user_id,
+                models.VitalRecord.recorded_at >= min(timestamps) - VITAL_DEDUP_WINDOW,
+                models.VitalRecord.recorded_at <= max(timestamps) + VITAL_DEDUP_WINDOW
+            )
+        )
+        # SQLite hands back naive wall-clock datetimes; compare like with like
+        naive = bool(existing) and existing[0].tzinfo is None
+
+        rows = []
+        for vital_data in vital_records:
+            if existing:
+                recorded_at = vital_data['recorded_at']
+                if naive:
+                    recorded_at = recorded_at.replace(tzinfo=None)
+                i = bisect_left(existing, recorded_at - VITAL_DEDUP_WINDOW)
+                if i < len(existing) and existing[i] <= recorded_at + VITAL_DEDUP_WINDOW:
+                    continue
+            rows.append({
+                'user_id': self.user_id,
+                'recorded_at': vital_data['recorded_at'],
+                'heart_rate': vital_data.get('heart_rate'),
+                'oxygen_saturation': vital_data.get('oxygen_saturation')
+            })
+
+        for batch in _batches(rows):
+            self.db.execute(insert(models.VitalRecord.__table__), batch)
+        return rows
+
+    def unrolled_vitals_before(self, vital_records: List[Dict], before: datetime) -> List[Dict]:
+        """
+        Samples recorded before `before` (wall-clock; outside raw retention) for
+        rollups only: a metric's samples are kept only for days with no rollup of
+        that metric yet, so importing the same history again does not count it twice.
+        """
+        old = [v for v in vital_records if v['recorded_at'].replace(tzinfo=None) < before]
+        if not old:
+            return []
+
+        days = [bucket_start(v['recorded_at'], 'day') for v in old]
+        rolled_up = {
+            (r.metric, r.bucket_start) for r in self.db.query(models.VitalRollup.metric, models.VitalRollup.bucket_start).filter(
+                models.VitalRollup.user_id == self.user_id,
+                models.VitalRollup.granularity == 'day',
+                models.VitalRollup.bucket_start >= min(days),
+                models.VitalRollup.bucket_start <= max(days)
+            )
+        }
+        rows = []
+        for vital_data, day in zip(old, days):
+            row = {'recorded_at': vital_data['recorded_at']}
+            for metric in VITAL_METRICS:
+                if vital_data.get(metric) is not None and (metric, day) not in rolled_up:
+                    row[metric] = vital_data[metric]
+            if len(row) > 1:
+                rows.append(row)
+        return rows
+
+    def update_vital_rollups(self, rows: Iterable[Dict]) -> int:
+        """Merge newly written vital samples into their hourly and daily rollups. Returns buckets touched."""
+        buckets = aggregate_vitals(rows)
+        values = [
+            {'user_id': self.user_id, 'metric': metric, 'granularity': granularity, 'bucket_start': start, **agg}
+            for (metric, granularity, start), agg in buckets.items()
+        ]
+        if not values:
+            return 0
+
+        stmt = self._upsert_statement(models.VitalRollup)
+        if stmt is not None:
+            table = models.VitalRollup.__table__
+            # SQLite's two-argument min()/max() are scalar, like LEAST/GREATEST
+            least, greatest = (func.min, func.max) if self.dialect == 'sqlite' else (func.least, func.greatest)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=ROLLUP_KEY,
+                set_={
+                    'min_value': least(table.c.min_value, stmt.excluded.min_value),
+                    'max_value': greatest(table.c.max_value, stmt.excluded.max_value),
+                    'sum_value': table.c.sum_value + stmt.excluded.sum_value,
+                    'sample_count': table.c.sample_count + stmt.excluded.sample_count
+                }
+            )
+            for batch in _batches(values):
+                self.db.execute(stmt, batch)
+            return len(values)
+
+        starts = [value['bucket_start'] for value in values]
+        existing = {
+            (r.metric, r.granularity, r.bucket_start): r for r in self.db.query(models.VitalRollup).filter(
+                models.VitalRollup.user_id == self.user_id,
+                models.VitalRollup.bucket_start >= min(starts),
+                models.VitalRollup.bucket_start <= max(starts)
+            )
+        }
+        for value in values:
+            rollup = existing.get((value['metric'], value['granularity'], value['bucket_start']))
+            if rollup is None:
+                self.db.add(models.VitalRollup(**value))
+                continue
+            rollup.min_value = min(rollup.min_value, value['min_value'])
+            rollup.max_value = max(rollup.max_value, value['max_value'])
+            rollup.sum_value += value['sum_value']
+            rollup.sample_count += value['sample_count']
+        return len(values)
+
+    def rebuild_vital_rollups(self) -> int:
+        """
+        Recompute rollups from the raw samples still stored. Buckets older than
+        the earliest raw sample are kept, since retention may have removed their samples.
+        """
+        earliest = self.db.query(func.min(models.VitalRecord.recorded_at)).filter(
+            models.VitalRecord.user_id == self.user_id
+        ).scalar()
+        if earliest is None:
+            return 0
+
+        self.db.query(models.VitalRollup).filter(
+            models.VitalRollup.user_id == self.user_id,
+            models.VitalRollup.bucket_start >= bucket_start(earliest, 'day')
+        ).delete(synchronize_session=False)
+        samples = self.db.query(
+            models.VitalRecord.recorded_at,
+            models.VitalRecord.heart_rate,
+            models.VitalRecord.oxygen_saturation
+        ).filter(models.VitalRecord.user_id == self.user_id).yield_per(BATCH_SIZE)
+        return self.update_vital_rollups(row._asdict() for row in samples)
+
+    def prune_raw_vitals(self, keep_days: int) -> int:
+        """Delete raw vital samples from before the last keep_days days. Returns rows deleted."""
+        return self.db.query(models.VitalRecord).filter(
+            models.VitalRecord.user_id == self.user_id,
+            models.VitalRecord.recorded_at < raw_vitals_cutoff(keep_days)
+        ).delete(synchronize_session=False)
+
+    def load_watermarks(self) -> Dict[str, str]:
+        """Latest startDate imported so far for each HK record type"""
+        rows = self.db.query(
+            models.HealthImportWatermark.record_type,
+            models.HealthImportWatermark.last_start_date
+        ).filter(models.HealthImportWatermark.user_id == self.user_id).all()
+        return {row.record_type: row.last_start_date for row in rows}
+
+    def advance_watermarks(self, latest_start_dates: Dict[str, str]):
+        """Move each record type's watermark forward to the latest startDate seen in this import"""
+        existing = {
+            w.record_type: w for w in self.db.query(models.HealthImportWatermark).filter(
+                models.HealthImportWatermark.user_id == self.user_id
+            )
+        }
+        for record_type, start_str in latest_start_dates.items():
+            if not record_type or not start_str:
+                continue
+            watermark = existing.get(record_type)
+            if watermark is None:
+                self.db.add(models.HealthImportWatermark(
+                    user_id=self.user_id,
+                    record_type=record_type,
+                    last_start_date=start_str
+                ))
+            elif start_str > (watermark.last_start_date or ''):
+                watermark.last_start_date = start_str
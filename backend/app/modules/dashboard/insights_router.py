@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, ValidationError
+from typing import Any, List
 from app.core.database import get_db, SessionLocal
 from app.core.security import get_current_user
 from app.modules.auth.models import User
 from app.modules.dashboard.service import dashboard_service
+from app.modules.privacy.erasure import erasure_job_runner, erasure_pending
+from app.services.async_rag_service import RAGTimeoutError
+from contextlib import aclosing
+import json
 import logging
 
 router = APIRouter()
@@ -16,6 +23,24 @@ class InsightQuery(BaseModel):
 class InsightResponse(BaseModel):
     insight: str
 
+class InsightMetric(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    label: str
+    value: str
+    status: str
+    insight: str = ""
+
+class InsightResult(BaseModel):
+    """The JSON structure the insight prompt asks the model for"""
+    summary: str
+    metrics: List[InsightMetric] = []
+    analysis: str = ""
+    recommendations: List[str] = []
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("/query", response_model=InsightResponse)
 async def get_health_insight(
     query: InsightQuery,
@@ -26,21 +51,84 @@ async def get_health_insight(
     Get personalized health insights based on authenticated user's data.
     """
     try:
-        insight = dashboard_service.generate_insight(current_user.id, query.query)
+        insight = await dashboard_service.generate_insight(current_user.id, query.query)
         return {"insight": insight}
+    except RAGTimeoutError as e:
+        logger.error(f"Timed out generating insight for user {current_user.id}: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating insight for user {current_user.id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/query/stream")
+async def stream_health_insight(
+    query: InsightQuery,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events version of /query. Sends a "retrieval" event with the
+    context documents once rerank finishes, a "token" event per completion delta,
+    then a "result" event with the validated insight JSON. Failures are sent as
+    an "error" event, since the 200 status is already on the wire.
+    """
+    user_id = current_user.id
+
+    async def event_generator():
+        try:
+            # Validated before the answer is cached, so an invalid one is never served again
+            stream = dashboard_service.stream_insight(user_id, query.query, InsightResult.model_validate_json)
+            async with aclosing(stream) as events:
+                async for event, data in events:
+                    if await request.is_disconnected():
+                        logger.info(f"Client disconnected from insight stream for user {user_id}")
+                        break
+                    if event == "completion":
+                        yield _sse("result", data.model_dump())
+                    else:
+                        yield _sse(event, data)
+        except ValidationError as e:
+            logger.error(f"Invalid insight JSON for user {user_id}: {e}")
+            yield _sse("error", {"status": 502, "detail": "The insight response was not valid JSON"})
+        except RAGTimeoutError as e:
+            logger.error(f"Timed out streaming insight for user {user_id}: {e}")
+            yield _sse("error", {"status": 504, "detail": str(e)})
+        except Exception as e:
+            logger.error(f"Error streaming insight for user {user_id}: {e}")
+            yield _sse("error", {"status": 500, "detail": str(e)})
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"  # Disable nginx buffering
+        }
+    )
+
 @router.post("/refresh")
 async def refresh_embeddings(
     background_tasks: BackgroundTasks,
+    wait: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Trigger a background task to refresh authenticated user's embeddings.
+    Refresh authenticated user's embeddings. Only changed documents are re-embedded.
+    Runs in the background unless wait is set, in which case the unchanged /
+    updated / deleted counts are returned.
     """
+    if erasure_pending(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Your health data is being erased; try again once it has finished")
+    if wait:
+        try:
+            counts = await run_in_threadpool(dashboard_service.process_refresh_embeddings, current_user.id, db)
+        except Exception as e:
+            logger.error(f"Error refreshing embeddings for user {current_user.id}: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        return {"message": "Embedding refresh completed", **counts}
+    
     background_tasks.add_task(process_refresh_embeddings_task, current_user.id)
     return {"message": "Embedding refresh started in background"}
 
@@ -48,36 +136,26 @@ def process_refresh_embeddings_task(user_id: int):
     db = SessionLocal()
     try:
         dashboard_service.process_refresh_embeddings(user_id, db)
+    except Exception as e:
+        # Nobody awaits a background refresh; the next refresh retries whatever failed
+        logger.error(f"Error refreshing embeddings for user {user_id}: {e}")
     finally:
         db.close()
 
-@router.delete("/clear")
+@router.delete("/clear", status_code=202)
 async def clear_rag_data(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Clear all RAG vector data for the authenticated user.
     Useful for testing or when user wants to reset their health insights.
+    Runs as a background erasure job; poll status_url for progress.
     """
-    try:
-        from app.services.rag_service import rag_service
-        from qdrant_client.http import models as qmodels
-        
-        rag_service.qdrant.delete(
-            collection_name=rag_service.collection_name,
-            points_selector=qmodels.FilterSelector(
-                filter=qmodels.Filter(
-                    must=[
-                        qmodels.FieldCondition(
-                            key="user_id",
-                            match=qmodels.MatchValue(value=current_user.id)
-                        )
-                    ]
-                )
-            )
-        )
-        logger.info(f"Cleared all RAG data for user {current_user.id}")
-        return {"message": f"All health insights data cleared for user {current_user.email}"}
-    except Exception as e:
-        logger.error(f"Error clearing RAG data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    job = erasure_job_runner.submit(db, current_user.id, "vectors")
+    logger.info(f"Queued clearing of RAG data for user {current_user.id}")
+    return {
+        "message": f"Clearing health insights data for user {current_user.email}",
+        "job_id": job.id,
+        "status_url": f"/api/privacy/erasure/{job.id}"
+    }
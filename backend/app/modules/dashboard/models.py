@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Index, Text, Boolean, Float
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -17,6 +17,10 @@ class HealthProfile(Base):
 
 class SleepRecord(Base):
     __tablename__ = "sleep_records"
+    __table_args__ = (
+        # One nightly summary per user; bulk imports upsert against this key
+        Index("uq_sleep_records_user_date", "user_id", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -31,6 +35,10 @@ class SleepRecord(Base):
 
 class ActivityRecord(Base):
     __tablename__ = "activity_records"
+    __table_args__ = (
+        # One daily total per user; bulk imports upsert against this key
+        Index("uq_activity_records_user_date", "user_id", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -45,6 +53,10 @@ class ActivityRecord(Base):
 
 class VitalRecord(Base):
     __tablename__ = "vital_records"
+    __table_args__ = (
+        # Per-user range scans and "latest sample" lookups
+        Index("ix_vital_records_user_recorded_at", "user_id", "recorded_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -53,11 +65,62 @@ class VitalRecord(Base):
     oxygen_saturation = Column(Integer, nullable=True)  # in percentage
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class VitalRollup(Base):
+    """Hourly and daily min/max/sum/count of vital samples, maintained at import time"""
+    __tablename__ = "vital_rollups"
+    __table_args__ = (
+        # Imports merge into existing buckets with an upsert against this key
+        Index("uq_vital_rollups_user_bucket", "user_id", "metric", "granularity", "bucket_start", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    metric = Column(String)  # heart_rate, oxygen_saturation
+    granularity = Column(String)  # hour, day
+    bucket_start = Column(DateTime)  # wall-clock start of the hour/day the samples were recorded in
+    min_value = Column(Float)
+    max_value = Column(Float)
+    sum_value = Column(Float)
+    sample_count = Column(Integer)
+
 class BodyMeasurement(Base):
     __tablename__ = "body_measurements"
+    __table_args__ = (
+        Index("ix_body_measurements_user_measured_at", "user_id", "measured_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     measured_at = Column(DateTime(timezone=True), index=True)
     weight = Column(Integer)  # in kg
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class HealthImportJob(Base):
+    __tablename__ = "health_import_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid hex
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    filename = Column(String)
+    file_path = Column(String)  # saved upload, removed when the job finishes
+    full_reimport = Column(Boolean, default=False)  # ignore import watermarks
+    stage = Column(String, default="queued")  # queued, parsing, inserting, indexing, completed, failed
+    records_processed = Column(Integer, default=0)  # Apple Health records read
+    records_skipped = Column(Integer, default=0)  # records older than the import watermark
+    rows_written = Column(Integer, default=0)  # sleep/activity/vital rows inserted
+    summary = Column(Text, nullable=True)  # JSON import summary
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class HealthImportWatermark(Base):
+    __tablename__ = "health_import_watermarks"
+    __table_args__ = (
+        Index("uq_health_import_watermarks_user_type", "user_id", "record_type", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    record_type = Column(String)  # HK type identifier, e.g. HKQuantityTypeIdentifierStepCount
+    last_start_date = Column(String)  # latest raw startDate imported, "2025-09-26 20:38:07 +0530"
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
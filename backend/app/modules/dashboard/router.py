@@ -4,22 +4,49 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from app.modules.dashboard import schemas
 from app.modules.dashboard.service import dashboard_service
+from app.modules.dashboard.import_jobs import import_job_runner
+from app.modules.privacy.erasure import erasure_pending
 from app.modules.auth.models import User
 from typing import List, Optional
 from datetime import datetime, date
 
 router = APIRouter()
 
-@router.post("/health/upload")
+@router.post("/health/upload", response_model=schemas.HealthImportJobCreated, status_code=202)
 async def upload_health_data(
-    user_id: int,
     file: UploadFile = File(...),
+    full_reimport: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload an Apple Health export XML file.
+    The file is saved to disk and imported in the background; poll the returned status URL for progress.
+    Records older than the last import are skipped unless full_reimport is set.
+    """
+    if erasure_pending(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Your health data is being erased; try again once it has finished")
+    file_path = await dashboard_service.save_health_export(file)
+    job = import_job_runner.submit(db, current_user.id, file_path, file.filename, full_reimport=full_reimport)
+    return {
+        "job_id": job.id,
+        "stage": job.stage,
+        "status_url": f"/api/health/imports/{job.id}"
+    }
+
+@router.get("/health/imports/{job_id}", response_model=schemas.HealthImportJobResponse)
+async def get_health_import(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Upload and parse Apple Health export XML file
+    Get stage, rows processed and throughput of a health data import job
     """
-    return await dashboard_service.upload_health_data(db, user_id, file)
+    job = import_job_runner.get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return import_job_runner.describe(job)
 
 @router.get("/health/profile", response_model=schemas.HealthProfileResponse)
 async def get_health_profile(
@@ -67,6 +94,20 @@ async def get_vital_records(
     """
     return dashboard_service.get_vital_records(db, current_user.id, limit)
 
+@router.get("/health/vitals/trends", response_model=List[schemas.VitalTrendPoint])
+async def get_vital_trends(
+    metric: str = "heart_rate",
+    granularity: str = "day",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get hourly or daily min/max/avg of heart_rate or oxygen_saturation for authenticated user
+    """
+    return dashboard_service.get_vital_trends(db, current_user.id, metric, granularity, start_date, end_date)
+
 @router.get("/health/dashboard", response_model=schemas.DashboardSummary)
 async def get_dashboard_summary(
     current_user: User = Depends(get_current_user),
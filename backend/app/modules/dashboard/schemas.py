@@ -54,6 +54,13 @@ class VitalRecordResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class VitalTrendPoint(BaseModel):
+    bucket_start: datetime
+    min: float
+    max: float
+    avg: float
+    count: int
+
 class BodyMeasurementResponse(BaseModel):
     id: int
     user_id: int
@@ -63,6 +70,26 @@ class BodyMeasurementResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class HealthImportJobCreated(BaseModel):
+    job_id: str
+    stage: str
+    status_url: str
+
+class HealthImportJobResponse(BaseModel):
+    job_id: str
+    filename: Optional[str]
+    stage: str
+    records_processed: int
+    records_skipped: int
+    rows_written: int
+    elapsed_seconds: Optional[float]
+    records_per_second: Optional[float]
+    summary: Optional[dict]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
 class DashboardSummary(BaseModel):
     profile: Optional[HealthProfileResponse]
     today_stats: dict
@@ -1,44 +1,120 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func, literal, select, true, union_all
 from fastapi import UploadFile, HTTPException, BackgroundTasks
+from app.core.config import settings
+from app.core.cache import TTLCache
 from app.modules.dashboard import models, schemas
-from app.services.health_parser import AppleHealthParser
+from app.modules.dashboard.ingestion import HealthDataIngestor, VITAL_METRICS, raw_vitals_cutoff
+from app.services.health_parser import AppleHealthParser, find_export_member
 from app.services.rag_service import rag_service
+from app.services.async_rag_service import async_rag_service
+from app.services.rag_sync import RAGSource, fingerprint, sync_user_documents
+from app.services.text_chunker import text_chunker
 from app.services.ai_service import ai_service
 from app.modules.auth.models import User
 from app.modules.appointments.models import Appointment
 from app.modules.medications.models import Medication
 from app.modules.health_records.models import HealthRecord
-import tempfile
+from app.modules.health_records.service import health_record_source
 import os
+import uuid
+import zipfile
 from datetime import datetime, timedelta, date
 import logging
 import PyPDF2
-from typing import Optional
+from typing import Callable, List, Optional
 
 logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = "uploads/health_records"
+IMPORT_DIR = "uploads/health_imports"
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+PARALLEL_PARSE_MIN_BYTES = 64 * 1024 * 1024  # 64MB
+
+# Data types owned by process_refresh_embeddings; points of these types are synced against SQL rows
+REFRESH_DATA_TYPES = ["personal_info", "appointment", "medication", "health_record", "sleep_summary", "activity_summary"]
+
+# user_id -> (date, DashboardSummary); dropped whenever the user's health data is written
+dashboard_cache = TTLCache(ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS)
 
 class DashboardService:
-    async def upload_health_data(self, db: Session, user_id: int, file: UploadFile):
-        if not file.filename.endswith('.xml'):
-            raise HTTPException(status_code=400, detail="Only XML files are supported")
+    async def save_health_export(self, file: UploadFile) -> str:
+        """
+        Stream an uploaded Apple Health export to disk and return its path.
+        Accepts export.xml or the export.zip produced by the iPhone, which is
+        kept compressed and decompressed while parsing.
+        """
+        extension = os.path.splitext(file.filename.lower())[1]
+        if extension not in ('.xml', '.zip'):
+            raise HTTPException(status_code=400, detail="Only XML or ZIP files are supported")
+        
+        os.makedirs(IMPORT_DIR, exist_ok=True)
+        file_path = os.path.join(IMPORT_DIR, f"{uuid.uuid4().hex}{extension}")
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xml') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        # Copy in chunks so large exports never sit in memory
+        with open(file_path, 'wb') as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+        
+        if extension == '.zip':
+            try:
+                with zipfile.ZipFile(file_path) as archive:
+                    find_export_member(archive)
+            except (zipfile.BadZipFile, ValueError):
+                os.remove(file_path)
+                raise HTTPException(status_code=400, detail="ZIP file does not contain an Apple Health export.xml")
+        
+        return file_path
+
+    async def upload_health_data(self, db: Session, user_id: int, file: UploadFile, full_reimport: bool = False):
+        """Import an uploaded export inside the request (background jobs use import_health_file directly)"""
+        file_path = await self.save_health_export(file)
+        try:
+            return self.import_health_file(db, user_id, file_path, full_reimport=full_reimport)
+        finally:
+            # Clean up saved file
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def import_health_file(self, db: Session, user_id: int, file_path: str, on_progress: Optional[Callable] = None,
+                           full_reimport: bool = False):
+        """
+        Parse an Apple Health export on disk, write it to the database and index summaries in RAG.
+        on_progress, if given, is called as on_progress(stage, **counters) while the import runs.
+
+        Unless full_reimport is set, records older than the user's per-type import
+        watermark are skipped, so re-uploading a full export only costs the new data.
+        """
+        def report(stage: str, **counters):
+            if on_progress:
+                on_progress(stage, **counters)
         
         try:
-            # Parse the XML file
-            parser = AppleHealthParser(temp_file_path)
-            parser.parse()
+            ingestor = HealthDataIngestor(db, user_id)
+            watermarks = {} if full_reimport else ingestor.load_watermarks()
+            
+            # Parse the XML file in a single streaming pass, split across
+            # processes when a plain XML export is large enough to be worth it
+            report("parsing")
+            parser = AppleHealthParser(file_path)
+            parse_progress = lambda count: report("parsing", records_processed=count)
+            if (settings.HEALTH_IMPORT_PROCESSES > 1 and not parser.is_zip
+                    and os.path.getsize(file_path) >= PARALLEL_PARSE_MIN_BYTES):
+                parsed = parser.parse_parallel(
+                    workers=settings.HEALTH_IMPORT_PROCESSES,
+                    progress=parse_progress,
+                    since=watermarks
+                )
+            else:
+                parsed = parser.parse_stream(progress=parse_progress, since=watermarks)
+            report("parsing", records_skipped=parsed['skipped_records'])
             
             # Extract personal info
-            personal_info = parser.get_personal_info()
-            height, weight, weight_date = parser.get_height_weight()
+            personal_info = parsed['personal_info']
+            height, weight, weight_date = parsed['height'], parsed['weight'], parsed['weight_date']
             
             # Create or update health profile
             profile = db.query(models.HealthProfile).filter(models.HealthProfile.user_id == user_id).first()
@@ -61,56 +137,26 @@ class DashboardService:
                 )
                 db.add(profile)
             
-            # Extract and save sleep records
-            sleep_records = parser.get_sleep_records()
-            sleep_count = 0
-            for sleep_data in sleep_records:
-                # Check if record already exists
-                existing = db.query(models.SleepRecord).filter(
-                    models.SleepRecord.user_id == user_id,
-                    models.SleepRecord.date == sleep_data['date']
-                ).first()
-                
-                if not existing:
-                    sleep_record = models.SleepRecord(user_id=user_id, **sleep_data)
-                    db.add(sleep_record)
-                    sleep_count += 1
+            # Write sleep, activity and vital records in bulk
+            report("inserting")
+            sleep_records = parsed['sleep_records']
+            sleep_count = ingestor.upsert_sleep_records(sleep_records)
+            report("inserting", rows_written=sleep_count)
             
-            # Extract and save activity records
-            activity_records = parser.get_activity_records()
-            activity_count = 0
-            for activity_data in activity_records:
-                # Check if record already exists
-                existing = db.query(models.ActivityRecord).filter(
-                    models.ActivityRecord.user_id == user_id,
-                    models.ActivityRecord.date == activity_data['date']
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    for key, value in activity_data.items():
-                        if key != 'date':
-                            setattr(existing, key, value)
-                else:
-                    activity_record = models.ActivityRecord(user_id=user_id, **activity_data)
-                    db.add(activity_record)
-                    activity_count += 1
+            activity_records = parsed['activity_records']
+            activity_count = ingestor.upsert_activity_records(activity_records)
+            report("inserting", rows_written=sleep_count + activity_count)
             
-            # Extract and save vital records
-            vital_records = parser.get_vital_records()
-            vital_count = 0
-            for vital_data in vital_records:
-                # Only save if we don't have a record within 1 minute
-                existing = db.query(models.VitalRecord).filter(
-                    models.VitalRecord.user_id == user_id,
-                    models.VitalRecord.recorded_at >= vital_data['recorded_at'] - timedelta(minutes=1),
-                    models.VitalRecord.recorded_at <= vital_data['recorded_at'] + timedelta(minutes=1)
-                ).first()
-                
-                if not existing:
-                    vital_record = models.VitalRecord(user_id=user_id, **vital_data)
-                    db.add(vital_record)
-                    vital_count += 1
+            retention_days = settings.VITAL_RAW_RETENTION_DAYS
+            raw_cutoff = raw_vitals_cutoff(retention_days) if retention_days else None
+            # Samples older than raw retention still count towards their rollups
+            rollup_only = ingestor.unrolled_vitals_before(parsed['vital_records'], raw_cutoff) if raw_cutoff else []
+            vital_rows = ingestor.insert_vital_records(parsed['vital_records'], not_before=raw_cutoff)
+            vital_count = len(vital_rows)
+            ingestor.update_vital_rollups(vital_rows + rollup_only)
+            if retention_days:
+                ingestor.prune_raw_vitals(retention_days)
+            report("inserting", rows_written=sleep_count + activity_count + vital_count)
             
             # Save weight measurement if available
             if weight and weight_date:
@@ -127,37 +173,41 @@ class DashboardService:
                     )
                     db.add(weight_record)
             
+            # Committed together with the rows so a failed import is retried in full
+            ingestor.advance_watermarks(parsed['latest_start_dates'])
+            
             db.commit()
+            self.invalidate_dashboard(user_id)
             
-            # Trigger RAG ingestion in background
+            # Index summaries for RAG
+            report("indexing")
             try:
-                # Upsert personal info
-                rag_service.upsert_data(
-                    user_id=user_id,
-                    data_type="personal_info",
-                    content=f"Personal Info: {personal_info}, Height: {height}cm, Weight: {weight}kg",
-                    metadata={"source": "apple_health_export"}
-                )
+                documents = [{
+                    "data_type": "personal_info",
+                    "content": f"Personal Info: {personal_info}, Height: {height}cm, Weight: {weight}kg",
+                    "metadata": {"source": "apple_health_export"}
+                }]
                 
-                # Upsert sleep summary
+                # Sleep summary
                 if sleep_records:
                     sleep_summary = f"Recent sleep records: {len(sleep_records)} records found. Last record: {sleep_records[-1]['date']} - {sleep_records[-1]['total_duration']} mins"
-                    rag_service.upsert_data(
-                        user_id=user_id,
-                        data_type="sleep_records",
-                        content=sleep_summary,
-                        metadata={"count": len(sleep_records), "last_date": str(sleep_records[-1]['date'])}
-                    )
+                    documents.append({
+                        "data_type": "sleep_records",
+                        "content": sleep_summary,
+                        "metadata": {"count": len(sleep_records), "last_date": str(sleep_records[-1]['date'])}
+                    })
                     
-                # Upsert activity summary
+                # Activity summary
                 if activity_records:
                     activity_summary = f"Recent activity records: {len(activity_records)} records found. Last record: {activity_records[-1]['date']} - Steps: {activity_records[-1].get('steps', 0)}"
-                    rag_service.upsert_data(
-                        user_id=user_id,
-                        data_type="activity_records",
-                        content=activity_summary,
-                        metadata={"count": len(activity_records), "last_date": str(activity_records[-1]['date'])}
-                    )
+                    documents.append({
+                        "data_type": "activity_records",
+                        "content": activity_summary,
+                        "metadata": {"count": len(activity_records), "last_date": str(activity_records[-1]['date'])}
+                    })
+                
+                # One embeddings call and one Qdrant upsert for all summaries
+                rag_service.upsert_many(user_id, documents)
                     
             except Exception as e:
                 print(f"Error triggering RAG ingestion: {e}")
@@ -168,6 +218,7 @@ class DashboardService:
                     "sleep_records": sleep_count,
                     "activity_records": activity_count,
                     "vital_records": vital_count,
+                    "skipped_records": parsed['skipped_records'],
                     "profile_updated": True
                 }
             }
@@ -175,10 +226,6 @@ class DashboardService:
         except Exception as e:
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Error parsing health data: {str(e)}")
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
 
     def get_health_profile(self, db: Session, user_id: int):
         return db.query(models.HealthProfile).filter(models.HealthProfile.user_id == user_id).first()
@@ -207,81 +254,136 @@ class DashboardService:
             query = query.filter(models.VitalRecord.recorded_at <= end_date)
         return query.order_by(models.VitalRecord.recorded_at.desc()).limit(limit).all()
 
+    def get_vital_trends(self, db: Session, user_id: int, metric: str = "heart_rate", granularity: str = "day",
+                         start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """Hourly or daily min/max/avg of a vital, read from the rollup tables"""
+        if metric not in VITAL_METRICS:
+            raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+        if granularity not in ("hour", "day"):
+            raise HTTPException(status_code=400, detail="Granularity must be 'hour' or 'day'")
+        
+        if not start_date:
+            start_date = datetime.now() - timedelta(days=7 if granularity == "hour" else 30)
+        query = db.query(models.VitalRollup).filter(
+            models.VitalRollup.user_id == user_id,
+            models.VitalRollup.metric == metric,
+            models.VitalRollup.granularity == granularity,
+            models.VitalRollup.bucket_start >= start_date.replace(tzinfo=None)
+        )
+        if end_date:
+            query = query.filter(models.VitalRollup.bucket_start <= end_date.replace(tzinfo=None))
+        
+        return [
+            {
+                "bucket_start": rollup.bucket_start,
+                "min": rollup.min_value,
+                "max": rollup.max_value,
+                "avg": round(rollup.sum_value / rollup.sample_count, 1),
+                "count": rollup.sample_count
+            }
+            for rollup in query.order_by(models.VitalRollup.bucket_start).all()
+        ]
+
     def get_dashboard_summary(self, db: Session, user_id: int):
+        """Dashboard summary for a user, served from a per-user cache until their data changes"""
+        today = date.today()
+        cached = dashboard_cache.get(user_id)
+        if cached and cached[0] == today:
+            return cached[1]
+        
+        summary = self._build_dashboard_summary(db, user_id, today)
+        dashboard_cache.set(user_id, (today, summary))
+        return summary
+
+    def invalidate_dashboard(self, user_id: int):
+        """Drop the cached dashboard summary after a write to the user's health data"""
+        dashboard_cache.invalidate(user_id)
+
+    def _build_dashboard_summary(self, db: Session, user_id: int, today: date):
         profile = self.get_health_profile(db, user_id)
         
-        today = date.today()
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
+        Activity, Sleep, Rollup = models.ActivityRecord, models.SleepRecord, models.VitalRollup
+        
+        # One row of today / week / month figures, aggregated in the database
+        activity = select(
+            func.coalesce(func.sum(case((Activity.date == today, Activity.steps))), 0).label("today_steps"),
+            func.coalesce(func.sum(case((Activity.date == today, Activity.active_calories))), 0).label("today_active_calories"),
+            func.coalesce(func.sum(case((Activity.date == today, Activity.distance))), 0).label("today_distance"),
+            func.coalesce(func.sum(case((Activity.date >= week_ago, Activity.steps))), 0).label("week_total_steps"),
+            func.avg(Activity.steps).label("month_avg_steps"),
+            func.coalesce(func.sum(Activity.distance), 0).label("month_total_distance")
+        ).where(
+            Activity.user_id == user_id,
+            Activity.date >= month_ago,
+            Activity.date <= today
+        ).subquery()
         
-        # Today's stats
-        today_activity = db.query(models.ActivityRecord).filter(
-            models.ActivityRecord.user_id == user_id,
-            models.ActivityRecord.date == today
-        ).first()
+        sleep = select(
+            func.coalesce(func.sum(case((Sleep.date == today, Sleep.total_duration))), 0).label("today_sleep"),
+            func.avg(case((Sleep.date >= week_ago, Sleep.total_duration))).label("week_avg_sleep"),
+            func.avg(Sleep.total_duration).label("month_avg_sleep")
+        ).where(
+            Sleep.user_id == user_id,
+            Sleep.date >= month_ago,
+            Sleep.date <= today
+        ).subquery()
         
-        last_night_sleep = db.query(models.SleepRecord).filter(
-            models.SleepRecord.user_id == user_id,
-            models.SleepRecord.date == today
-        ).first()
+        heart_rate = select(
+            func.sum(Rollup.sum_value).label("month_hr_sum"),
+            func.sum(Rollup.sample_count).label("month_hr_count")
+        ).where(
+            Rollup.user_id == user_id,
+            Rollup.metric == "heart_rate",
+            Rollup.granularity == "day",
+            Rollup.bucket_start >= datetime.combine(month_ago, datetime.min.time())
+        ).subquery()
         
-        latest_heart_rate = db.query(models.VitalRecord).filter(
+        latest_heart_rate = select(models.VitalRecord.heart_rate).where(
             models.VitalRecord.user_id == user_id,
             models.VitalRecord.heart_rate.isnot(None)
-        ).order_by(models.VitalRecord.recorded_at.desc()).first()
+        ).order_by(models.VitalRecord.recorded_at.desc()).limit(1).scalar_subquery()
         
-        today_stats = {
-            "steps": today_activity.steps if today_activity else 0,
-            "active_calories": today_activity.active_calories if today_activity else 0,
-            "distance": today_activity.distance if today_activity else 0,
-            "sleep_duration": last_night_sleep.total_duration if last_night_sleep else 0,
-            "heart_rate": latest_heart_rate.heart_rate if latest_heart_rate else None
-        }
+        # Each subquery yields exactly one row, so they are joined unconditionally
+        totals = db.execute(
+            select(activity, sleep, heart_rate, latest_heart_rate.label("latest_heart_rate")).select_from(
+                activity.join(sleep, true()).join(heart_rate, true())
+            )
+        ).one()
         
-        # Week trends (last 7 days)
-        week_activities = db.query(models.ActivityRecord).filter(
-            models.ActivityRecord.user_id == user_id,
-            models.ActivityRecord.date >= week_ago,
-            models.ActivityRecord.date <= today
+        # Daily values for the week charts
+        week_days = db.execute(
+            union_all(
+                select(literal("steps").label("kind"), Activity.date, Activity.steps.label("value")).where(
+                    Activity.user_id == user_id, Activity.date >= week_ago, Activity.date <= today
+                ),
+                select(literal("sleep").label("kind"), Sleep.date, Sleep.total_duration.label("value")).where(
+                    Sleep.user_id == user_id, Sleep.date >= week_ago, Sleep.date <= today
+                )
+            ).order_by("date")
         ).all()
         
-        week_sleep = db.query(models.SleepRecord).filter(
-            models.SleepRecord.user_id == user_id,
-            models.SleepRecord.date >= week_ago,
-            models.SleepRecord.date <= today
-        ).all()
+        today_stats = {
+            "steps": totals.today_steps,
+            "active_calories": totals.today_active_calories,
+            "distance": totals.today_distance,
+            "sleep_duration": totals.today_sleep,
+            "heart_rate": totals.latest_heart_rate
+        }
         
         week_trends = {
-            "daily_steps": [{"date": str(a.date), "steps": a.steps} for a in week_activities],
-            "daily_sleep": [{"date": str(s.date), "duration": s.total_duration} for s in week_sleep],
-            "total_steps": sum(a.steps for a in week_activities),
-            "avg_sleep": sum(s.total_duration for s in week_sleep) / len(week_sleep) if week_sleep else 0
+            "daily_steps": [{"date": str(d.date), "steps": d.value} for d in week_days if d.kind == "steps"],
+            "daily_sleep": [{"date": str(d.date), "duration": d.value} for d in week_days if d.kind == "sleep"],
+            "total_steps": totals.week_total_steps,
+            "avg_sleep": totals.week_avg_sleep or 0
         }
         
-        # Month averages (last 30 days)
-        month_activities = db.query(models.ActivityRecord).filter(
-            models.ActivityRecord.user_id == user_id,
-            models.ActivityRecord.date >= month_ago,
-            models.ActivityRecord.date <= today
-        ).all()
-        
-        month_sleep = db.query(models.SleepRecord).filter(
-            models.SleepRecord.user_id == user_id,
-            models.SleepRecord.date >= month_ago,
-            models.SleepRecord.date <= today
-        ).all()
-        
-        month_heart_rate = db.query(func.avg(models.VitalRecord.heart_rate)).filter(
-            models.VitalRecord.user_id == user_id,
-            models.VitalRecord.recorded_at >= datetime.combine(month_ago, datetime.min.time()),
-            models.VitalRecord.heart_rate.isnot(None)
-        ).scalar()
-        
         month_averages = {
-            "avg_steps": int(sum(a.steps for a in month_activities) / len(month_activities)) if month_activities else 0,
-            "avg_sleep": int(sum(s.total_duration for s in month_sleep) / len(month_sleep)) if month_sleep else 0,
-            "avg_heart_rate": int(month_heart_rate) if month_heart_rate else None,
-            "total_distance": sum(a.distance for a in month_activities)
+            "avg_steps": int(totals.month_avg_steps or 0),
+            "avg_sleep": int(totals.month_avg_sleep or 0),
+            "avg_heart_rate": int(totals.month_hr_sum / totals.month_hr_count) if totals.month_hr_count else None,
+            "total_distance": totals.month_total_distance
         }
         
         return schemas.DashboardSummary(
@@ -297,8 +399,11 @@ class DashboardService:
     async def get_health_advice(self, topic: str):
         return await ai_service.get_health_advice(topic)
 
-    def generate_insight(self, user_id: int, query: str):
-        return rag_service.generate_insight(user_id, query)
+    async def generate_insight(self, user_id: int, query: str):
+        return await async_rag_service.generate_insight(user_id, query)
+
+    def stream_insight(self, user_id: int, query: str, validate=None):
+        return async_rag_service.stream_insight(user_id, query, validate)
 
     def extract_text_from_pdf(self, file_path: str) -> Optional[str]:
         """Extract text from PDF file"""
@@ -314,62 +419,85 @@ class DashboardService:
             return None
 
     def process_refresh_embeddings(self, user_id: int, db: Session):
+        """
+        Sync the user's RAG documents with their current rows. Only documents whose
+        source row changed are rebuilt and re-embedded; removed rows are deleted.
+        Returns counts of unchanged, updated and deleted documents.
+        """
         try:
             logger.info(f"Starting embedding refresh for user {user_id}")
-            
-            # 1. Personal Info
-            profile = db.query(models.HealthProfile).filter(models.HealthProfile.user_id == user_id).first()
-            if profile:
-                content = f"Personal Info: DOB: {profile.date_of_birth}, Sex: {profile.biological_sex}, Blood Type: {profile.blood_type}, Height: {profile.height}cm, Weight: {profile.current_weight}kg"
-                rag_service.upsert_data(user_id, "personal_info", content, {"source": "health_profile"})
-
-            # 2. Appointments
-            appointments = db.query(Appointment).filter(Appointment.user_id == user_id).all()
-            for appt in appointments:
-                content = f"Appointment: Dr. {appt.doctor_name} ({appt.specialty}), Date: {appt.appointment_date}, Reason: {appt.reason}"
-                rag_service.upsert_data(user_id, "appointment", content, {"appointment_id": appt.id})
-
-            # 3. Medications
-            medications = db.query(Medication).filter(Medication.user_id == user_id, Medication.is_active == True).all()
-            for med in medications:
-                content = f"Medication: {med.medication_name}, Dosage: {med.dosage}, Frequency: {med.frequency}, Start Date: {med.start_date}, Notes: {med.notes}"
-                rag_service.upsert_data(user_id, "medication", content, {"medication_id": med.id})
-
-            # 4. Health Records with PDF extraction
-            records = db.query(HealthRecord).filter(HealthRecord.user_id == user_id).all()
-            for record in records:
-                content = f"Health Record: {record.title} ({record.record_type}), Date: {record.record_date}, Description: {record.description}"
-                
-                # Extract PDF content if file exists
-                if record.file_url:
-                    filename = record.file_url.split('/')[-1]
-                    file_path = os.path.join(UPLOAD_DIR, filename)
-                    
-                    if os.path.exists(file_path):
-                        extracted_text = self.extract_text_from_pdf(file_path)
-                        if extracted_text:
-                            content += f"\n\nExtracted File Content:\n{extracted_text}"
-                            logger.info(f"Extracted {len(extracted_text)} characters from {filename}")
-                
-                rag_service.upsert_data(user_id, "health_record", content, {"record_id": record.id})
-
-            # 5. Sleep Summary (Last 30 records)
-            sleep_records = db.query(models.SleepRecord).filter(models.SleepRecord.user_id == user_id).order_by(models.SleepRecord.date.desc()).limit(30).all()
-            if sleep_records:
-                 avg_duration = sum(s.total_duration for s in sleep_records) / len(sleep_records)
-                 content = f"Sleep Summary (Last 30 records): Average Duration: {avg_duration:.1f} mins. Latest: {sleep_records[0].date} - {sleep_records[0].total_duration} mins."
-                 rag_service.upsert_data(user_id, "sleep_summary", content, {"count": len(sleep_records)})
-
-            # 6. Activity Summary (Last 30 records)
-            activity_records = db.query(models.ActivityRecord).filter(models.ActivityRecord.user_id == user_id).order_by(models.ActivityRecord.date.desc()).limit(30).all()
-            if activity_records:
-                 avg_steps = sum(a.steps for a in activity_records) / len(activity_records)
-                 content = f"Activity Summary (Last 30 records): Average Steps: {int(avg_steps)}. Latest: {activity_records[0].date} - {activity_records[0].steps} steps."
-                 rag_service.upsert_data(user_id, "activity_summary", content, {"count": len(activity_records)})
-
-            logger.info(f"Completed embedding refresh for user {user_id}")
+            sources = self.rag_sources(user_id, db)
+            counts = sync_user_documents(rag_service, user_id, REFRESH_DATA_TYPES, sources)
+            logger.info(
+                f"Completed embedding refresh for user {user_id}: {counts}, "
+                f"embedding cache {rag_service.embedding_cache.stats()}"
+            )
+            return counts
             
         except Exception as e:
             logger.error(f"Error refreshing embeddings: {e}")
+            raise
+
+    def rag_sources(self, user_id: int, db: Session) -> List[RAGSource]:
+        """The user's RAG documents (REFRESH_DATA_TYPES) as sources built from their SQL rows"""
+        sources = []
+
+        # 1. Personal Info
+        profile = db.query(models.HealthProfile).filter(models.HealthProfile.user_id == user_id).first()
+        if profile:
+            content = f"Personal Info: DOB: {profile.date_of_birth}, Sex: {profile.biological_sex}, Blood Type: {profile.blood_type}, Height: {profile.height}cm, Weight: {profile.current_weight}kg"
+            sources.append(RAGSource("personal_info", "personal_info", fingerprint(content), lambda content=content: content, {"source": "health_profile"}))
+
+        # 2. Appointments
+        appointments = db.query(Appointment).filter(Appointment.user_id == user_id).all()
+        for appt in appointments:
+            content = f"Appointment: Dr. {appt.doctor_name} ({appt.specialty}), Date: {appt.appointment_date}, Reason: {appt.reason}"
+            sources.append(RAGSource(f"appointment:{appt.id}", "appointment", fingerprint(content), lambda content=content: content, {"appointment_id": appt.id}))
+
+        # 3. Medications
+        medications = db.query(Medication).filter(Medication.user_id == user_id, Medication.is_active == True).all()
+        for med in medications:
+            content = f"Medication: {med.medication_name}, Dosage: {med.dosage}, Frequency: {med.frequency}, Start Date: {med.start_date}, Notes: {med.notes}"
+            sources.append(RAGSource(f"medication:{med.id}", "medication", fingerprint(content), lambda content=content: content, {"medication_id": med.id}))
+
+        # 4. Health Records; the attached file is only re-extracted when the row or file changed
+        records = db.query(HealthRecord).filter(HealthRecord.user_id == user_id).all()
+        for record in records:
+            file_path = os.path.join(UPLOAD_DIR, record.file_url.split('/')[-1]) if record.file_url else None
+            if file_path and not os.path.exists(file_path):
+                file_path = None
+            source = health_record_source(record, file_path)
+            sources.append(RAGSource(
+                source["source_key"], "health_record", source["source_fingerprint"],
+                lambda record=record, file_path=file_path: self._health_record_chunks(record, file_path),
+                {"record_id": record.id}
+            ))
+
+        # 5. Sleep Summary (Last 30 records)
+        sleep_records = db.query(models.SleepRecord).filter(models.SleepRecord.user_id == user_id).order_by(models.SleepRecord.date.desc()).limit(30).all()
+        if sleep_records:
+             avg_duration = sum(s.total_duration for s in sleep_records) / len(sleep_records)
+             content = f"Sleep Summary (Last 30 records): Average Duration: {avg_duration:.1f} mins. Latest: {sleep_records[0].date} - {sleep_records[0].total_duration} mins."
+             sources.append(RAGSource("sleep_summary", "sleep_summary", fingerprint(content), lambda content=content: content, {"count": len(sleep_records)}))
+
+        # 6. Activity Summary (Last 30 records)
+        activity_records = db.query(models.ActivityRecord).filter(models.ActivityRecord.user_id == user_id).order_by(models.ActivityRecord.date.desc()).limit(30).all()
+        if activity_records:
+             avg_steps = sum(a.steps for a in activity_records) / len(activity_records)
+             content = f"Activity Summary (Last 30 records): Average Steps: {int(avg_steps)}. Latest: {activity_records[0].date} - {activity_records[0].steps} steps."
+             sources.append(RAGSource("activity_summary", "activity_summary", fingerprint(content), lambda content=content: content, {"count": len(activity_records)}))
+
+        return sources
+
+    def _health_record_chunks(self, record: HealthRecord, file_path: Optional[str]) -> List[str]:
+        header = f"Health Record: {record.title} ({record.record_type}), Date: {record.record_date}, Description: {record.description}"
+        extracted_text = None
+        
+        # Extract PDF content if file exists
+        if file_path:
+            extracted_text = self.extract_text_from_pdf(file_path)
+            if extracted_text:
+                logger.info(f"Extracted {len(extracted_text)} characters from {os.path.basename(file_path)}")
+        return text_chunker.chunk_document(header, extracted_text)
 
 dashboard_service = DashboardService()
@@ -165,7 +165,7 @@ from app.modules.health_records.service import health_record_service
 from app.modules.medications.service import medication_service
 from app.modules.appointments.models import Appointment
 from app.modules.chat.schemas import ChatMessage
-from app.services.rag_service import rag_service
+from app.services.async_rag_service import async_rag_service, RAGTimeoutError
 
 def verify_doctor_patient_relationship(db: Session, doctor_id: int, patient_id: int):
     """Verify that the doctor has an appointment with the patient"""
@@ -248,6 +248,9 @@ async def chat_about_patient(
     verify_doctor_patient_relationship(db, current_doctor.id, patient_id)
     
     # Get AI response using RAG
-    response = rag_service.answer_doctor_query(patient_id, chat_message.message)
+    try:
+        response = await async_rag_service.answer_doctor_query(patient_id, chat_message.message)
+    except RAGTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     
     return {"response": response}
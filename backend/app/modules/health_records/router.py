@@ -5,6 +5,7 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from app.modules.health_records import schemas
 from app.modules.health_records.service import health_record_service, UPLOAD_DIR
+from app.modules.privacy.erasure import erasure_pending
 from app.modules.auth.models import User
 from typing import List
 import os
@@ -15,11 +16,14 @@ router = APIRouter()
 @router.post("/health-records/upload")
 async def upload_health_record_file(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Upload a health record file (PDF, images, documents)
     """
+    if erasure_pending(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Your health data is being erased; try again once it has finished")
     return await health_record_service.upload_file(file, current_user.id)
 
 @router.get("/health-records/download/{filename}")
@@ -58,6 +62,8 @@ async def create_health_record(
     """
     Create a new health record with automatic text extraction from uploaded files
     """
+    if erasure_pending(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Your health data is being erased; try again once it has finished")
     return health_record_service.create_health_record(db, record, current_user.id)
 
 @router.get("/health-records", response_model=List[schemas.HealthRecordResponse])
@@ -2,12 +2,14 @@ from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException
 from app.modules.health_records import models, schemas
 from app.services.rag_service import rag_service
+from app.services.rag_sync import fingerprint
+from app.services.text_chunker import text_chunker
 import os
 import shutil
 from datetime import datetime
 import PyPDF2
 import logging
-from typing import Optional
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,21 @@ UPLOAD_DIR = "uploads/health_records"
 ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.docx', '.doc'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+def health_record_source(record: models.HealthRecord, file_path: Optional[str]) -> Dict[str, str]:
+    """
+    source_key / source_fingerprint of a record's RAG points, as the embedding
+    refresh computes them; the file only counts while it exists
+    """
+    file_stat = os.stat(file_path) if file_path and os.path.exists(file_path) else None
+    return {
+        "source_key": f"health_record:{record.id}",
+        "source_fingerprint": fingerprint(
+            record.title, record.record_type, record.record_date, record.description, record.file_url,
+            (file_stat.st_size, file_stat.st_mtime) if file_stat else None,
+            (text_chunker.chunk_tokens, text_chunker.overlap_tokens)
+        )
+    }
+
 class HealthRecordService:
     def __init__(self):
         os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -85,7 +102,9 @@ class HealthRecordService:
         # Trigger RAG ingestion with file content extraction
         try:
             # Start with basic record info
-            content = f"Health Record: {db_record.title} ({db_record.record_type}), Date: {db_record.record_date}, Description: {db_record.description}"
+            header = f"Health Record: {db_record.title} ({db_record.record_type}), Date: {db_record.record_date}, Description: {db_record.description}"
+            extracted_text = None
+            file_path = None
             
             # If there's an uploaded file, extract its text content
             if db_record.file_url:
@@ -95,17 +114,20 @@ class HealthRecordService:
                 if os.path.exists(file_path):
                     extracted_text = self.extract_text_from_file(file_path)
                     if extracted_text:
-                        # Append extracted file content to the record
-                        content += f"\n\nExtracted File Content:\n{extracted_text}"
                         logger.info(f"Extracted {len(extracted_text)} characters from {filename}")
             
-            # Upsert to RAG with complete content
-            rag_service.upsert_data(
-                user_id=user_id,
-                data_type="health_record",
-                content=content,
-                metadata={"record_id": db_record.id}
-            )
+            # One point per token window of the file text, each tagged with record_id / chunk_index
+            # and the refresh's source key, so the next refresh leaves them alone
+            chunks = text_chunker.chunk_document(header, extracted_text)
+            source = health_record_source(db_record, file_path)
+            rag_service.upsert_many(user_id, [
+                {
+                    "data_type": "health_record",
+                    "content": chunk,
+                    "metadata": {"record_id": db_record.id, **source, "chunk_index": i, "chunk_count": len(chunks)}
+                }
+                for i, chunk in enumerate(chunks)
+            ])
             logger.info(f"Successfully indexed health record {db_record.id} to RAG")
         except Exception as e:
             logger.error(f"Error triggering RAG ingestion: {e}")
@@ -129,7 +151,7 @@ class HealthRecordService:
         if not record:
             return False
         
-        # Delete from RAG first
+        # Delete from RAG first (every chunk carries the record_id)
         try:
             rag_service.delete_by_metadata(
                 user_id=user_id,
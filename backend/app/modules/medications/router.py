@@ -4,6 +4,7 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from app.modules.medications import schemas
 from app.modules.medications.service import medication_service
+from app.modules.privacy.erasure import erasure_pending
 from app.modules.auth.models import User
 from typing import List
 
@@ -19,6 +20,8 @@ async def create_medication(
     """
     Add a new medication for a user
     """
+    if erasure_pending(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Your health data is being erased; try again once it has finished")
     return medication_service.create_medication(db, medication, current_user.id, background_tasks)
 
 @router.get("/medications", response_model=List[schemas.MedicationResponse])
@@ -61,6 +64,8 @@ async def update_medication(
     """
     Update a medication
     """
+    if erasure_pending(db, current_user.id):
+        raise HTTPException(status_code=409, detail="Your health data is being erased; try again once it has finished")
     # Check ownership
     db_medication = medication_service.get_medication_by_id(db, medication_id)
     if not db_medication:
@@ -0,0 +1,323 @@
+"""
+Background erasure of a user's data.
+
+POST /api/privacy/erasure records an ErasureJob and returns straight away; a
+small worker pool then deletes, in order:
+
+  imports  (not a deletion) cancels the user's queued health imports and waits
+           for a running one to finish, so no import writes data back
+  files    uploaded health record files and leftover health export uploads
+  records  health rows (and, for account erasure, appointments, reviews,
+           chats, voice sessions and contact messages sent from the account's email)
+  vectors  the user's points in every health_insights collection, with their
+           cached embeddings and answers
+  account  the users row
+
+Vectors go after the rows they are built from, so an embedding refresh that
+runs meanwhile has nothing left to index. While a health_data or account
+erasure is pending, new imports, refreshes, health records and medications are
+refused (erasure_pending), and so are appointments during account erasure.
+
+Every stage deletes in small batches, each in its own short transaction with
+a pause in between, so API requests keep getting the database. The current
+stage and counters are persisted after each batch. Deleting is idempotent, so
+a job interrupted by a restart is resumed from its stage at startup
+(resume_pending), and re-running a stage only finds what is left.
+"""
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.modules.appointments.models import Appointment
+from app.modules.auth.models import User
+from app.modules.chat.models import ChatConversation
+from app.modules.contact.models import ContactMessage
+from app.modules.dashboard import models as dashboard_models
+from app.modules.dashboard.service import dashboard_service
+from app.modules.health_records.models import HealthRecord
+from app.modules.health_records.service import UPLOAD_DIR
+from app.modules.medications.models import Medication
+from app.modules.privacy.models import ErasureJob
+from app.modules.reviews.models import DoctorReview
+from app.modules.voice_agent.models import VoiceSession
+from app.services.rag_service import rag_service
+
+logger = logging.getLogger(__name__)
+
+STAGES = {
+    "vectors": ["vectors"],
+    "health_data": ["imports", "files", "records", "vectors"],
+    "account": ["imports", "files", "records", "vectors", "account"],
+}
+FINISHED_STAGES = ("completed", "failed")
+# Scopes that delete the rows imports and refreshes read and write
+DATA_SCOPES = ("health_data", "account")
+
+# Health rows, deleted for health_data and account erasure
+HEALTH_TABLES = [
+    (HealthRecord, HealthRecord.user_id),
+    (Medication, Medication.user_id),
+    (dashboard_models.HealthProfile, dashboard_models.HealthProfile.user_id),
+    (dashboard_models.SleepRecord, dashboard_models.SleepRecord.user_id),
+    (dashboard_models.ActivityRecord, dashboard_models.ActivityRecord.user_id),
+    (dashboard_models.VitalRecord, dashboard_models.VitalRecord.user_id),
+    (dashboard_models.VitalRollup, dashboard_models.VitalRollup.user_id),
+    (dashboard_models.BodyMeasurement, dashboard_models.BodyMeasurement.user_id),
+    (dashboard_models.HealthImportWatermark, dashboard_models.HealthImportWatermark.user_id),
+    (dashboard_models.HealthImportJob, dashboard_models.HealthImportJob.user_id),
+]
+# Further rows referencing the user, deleted for account erasure; reviews before their appointments
+ACCOUNT_TABLES = [
+    (DoctorReview, DoctorReview.patient_id),
+    (Appointment, Appointment.user_id),
+    (ChatConversation, ChatConversation.user_id),
+    (VoiceSession, VoiceSession.user_id),
+]
+
+
+def erasure_pending(db: Session, user_id: int, scopes: Tuple[str, ...] = DATA_SCOPES) -> bool:
+    """Whether an erasure of the user in one of scopes (health_data or account by default) is queued or running"""
+    return db.query(ErasureJob.id).filter(
+        ErasureJob.user_id == user_id,
+        ErasureJob.scope.in_(scopes),
+        ErasureJob.stage.notin_(FINISHED_STAGES)
+    ).first() is not None
+
+
+class ErasureJobRunner:
+    def __init__(self, max_workers: int, batch_size: int = 500, batch_pause_ms: float = 20,
+                 import_wait_seconds: float = 900):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="erasure")
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause_ms / 1000
+        self.import_wait = import_wait_seconds
+        self.import_poll = 1.0
+
+    def submit(self, db: Session, user_id: int, scope: str) -> ErasureJob:
+        """Queue an erasure, or return the user's unfinished job for the same scope"""
+        job = db.query(ErasureJob).filter(
+            ErasureJob.user_id == user_id,
+            ErasureJob.scope == scope,
+            ErasureJob.stage.notin_(FINISHED_STAGES)
+        ).first()
+        if job:
+            return job
+
+        job = ErasureJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            scope=scope,
+            stage="queued",
+            points_deleted=0,
+            files_deleted=0,
+            rows_deleted=0,
+            attempts=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        self.executor.submit(self._run, job.id)
+        logger.info(f"Queued {scope} erasure job {job.id} for user {user_id}")
+        return job
+
+    def resume_pending(self) -> int:
+        """Hand jobs interrupted by a restart back to the worker pool (run at startup)"""
+        db = SessionLocal()
+        try:
+            job_ids = [row.id for row in db.query(ErasureJob.id).filter(ErasureJob.stage.notin_(FINISHED_STAGES))]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self.executor.submit(self._run, job_id)
+        if job_ids:
+            logger.info(f"Resuming {len(job_ids)} erasure jobs")
+        return len(job_ids)
+
+    def get_job(self, db: Session, job_id: str) -> Optional[ErasureJob]:
+        return db.query(ErasureJob).filter(ErasureJob.id == job_id).first()
+
+    def describe(self, job: ErasureJob) -> Dict:
+        return {
+            "job_id": job.id,
+            "scope": job.scope,
+            "stage": job.stage,
+            "points_deleted": job.points_deleted or 0,
+            "files_deleted": job.files_deleted or 0,
+            "rows_deleted": job.rows_deleted or 0,
+            "attempts": job.attempts or 0,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+
+    def _persist(self, job_id: str, **fields):
+        """Write job fields in their own short transaction"""
+        db = SessionLocal()
+        try:
+            db.query(ErasureJob).filter(ErasureJob.id == job_id).update(fields)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self, job_id: str):
+        db = SessionLocal()
+        try:
+            job = db.query(ErasureJob).filter(ErasureJob.id == job_id).first()
+            if not job or job.stage in FINISHED_STAGES:
+                return
+            user_id, scope, stage, attempts = job.user_id, job.scope, job.stage, job.attempts or 0
+            counters = {
+                "points_deleted": job.points_deleted or 0,
+                "files_deleted": job.files_deleted or 0,
+                "rows_deleted": job.rows_deleted or 0,
+            }
+            started_at = job.started_at or datetime.utcnow()
+        finally:
+            db.close()
+
+        stages = STAGES[scope]
+        # Stages before the persisted one already finished
+        remaining = stages[stages.index(stage):] if stage in stages else stages
+        self._persist(job_id, attempts=attempts + 1, started_at=started_at)
+
+        def save():
+            self._persist(job_id, **counters)
+
+        try:
+            for current in remaining:
+                self._persist(job_id, stage=current)
+                getattr(self, f"_erase_{current}")(user_id, scope, counters, save)
+            self._persist(job_id, stage="completed", error=None, finished_at=datetime.utcnow(), **counters)
+            logger.info(f"Erasure job {job_id} ({scope}) for user {user_id} completed: {counters}")
+        except Exception as e:
+            logger.error(f"Erasure job {job_id} ({scope}) for user {user_id} failed: {e}")
+            self._persist(job_id, stage="failed", error=str(e), finished_at=datetime.utcnow(), **counters)
+
+    def _pause(self):
+        if self.batch_pause:
+            time.sleep(self.batch_pause)
+
+    def _erase_imports(self, user_id: int, scope: str, counters: Dict, save: Callable):
+        """Cancel the user's queued health imports and wait until none is running"""
+        import_job = dashboard_models.HealthImportJob
+        db = SessionLocal()
+        try:
+            # Conditional on the stage, so a worker that claims the job at the same time wins or loses cleanly
+            db.query(import_job).filter(import_job.user_id == user_id, import_job.stage == "queued").update(
+                {"stage": "failed", "error": "Cancelled: data erasure requested", "finished_at": datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        deadline = time.monotonic() + self.import_wait
+        while True:
+            db = SessionLocal()
+            try:
+                running = [row.id for row in db.query(import_job.id).filter(
+                    import_job.user_id == user_id,
+                    import_job.stage.notin_(FINISHED_STAGES)
+                )]
+            finally:
+                db.close()
+            if not running:
+                return
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Health import {running[0]} still running after {self.import_wait}s")
+            time.sleep(self.import_poll)
+
+    def _erase_vectors(self, user_id: int, scope: str, counters: Dict, save: Callable):
+        for collection_name in rag_service.user_collections():
+            while True:
+                deleted = rag_service.purge_user_batch(user_id, collection_name, self.batch_size)
+                if not deleted:
+                    break
+                counters["points_deleted"] += deleted
+                save()
+                self._pause()
+        rag_service.answer_cache.invalidate_user(user_id)
+
+    def _user_files(self, user_id: int) -> List[str]:
+        db = SessionLocal()
+        try:
+            paths = [
+                os.path.join(UPLOAD_DIR, os.path.basename(row.file_url))
+                for row in db.query(HealthRecord.file_url).filter(HealthRecord.user_id == user_id, HealthRecord.file_url.isnot(None))
+            ]
+            paths.extend(
+                row.file_path
+                for row in db.query(dashboard_models.HealthImportJob.file_path).filter(
+                    dashboard_models.HealthImportJob.user_id == user_id,
+                    dashboard_models.HealthImportJob.file_path.isnot(None)
+                )
+            )
+            return paths
+        finally:
+            db.close()
+
+    def _erase_files(self, user_id: int, scope: str, counters: Dict, save: Callable):
+        paths = self._user_files(user_id)
+        for start in range(0, len(paths), self.batch_size):
+            for path in paths[start:start + self.batch_size]:
+                if os.path.exists(path):
+                    os.remove(path)
+                    counters["files_deleted"] += 1
+            save()
+            self._pause()
+
+    def _delete_rows(self, model, column, value, counters: Dict, save: Callable):
+        while True:
+            db = SessionLocal()
+            try:
+                ids = [row.id for row in db.query(model.id).filter(column == value).limit(self.batch_size)]
+                if not ids:
+                    return
+                db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            counters["rows_deleted"] += len(ids)
+            save()
+            self._pause()
+
+    def _erase_records(self, user_id: int, scope: str, counters: Dict, save: Callable):
+        tables: List[Tuple] = HEALTH_TABLES + (ACCOUNT_TABLES if scope == "account" else [])
+        for model, column in tables:
+            self._delete_rows(model, column, user_id, counters, save)
+        if scope == "account":
+            # The contact form is not tied to a user; messages are matched by the account's email
+            email = self._user_email(user_id)
+            if email:
+                self._delete_rows(ContactMessage, ContactMessage.email, email, counters, save)
+        dashboard_service.invalidate_dashboard(user_id)
+
+    @staticmethod
+    def _user_email(user_id: int) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            user = db.query(User.email).filter(User.id == user_id).first()
+            return user.email if user else None
+        finally:
+            db.close()
+
+    def _erase_account(self, user_id: int, scope: str, counters: Dict, save: Callable):
+        self._delete_rows(User, User.id, user_id, counters, save)
+
+
+erasure_job_runner = ErasureJobRunner(
+    max_workers=settings.ERASURE_WORKERS,
+    batch_size=settings.ERASURE_BATCH_SIZE,
+    batch_pause_ms=settings.ERASURE_BATCH_PAUSE_MS,
+    import_wait_seconds=settings.ERASURE_IMPORT_WAIT_SECONDS
+)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ErasureJob(Base):
+    __tablename__ = "erasure_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid hex; also the token for the status endpoint
+    user_id = Column(Integer, index=True)  # no foreign key: the user row may be erased by the job
+    scope = Column(String)  # vectors, health_data, account
+    stage = Column(String, default="queued")  # queued, vectors, files, records, account, completed, failed
+    points_deleted = Column(Integer, default=0)
+    files_deleted = Column(Integer, default=0)
+    rows_deleted = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)  # runs started, including resumes after a restart
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.modules.auth.models import User
+from app.modules.privacy import schemas
+from app.modules.privacy.erasure import erasure_job_runner
+
+router = APIRouter()
+
+@router.post("/erasure", response_model=schemas.ErasureJobCreated, status_code=202)
+async def request_erasure(
+    request: schemas.ErasureRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Erase the authenticated user's data in the background: RAG vectors only, health data
+    (vectors, uploaded files and health rows) or the whole account. Keep the returned
+    status URL; after account erasure it is the only way to follow the job.
+    """
+    job = erasure_job_runner.submit(db, current_user.id, request.scope)
+    return {
+        "job_id": job.id,
+        "scope": job.scope,
+        "stage": job.stage,
+        "status_url": f"/api/privacy/erasure/{job.id}"
+    }
+
+@router.get("/erasure/{job_id}", response_model=schemas.ErasureJobResponse)
+async def get_erasure(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Get stage and deletion counts of an erasure job. Not authenticated, since the
+    account may already be gone: the random job id is the credential, and the
+    response holds no personal data.
+    """
+    job = erasure_job_runner.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Erasure job not found")
+    return erasure_job_runner.describe(job)
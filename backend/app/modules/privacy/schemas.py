@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+from datetime import datetime
+
+class ErasureRequest(BaseModel):
+    # vectors: RAG points only; health_data: also uploaded files and health rows; account: everything
+    scope: Literal["vectors", "health_data", "account"] = "account"
+
+class ErasureJobCreated(BaseModel):
+    job_id: str
+    scope: str
+    stage: str
+    status_url: str
+
+class ErasureJobResponse(BaseModel):
+    job_id: str
+    scope: str
+    stage: str
+    points_deleted: int
+    files_deleted: int
+    rows_deleted: int
+    attempts: int
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
@@ -0,0 +1,119 @@
+"""
+Per-user semantic cache of generated RAG answers.
+
+An answer is reused when a later query from the same user (and for the same
+kind of answer, e.g. "insight" or "doctor") has an embedding within the
+similarity threshold of the cached query AND retrieval returned the same
+document set. A hit skips rerank and generation. Every write to a user's RAG
+documents invalidates that user's entries; entries also expire after a TTL and
+the cache is capped with LRU eviction.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, List, Optional, Set
+
+
+def documents_fingerprint(docs: List[Dict]) -> str:
+    """Order-independent hash of the retrieved documents' content"""
+    digests = sorted(hashlib.sha256((doc.get("content") or "").encode("utf-8")).hexdigest() for doc in docs)
+    return hashlib.sha256("".join(digests).encode("utf-8")).hexdigest()
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class _Entry:
+    __slots__ = ("user_id", "kind", "vector", "documents", "answer", "context", "expires_at")
+
+    def __init__(self, user_id, kind, vector, documents, answer, context, expires_at):
+        self.user_id = user_id
+        self.kind = kind
+        self.vector = vector
+        self.documents = documents
+        self.answer = answer
+        self.context = context
+        self.expires_at = expires_at
+
+
+class SemanticAnswerCache:
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_user: Dict[int, Set[int]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, kind: str, query_vector: List[float], documents: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached {"answer", "context"} for a similar query over the same documents
+        (documents is a documents_fingerprint), or None
+        """
+        if self.ttl_seconds <= 0:
+            return None
+        query = _normalize(query_vector)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_similarity = None, self.similarity_threshold
+            for entry_id in list(self._by_user.get(user_id, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at < now:
+                    self._remove(entry_id)
+                    continue
+                if entry.kind != kind or entry.documents != documents:
+                    continue
+                similarity = sum(a * b for a, b in zip(query, entry.vector))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return {"answer": entry.answer, "context": entry.context}
+
+    def put(self, user_id: int, kind: str, query_vector: List[float], documents: str, answer: str, context: Any = None):
+        if self.ttl_seconds <= 0:
+            return
+        entry = _Entry(user_id, kind, _normalize(query_vector), documents, answer, context,
+                       time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._by_user.setdefault(user_id, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached answer for a user (their documents changed)"""
+        with self._lock:
+            for entry_id in list(self._by_user.get(user_id, ())):
+                self._remove(entry_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        user_entries = self._by_user[entry.user_id]
+        user_entries.discard(entry_id)
+        if not user_entries:
+            del self._by_user[entry.user_id]
@@ -0,0 +1,285 @@
+"""
+Async variant of the RAG pipeline for request handlers.
+
+Embedding, retrieval, rerank and generation are awaited with AsyncOpenAI,
+AsyncQdrantClient and cohere.AsyncClient, so a slow insight no longer blocks the
+event loop. Each stage has its own timeout. Configuration, prompts and the
+embedding cache are shared with the sync RAGService, which keeps handling
+indexing. Local (non-API) embedders run in a worker thread.
+
+Local-path Qdrant only allows one client per storage directory, so without
+QDRANT_URL searches go through the sync service's local client in a worker thread.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import cohere
+from openai import AsyncOpenAI
+from qdrant_client import AsyncQdrantClient
+
+from app.services.answer_cache import documents_fingerprint
+from app.services.qdrant_layout import search_request, user_conditions
+from app.services.sparse_encoder import sparse_encoder
+from app.services.rag_service import (
+    CHAT_MODEL, DOCTOR_SYSTEM_PROMPT, INSIGHT_SYSTEM_PROMPT, RERANK_MODEL, RAGService, build_context,
+    document_summaries, rag_service
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RAGTimeoutError(TimeoutError):
+    """A pipeline stage did not finish within its timeout"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"RAG {stage} timed out after {timeout}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class AsyncRAGService:
+    def __init__(self, sync_service: RAGService):
+        self.sync = sync_service
+        self.openai = AsyncOpenAI(api_key=sync_service.openai_api_key)
+        self.cohere = cohere.AsyncClient(sync_service.cohere_api_key)
+        self.qdrant = (
+            AsyncQdrantClient(url=sync_service.qdrant_url, api_key=sync_service.qdrant_api_key)
+            if sync_service.qdrant_url else None
+        )
+
+        self.embed_timeout = float(os.getenv("RAG_EMBED_TIMEOUT_SECONDS", "10"))
+        self.search_timeout = float(os.getenv("RAG_SEARCH_TIMEOUT_SECONDS", "5"))
+        self.rerank_timeout = float(os.getenv("RAG_RERANK_TIMEOUT_SECONDS", "5"))
+        self.generate_timeout = float(os.getenv("RAG_GENERATE_TIMEOUT_SECONDS", "60"))
+
+    async def _stage(self, stage: str, timeout: float, awaitable, deadline: Optional[float] = None):
+        """Await one stage; with a loop-time deadline, timeout is shared by several awaits"""
+        wait = timeout if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+        try:
+            return await asyncio.wait_for(awaitable, wait)
+        except asyncio.TimeoutError:
+            raise RAGTimeoutError(stage, timeout)
+
+    async def embed_text(self, text: str) -> List[float]:
+        """Embedding for text; cached content is not embedded again"""
+        cache = self.sync.embedding_cache
+        embedder = self.sync.embedder
+        # The memory tier is checked on the loop; SQLite reads and writes run in a thread
+        embedding = cache.get_from_memory(embedder.name, text)
+        if embedding is None and cache.persistent:
+            embedding = await asyncio.to_thread(cache.get, embedder.name, text)
+        if embedding is None:
+            if embedder.remote:
+                response = await self._stage("embedding", self.embed_timeout, self.openai.embeddings.create(
+                    input=[text],
+                    model=embedder.model
+                ))
+                embedding = response.data[0].embedding
+            else:
+                # CPU-bound; shares micro-batches with concurrent sync callers
+                embedding = await self._stage(
+                    "embedding", self.embed_timeout, asyncio.to_thread(self.sync.embedding_batcher.embed, text)
+                )
+            if cache.persistent:
+                await asyncio.to_thread(cache.put, embedder.name, text, embedding)
+            else:
+                cache.put(embedder.name, text, embedding)
+        return embedding
+
+    async def search(self, user_id: int, query: str, limit: int = 10, query_vector: Optional[List[float]] = None) -> List[Dict]:
+        """Retrieve relevant documents from Qdrant"""
+        if query_vector is None:
+            query_vector = await self.embed_text(query)
+        if self.sync.layout_check_due():
+            await asyncio.to_thread(self.sync.check_layout)
+        request = search_request(
+            self.sync.collection_name,
+            query_vector,
+            user_conditions(user_id, self.sync.multitenant),
+            limit,
+            sparse=sparse_encoder.encode_query(query) if self.sync.hybrid else None,
+            quantization=self.sync.quantization
+        )
+        if self.qdrant is not None:
+            search = self.qdrant.query_points(**request)
+        else:
+            search = asyncio.to_thread(self.sync.qdrant.query_points, **request)
+        result = await self._stage("search", self.search_timeout, search)
+
+        return [
+            {
+                "id": str(hit.id),
+                "content": hit.payload.get("content"),
+                "metadata": hit.payload,
+                "score": hit.score
+            }
+            for hit in result.points
+        ]
+
+    async def rerank(self, query: str, docs: List[Dict], top_n: int = 5) -> List[Dict]:
+        """Rerank documents using Cohere; falls back to retrieval order on error or timeout"""
+        if not docs:
+            return []
+        policy = self.sync.rerank_policy
+        local = policy.local_result(query, docs, top_n, fused=self.sync.hybrid)
+        if local is not None:
+            return local
+        try:
+            results = await self._stage("rerank", self.rerank_timeout, self.cohere.rerank(
+                query=query,
+                documents=[doc["content"] for doc in docs],
+                top_n=top_n,
+                model=RERANK_MODEL
+            ))
+        except Exception as e:
+            logger.error(f"Error reranking data: {e}")
+            policy.record("error")
+            return docs[:top_n]
+
+        reranked_docs = []
+        for hit in results.results:
+            doc = docs[hit.index]
+            doc["rerank_score"] = hit.relevance_score
+            reranked_docs.append(doc)
+        policy.store(query, docs, top_n, reranked_docs)
+        return reranked_docs
+
+    async def _complete(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        response = await self._stage("generation", self.generate_timeout, self.openai.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            **kwargs
+        ))
+        return response.choices[0].message.content
+
+    async def _retrieve(self, user_id: int, query: str, kind: str) -> Dict[str, Any]:
+        """
+        Embed and retrieve for a query, then look up the answer cache.
+        Returns the query vector, retrieved documents, their fingerprint and any cached answer.
+        """
+        query_vector = await self.embed_text(query)
+        retrieved_docs = await self.search(user_id, query, limit=self.sync.search_limit, query_vector=query_vector)
+        logger.info(f"[SECURITY AUDIT] Retrieved {len(retrieved_docs)} documents for user {user_id}")
+
+        documents = documents_fingerprint(retrieved_docs)
+        cached = self.sync.answer_cache.get(user_id, kind, query_vector, documents)
+        if cached:
+            logger.info(f"[SECURITY AUDIT] Served {kind} answer from answer cache for user {user_id}")
+        return {"query_vector": query_vector, "docs": retrieved_docs, "documents": documents, "cached": cached}
+
+    async def _rerank_context(self, user_id: int, query: str, retrieved_docs: List[Dict]) -> List[Dict]:
+        reranked_docs = await self.rerank(query, retrieved_docs, top_n=5)
+        logger.info(f"[SECURITY AUDIT] Reranked to {len(reranked_docs)} documents for user {user_id}")
+
+        if not reranked_docs:
+            logger.warning(f"[SECURITY AUDIT] No context data available for user {user_id}")
+        return reranked_docs
+
+    @staticmethod
+    def _insight_prompt(user_id: int, query: str, docs: List[Dict]) -> str:
+        return f"Context:\n{build_context(docs, user_id)}\n\nUser Question: {query}\n\nResponse (JSON):"
+
+    async def generate_insight(self, user_id: int, query: str) -> str:
+        """Generate insight using RAG pipeline with security audit logging"""
+        try:
+            logger.info(f"[SECURITY AUDIT] RAG query initiated - User ID: {user_id}, Query: '{query[:100]}'")
+            retrieval = await self._retrieve(user_id, query, "insight")
+            if retrieval["cached"]:
+                return retrieval["cached"]["answer"]
+
+            reranked_docs = await self._rerank_context(user_id, query, retrieval["docs"])
+            answer = await self._complete(
+                INSIGHT_SYSTEM_PROMPT, self._insight_prompt(user_id, query, reranked_docs),
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
+            self.sync.answer_cache.put(user_id, "insight", retrieval["query_vector"], retrieval["documents"],
+                                       answer, document_summaries(reranked_docs))
+            return answer
+        except Exception as e:
+            logger.error(f"Error generating insight: {e}")
+            raise
+
+    async def stream_insight(self, user_id: int, query: str,
+                             validate: Optional[Callable[[str], Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Insight generation as a sequence of (event, data) pairs: "retrieval" with
+        the context documents' metadata once rerank finishes, a "token" per
+        completion delta, then "completion" with the full response text, or
+        validate's result for it. A response validate rejects (by raising) is not
+        cached, and the error propagates. A cached answer is sent as a single
+        token. The generation timeout covers the whole stream.
+        """
+        logger.info(f"[SECURITY AUDIT] RAG stream initiated - User ID: {user_id}, Query: '{query[:100]}'")
+        retrieval = await self._retrieve(user_id, query, "insight")
+        cached = retrieval["cached"]
+        if cached:
+            yield "retrieval", cached["context"]
+            yield "token", cached["answer"]
+            yield "completion", validate(cached["answer"]) if validate else cached["answer"]
+            return
+
+        reranked_docs = await self._rerank_context(user_id, query, retrieval["docs"])
+        yield "retrieval", document_summaries(reranked_docs)
+
+        deadline = asyncio.get_running_loop().time() + self.generate_timeout
+        stream = await self._stage("generation", self.generate_timeout, self.openai.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": INSIGHT_SYSTEM_PROMPT},
+                {"role": "user", "content": self._insight_prompt(user_id, query, reranked_docs)}
+            ],
+            temperature=0.7,
+            response_format={"type": "json_object"},
+            stream=True
+        ), deadline)
+        parts = []
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await self._stage("generation", self.generate_timeout, chunks.__anext__(), deadline)
+                except StopAsyncIteration:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield "token", delta
+        finally:
+            # Stop the upstream completion if the client went away or we timed out
+            await stream.close()
+
+        answer = "".join(parts)
+        result = validate(answer) if validate else answer
+        self.sync.answer_cache.put(user_id, "insight", retrieval["query_vector"], retrieval["documents"],
+                                   answer, document_summaries(reranked_docs))
+        yield "completion", result
+
+    async def answer_doctor_query(self, patient_id: int, query: str) -> str:
+        """Answer a doctor's query about a specific patient, strictly limited to the patient's data"""
+        try:
+            logger.info(f"[SECURITY AUDIT] Doctor RAG query initiated - Patient ID: {patient_id}, Query: '{query[:100]}'")
+            retrieval = await self._retrieve(patient_id, query, "doctor")
+            if retrieval["cached"]:
+                return retrieval["cached"]["answer"]
+
+            reranked_docs = await self.rerank(query, retrieval["docs"], top_n=5)
+
+            context = build_context(reranked_docs, patient_id)
+            user_prompt = f"Context:\n{context}\n\nDoctor's Question: {query}\n\nAnswer:"
+            answer = await self._complete(DOCTOR_SYSTEM_PROMPT, user_prompt, temperature=0.3)
+            self.sync.answer_cache.put(patient_id, "doctor", retrieval["query_vector"], retrieval["documents"],
+                                       answer, document_summaries(reranked_docs))
+            return answer
+        except Exception as e:
+            logger.error(f"Error answering doctor query: {e}")
+            raise
+
+
+# Singleton instance
+async_rag_service = AsyncRAGService(rag_service)
@@ -0,0 +1,122 @@
+"""
+Token-budgeted assembly of the RAG prompt context.
+
+Documents are taken in rerank order (vector score when not reranked),
+near-identical ones are dropped, and the rest are packed into a tiktoken
+budget. When a document does not fit, it is cut at a word boundary if enough
+budget is left, otherwise left out, so the lowest-ranked documents are the
+first to be truncated or dropped.
+"""
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from app.services.text_chunker import FALLBACK_CHARS_PER_TOKEN, TextChunker, text_chunker
+
+CONTEXT_MAX_TOKENS = int(os.getenv("RAG_CONTEXT_MAX_TOKENS", "3000"))
+# A document is cut rather than dropped only if this much budget is left for it
+MIN_TRUNCATED_TOKENS = 64
+# Jaccard similarity of word shingles above which two documents count as duplicates
+DUPLICATE_SIMILARITY = 0.9
+TRUNCATION_MARKER = " [...]"
+
+
+@dataclass
+class Context:
+    text: str
+    tokens: int = 0
+    documents: int = 0
+    duplicates: int = 0
+    truncated: int = 0
+    dropped: int = 0
+    kept: List[Dict] = field(default_factory=list)
+
+
+def _shingles(text: str, size: int = 3) -> Set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextBuilder:
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS, chunker: Optional[TextChunker] = None,
+                 min_truncated_tokens: int = MIN_TRUNCATED_TOKENS):
+        self.max_tokens = max_tokens
+        self.min_truncated_tokens = min_truncated_tokens
+        # Counts with the chunker's tokenizer helpers (shared with embedding batching),
+        # including their fallback when tiktoken cannot load
+        self.chunker = chunker or text_chunker
+
+    def count_tokens(self, text: str) -> int:
+        return self.chunker.count_tokens(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text within max_tokens, cut back to a word boundary"""
+        encoding = self.chunker.encoding
+        if encoding is None:
+            prefix = text[:max_tokens * FALLBACK_CHARS_PER_TOKEN]
+        else:
+            # A token can end inside a multi-byte character
+            prefix = encoding.decode(self.chunker.encode(text)[:max_tokens]).rstrip("�")
+        if len(prefix) < len(text):
+            boundary = max(prefix.rfind(" "), prefix.rfind("\n"))
+            if boundary > len(prefix) // 2:
+                prefix = prefix[:boundary]
+        return prefix.rstrip()
+
+    def build(self, docs: List[Dict]) -> Context:
+        """Numbered "Document i: ..." context of the best documents that fit the budget"""
+        ranked = sorted(
+            docs,
+            key=lambda doc: doc.get("rerank_score") if doc.get("rerank_score") is not None else (doc.get("score") or 0.0),
+            reverse=True
+        )
+
+        context = Context(text="")
+        seen_hashes: Set[str] = set()
+        seen_shingles: List[Set[str]] = []
+        parts = []
+        remaining = self.max_tokens
+        for doc in ranked:
+            content = (doc.get("content") or "").strip()
+            normalized = " ".join(content.lower().split())
+            digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+            shingles = _shingles(normalized)
+            if digest in seen_hashes or any(_similarity(shingles, other) >= DUPLICATE_SIMILARITY for other in seen_shingles):
+                context.duplicates += 1
+                continue
+
+            prefix = f"Document {len(parts) + 1}: "
+            # Parts are joined by a blank line
+            overhead = self.count_tokens(prefix) + (1 if parts else 0)
+            tokens = self.count_tokens(content)
+            if overhead + tokens > remaining:
+                if remaining - overhead < self.min_truncated_tokens:
+                    context.dropped += 1
+                    continue
+                content = self.truncate(content, remaining - overhead - self.count_tokens(TRUNCATION_MARKER)) + TRUNCATION_MARKER
+                tokens = self.count_tokens(content)
+                context.truncated += 1
+
+            seen_hashes.add(digest)
+            seen_shingles.append(shingles)
+            parts.append(prefix + content)
+            context.kept.append(doc)
+            remaining -= overhead + tokens
+
+        context.text = "\n\n".join(parts)
+        context.tokens = self.max_tokens - remaining
+        context.documents = len(parts)
+        return context
+
+
+context_builder = ContextBuilder()
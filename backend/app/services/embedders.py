@@ -0,0 +1,158 @@
+"""
+Embedding backends for RAGService (EMBEDDING_BACKEND).
+
+  openai   text-embedding-3-small over the API (default)
+  local    an ONNX model run on the CPU in-process via fastembed
+           (pip install fastembed; LOCAL_EMBEDDING_MODEL, default
+           BAAI/bge-small-en-v1.5). No network after the model files are
+           cached, so it also works air-gapped.
+  hashing  feature-hashed term vectors; no model and no network, for tests
+           and offline development only (no semantic similarity)
+
+Each backend names its vectors (the embedding cache key) and reports their
+size, which fixes the collection's vector size when it is created. Switching
+backends therefore needs a new collection and a reindex.
+"""
+import hashlib
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.services.embedding_batcher import token_batches
+from app.services.sparse_encoder import tokenize
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("openai", "local", "hashing")
+DEFAULT_LOCAL_MODEL = "BAAI/bge-small-en-v1.5"
+
+
+class Embedder(ABC):
+    """Turns texts into dense vectors, returned in input order"""
+    name: str
+    # Calls leave the process, so async callers await a client instead of a thread
+    remote = False
+
+    @property
+    @abstractmethod
+    def vector_size(self) -> int:
+        ...
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    def warm_up(self):
+        """Load whatever the first call would otherwise wait for"""
+
+
+class OpenAIEmbedder(Embedder):
+    remote = True
+
+    def __init__(self, client, model: str = "text-embedding-3-small", vector_size: int = 1536):
+        self.client = client
+        self.model = model
+        self.name = model
+        self._vector_size = vector_size
+
+    @property
+    def vector_size(self) -> int:
+        return self._vector_size
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """As few embeddings requests as the API's input and token limits allow"""
+        embeddings = []
+        for batch in token_batches(texts):
+            response = self.client.embeddings.create(input=batch, model=self.model)
+            embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return embeddings
+
+
+class LocalEmbedder(Embedder):
+    """
+    CPU inference with fastembed. Inputs are split into batches of batch_size,
+    run concurrently on a pool of workers (ONNX Runtime releases the GIL), each
+    using up to threads intra-op threads.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_MODEL, batch_size: int = 32, workers: int = 2,
+                 threads: Optional[int] = None):
+        self.model_name = model_name
+        self.name = f"local:{model_name}"
+        self.batch_size = batch_size
+        self.threads = threads
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="local-embedder")
+        self._model = None
+        self._vector_size = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                try:
+                    from fastembed import TextEmbedding
+                except ImportError:
+                    raise RuntimeError("EMBEDDING_BACKEND=local needs fastembed (pip install fastembed)")
+                model = TextEmbedding(model_name=self.model_name, threads=self.threads)
+                # First inference also initializes the ONNX session
+                self._vector_size = len(next(iter(model.embed(["warm up"]))))
+                self._model = model
+                logger.info(f"Loaded local embedding model {self.model_name} ({self._vector_size} dims)")
+        return self._model
+
+    @property
+    def vector_size(self) -> int:
+        self._load()
+        return self._vector_size
+
+    def warm_up(self):
+        self._load()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self._model.embed(texts, batch_size=self.batch_size)]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self._load()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            return self._encode(texts) if texts else []
+        return [vector for batch in self._pool.map(self._encode, batches) for vector in batch]
+
+
+class HashingEmbedder(Embedder):
+    """Signed feature hashing of sparse_encoder terms, L2-normalized"""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    @property
+    def vector_size(self) -> int:
+        return self.dim
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for term in tokenize(text):
+                digest = int(hashlib.md5(term.encode()).hexdigest(), 16)
+                vector[digest % self.dim] += 1.0 if digest & 1 else -1.0
+            norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+            vectors.append([x / norm for x in vector])
+        return vectors
+
+
+def create_embedder(backend: str, openai_client=None, local_model: str = DEFAULT_LOCAL_MODEL,
+                    local_batch_size: int = 32, local_workers: int = 2, local_threads: Optional[int] = None) -> Embedder:
+    if backend == "openai":
+        return OpenAIEmbedder(openai_client)
+    if backend == "local":
+        return LocalEmbedder(local_model, batch_size=local_batch_size, workers=local_workers, threads=local_threads)
+    if backend == "hashing":
+        return HashingEmbedder()
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
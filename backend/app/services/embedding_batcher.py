@@ -0,0 +1,130 @@
+"""
+Batching helpers for the OpenAI embeddings endpoint.
+
+token_batches splits a list of texts into requests that stay under the
+endpoint's per-request input and token limits. Tokens are counted with the
+cl100k_base tokenizer text_chunker loads; texts over the per-input limit are
+rejected rather than sent. EmbeddingBatcher is a
+micro-batching collector: threads that each need one embedding submit their
+text, and a single worker thread sends everything that arrives within a few
+milliseconds as one embeddings request.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Iterator, List, Tuple
+
+from app.services.text_chunker import text_chunker
+
+logger = logging.getLogger(__name__)
+
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request, and 8191 tokens per input
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_TOKENS = 300000
+MAX_INPUT_TOKENS = 8191
+
+
+def count_tokens(text: str) -> int:
+    """cl100k token count of text (a character estimate if the tokenizer is unavailable)"""
+    return text_chunker.count_tokens(text)
+
+
+def check_input_tokens(text: str, max_input_tokens: int = MAX_INPUT_TOKENS) -> int:
+    """Token count of text; ValueError if it is over the per-input limit"""
+    tokens = count_tokens(text)
+    if tokens > max_input_tokens:
+        raise ValueError(f"Text of {tokens} tokens is over the embedding input limit of {max_input_tokens}")
+    return tokens
+
+
+def token_batches(texts: List[str], max_inputs: int = MAX_BATCH_INPUTS, max_tokens: int = MAX_BATCH_TOKENS,
+                  max_input_tokens: int = MAX_INPUT_TOKENS) -> Iterator[List[str]]:
+    """Yield consecutive slices of texts bounded by input count and tokens; ValueError for an oversized text"""
+    counts = [check_input_tokens(text, max_input_tokens) for text in texts]
+    start = 0
+    tokens = 0
+    for i, text_tokens in enumerate(counts):
+        if i > start and (i - start >= max_inputs or tokens + text_tokens > max_tokens):
+            yield texts[start:i]
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(texts):
+        yield texts[start:]
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding requests into shared batch calls"""
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], max_wait_ms: float = 5,
+                 max_inputs: int = 256, max_tokens: int = MAX_BATCH_TOKENS, max_input_tokens: int = MAX_INPUT_TOKENS):
+        self.embed_batch = embed_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.max_input_tokens = max_input_tokens
+        self.batches_sent = 0
+        self.texts_embedded = 0
+        self._queue: "queue.Queue[Tuple[str, Future, int]]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text; the returned future resolves to its embedding"""
+        future = Future()
+        try:
+            tokens = check_input_tokens(text, self.max_input_tokens)
+        except ValueError as e:
+            # Fail this text alone rather than the batch it would have joined
+            future.set_exception(e)
+            return future
+        self._ensure_worker()
+        self._queue.put((text, future, tokens))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[str, Future, int]]:
+        """Block for the first request, then take whatever else arrives within max_wait"""
+        batch = [self._queue.get()]
+        tokens = batch[0][2]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_inputs:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            tokens += item[2]
+            if tokens > self.max_tokens:
+                # Would push this call over the token limit; send it with a later batch
+                self._queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = self.embed_batch(texts)
+            except Exception as e:
+                logger.error(f"Error generating batched embeddings: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.batches_sent += 1
+            self.texts_embedded += len(texts)
+            for (_, future, _), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
@@ -0,0 +1,170 @@
+"""
+Content-addressed cache for embeddings.
+
+Vectors are keyed by (embedding model, sha256 of the text), so re-indexing
+unchanged content costs no embeddings API calls. Recently used vectors are kept
+in an in-memory LRU; every vector is also stored as float32 in a local SQLite
+file so the cache survives restarts and is shared by worker processes.
+
+The memory tier and the SQLite file have separate locks, so a memory lookup
+(get_from_memory) never waits behind a disk read or commit; async callers use
+it on the event loop and run the disk tier in a worker thread.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters per statement is 999
+LOOKUP_CHUNK_SIZE = 500
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 10000):
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, content_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, content_hash)) WITHOUT ROWID"
+            )
+            self._db.commit()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vector for each text, or None where it has not been embedded with this model"""
+        hashes = [content_hash(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, digest in enumerate(hashes):
+                vector = self._memory.get((model, digest))
+                if vector is not None:
+                    self._memory.move_to_end((model, digest))
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(digest, []).append(i)
+
+        rows = []
+        if missing and self._db is not None:
+            digests = list(missing)
+            with self._db_lock:
+                for start in range(0, len(digests), LOOKUP_CHUNK_SIZE):
+                    chunk = digests[start:start + LOOKUP_CHUNK_SIZE]
+                    rows.extend(self._db.execute(
+                        f"SELECT content_hash, vector FROM embeddings WHERE model = ? "
+                        f"AND content_hash IN ({','.join('?' * len(chunk))})",
+                        [model, *chunk]
+                    ).fetchall())
+
+        with self._lock:
+            for digest, blob in rows:
+                vector = _unpack(blob)
+                self._remember((model, digest), vector)
+                for i in missing.pop(digest):
+                    results[i] = vector
+                    self.disk_hits += 1
+            self.misses += sum(len(indexes) for indexes in missing.values())
+        return results
+
+    def get_from_memory(self, model: str, text: str) -> Optional[List[float]]:
+        """Vector from the in-memory tier only; never touches the disk, so safe on an event loop"""
+        key = (model, content_hash(text))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        rows = [(model, content_hash(text), vector) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            for model_name, digest, vector in rows:
+                self._remember((model_name, digest), vector)
+        if self._db is not None:
+            with self._db_lock:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (model, content_hash, vector) VALUES (?, ?, ?)",
+                        [(model_name, digest, _pack(vector)) for model_name, digest, vector in rows]
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # The cache is an optimisation; never fail indexing because of it
+                    logger.error(f"Error writing embedding cache: {e}")
+
+    def put(self, model: str, text: str, vector: List[float]):
+        self.put_many(model, [text], [vector])
+
+    def delete_many(self, texts: List[str]):
+        """Forget the vectors of texts under every model (used when a user's data is erased)"""
+        hashes = {content_hash(text) for text in texts}
+        with self._lock:
+            for key in [key for key in self._memory if key[1] in hashes]:
+                del self._memory[key]
+        if self._db is not None:
+            digests = list(hashes)
+            with self._db_lock:
+                for start in range(0, len(digests), LOOKUP_CHUNK_SIZE):
+                    chunk = digests[start:start + LOOKUP_CHUNK_SIZE]
+                    self._db.execute(
+                        f"DELETE FROM embeddings WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+            }
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
@@ -1,28 +1,425 @@
 import xml.etree.ElementTree as ET
-from datetime import datetime, date
-from typing import Dict, List, Tuple
+from datetime import datetime, date, timedelta, tzinfo
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+import multiprocessing
+import os
+import zipfile
 import pytz
 
+# Record types each extractor cares about; anything else is skipped before
+# touching its attributes
+ACTIVITY_TYPES = {
+    'HKQuantityTypeIdentifierStepCount',
+    'HKQuantityTypeIdentifierDistanceWalkingRunning',
+    'HKQuantityTypeIdentifierFlightsClimbed',
+    'HKQuantityTypeIdentifierActiveEnergyBurned',
+    'HKQuantityTypeIdentifierBasalEnergyBurned',
+}
+VITAL_TYPES = {
+    'HKQuantityTypeIdentifierHeartRate',
+    'HKQuantityTypeIdentifierOxygenSaturation',
+}
+
+# Incremental imports re-read this many days before a record type's watermark
+# so that daily activity totals on the boundary are rebuilt from complete data.
+# Sleep summaries are insert-only: nights already stored are kept as they are
+WATERMARK_OVERLAP_DAYS = 2
+
+# tzinfo per "+hhmm" offset string, shared by every parser in the process
+_TZ_CACHE: Dict[str, tzinfo] = {}
+
+def _fixed_offset(tz_str: str) -> Optional[tzinfo]:
+    """pytz.FixedOffset for a "+hhmm"/"-hhmm" string (cached), or None if it is not one"""
+    if len(tz_str) != 5 or tz_str[0] not in '+-' or not tz_str[1:].isdigit():
+        return None
+    sign = 1 if tz_str[0] == '+' else -1
+    offset_seconds = sign * (int(tz_str[1:3]) * 3600 + int(tz_str[3:5]) * 60)
+    try:
+        tz = pytz.FixedOffset(offset_seconds // 60)
+    except ValueError:
+        return None
+    _TZ_CACHE[tz_str] = tz
+    return tz
+
+def find_export_member(archive: zipfile.ZipFile) -> str:
+    """Name of the main export XML inside an iPhone export.zip (apple_health_export/export.xml)"""
+    for name in archive.namelist():
+        if name.rsplit('/', 1)[-1] == 'export.xml':
+            return name
+    raise ValueError("export.xml not found in archive")
+
+# Module-level factories so partial aggregates can be pickled between processes
+def _empty_sleep_session() -> Dict:
+    return {
+        'start': None,
+        'end': None,
+        'deep': 0,
+        'core': 0,
+        'rem': 0
+    }
+
+def _empty_daily_activity() -> Dict:
+    return {
+        'steps': 0,
+        'distance': 0,
+        'flights_climbed': 0,
+        'active_calories': 0,
+        'basal_calories': 0
+    }
+
+def _parse_range(xml_file_path: str, start: int, end: int, since: Optional[Dict[str, str]]) -> Dict:
+    """Process-pool entry point: partial aggregates for one byte range of the export"""
+    parser = AppleHealthParser(xml_file_path)
+    return parser._consume(parser.iter_range_elements(start, end), since)
+
 class AppleHealthParser:
-    """Parser for Apple Health export XML files"""
+    """Parser for Apple Health export XML files, plain or inside the iPhone's export.zip"""
     
     def __init__(self, xml_file_path: str):
         self.xml_file_path = xml_file_path
+        self.is_zip = zipfile.is_zipfile(xml_file_path)
         self.tree = None
         self.root = None
+
+    @contextmanager
+    def _open(self):
+        """Binary stream of the export XML; zipped exports are decompressed on the fly"""
+        if not self.is_zip:
+            with open(self.xml_file_path, 'rb') as f:
+                yield f
+            return
+        with zipfile.ZipFile(self.xml_file_path) as archive:
+            with archive.open(find_export_member(archive)) as f:
+                yield f
         
     def parse(self):
-        """Parse the XML file"""
-        self.tree = ET.parse(self.xml_file_path)
+        """Parse the whole XML file into memory (see parse_stream for large exports)"""
+        with self._open() as f:
+            self.tree = ET.parse(f)
         self.root = self.tree.getroot()
         
+    def iter_elements(self) -> Iterator[ET.Element]:
+        """
+        Stream the top-level children of <HealthData> with iterparse.
+
+        Each element is yielded once it has been fully read and is cleared
+        from the tree afterwards, so memory stays flat regardless of the
+        export size. Nested elements (e.g. Records inside a Correlation) are
+        not yielded on their own, matching root.findall('Record').
+        """
+        with self._open() as source:
+            yield from self._top_level_elements(ET.iterparse(source, events=('start', 'end')))
+
+    def iter_range_elements(self, start: int, end: int, block_size: int = 1024 * 1024) -> Iterator[ET.Element]:
+        """
+        Like iter_elements, but only for the bytes [start, end) of the file.
+        The range must begin and end on top-level element boundaries (see _chunk_ranges).
+        """
+        def events():
+            pull_parser = ET.XMLPullParser(events=('start', 'end'))
+            pull_parser.feed(b'<HealthData>')
+            with open(self.xml_file_path, 'rb') as f:
+                f.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    block = f.read(min(block_size, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    pull_parser.feed(block)
+                    yield from pull_parser.read_events()
+            pull_parser.feed(b'</HealthData>')
+            pull_parser.close()
+            yield from pull_parser.read_events()
+
+        return self._top_level_elements(events())
+
+    def _top_level_elements(self, events) -> Iterator[ET.Element]:
+        root = None
+        depth = 0
+        for event, elem in events:
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1:
+                yield elem
+                # Drop the finished element (and its children) from the root
+                root.clear()
+
+    def parse_stream(self, progress: Optional[Callable[[int], None]] = None, progress_every: int = 10000,
+                     since: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        Single-pass alternative to parse() + the get_* methods.
+
+        Every Record is handed to all extractors as it is read, so the export
+        is scanned once instead of four times and never held in memory.
+        Returns the same data the get_* methods return. If given, progress is
+        called with the number of records read every progress_every records
+        and once at the end.
+
+        since maps HK record types to the latest startDate imported before
+        (see latest_start_dates in the result). Records of those types that
+        start more than WATERMARK_OVERLAP_DAYS before it are skipped with a
+        plain string comparison, before any datetime parsing.
+        """
+        state = self._consume(self.iter_elements(), since, progress, progress_every)
+        if progress:
+            progress(state['record_count'])
+        return self._stream_result(state)
+
+    def parse_parallel(self, workers: Optional[int] = None, progress: Optional[Callable[[int], None]] = None,
+                       since: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        parse_stream spread over a process pool.
+
+        The body of the export is cut into byte ranges on top-level element
+        boundaries; each worker process streams its range into partial
+        per-day aggregates, which are merged in document order. Sleep and
+        activity aggregates are sums and min/max, so the result is identical
+        to parse_stream. progress is called with the running record count as
+        chunks finish. Falls back to parse_stream when the file cannot be split,
+        which includes zipped exports (a deflate stream cannot be entered at an offset).
+        """
+        workers = workers or os.cpu_count() or 1
+        ranges = self._chunk_ranges(workers) if workers > 1 and not self.is_zip else []
+        if len(ranges) < 2:
+            return self.parse_stream(progress=progress, since=since)
+
+        # spawn keeps the workers free of the parent's threads and open connections
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_parse_range, self.xml_file_path, start, end, since) for start, end in ranges]
+            try:
+                record_count = 0
+                for future in as_completed(futures):
+                    record_count += future.result()['record_count']
+                    if progress:
+                        progress(record_count)
+            except ET.ParseError:
+                # Layout we could not split safely; parse it in one pass instead
+                for future in futures:
+                    future.cancel()
+                return self.parse_stream(progress=progress, since=since)
+
+        state = self._new_state()
+        for future in futures:
+            self._merge_state(state, future.result())
+        return self._stream_result(state)
+
+    def _chunk_ranges(self, chunks: int) -> List[Tuple[int, int]]:
+        """
+        Split the body of <HealthData> into up to `chunks` byte ranges.
+
+        Apple's exporter starts every top-level element on its own line
+        indented by exactly one space, so each range after the first begins
+        at the next such line. Returns a single range if the layout is different.
+        """
+        size = os.path.getsize(self.xml_file_path)
+        with open(self.xml_file_path, 'rb') as f:
+            # The body starts right after the <HealthData ...> start tag (past the DTD)
+            head = b''
+            while b'<HealthData' not in head or b'>' not in head[head.index(b'<HealthData'):]:
+                block = f.read(1024 * 1024)
+                if not block:
+                    return []
+                head += block
+            tag_start = head.index(b'<HealthData')
+            body_start = head.index(b'>', tag_start) + 1
+
+            tail_start = max(body_start, size - 64 * 1024)
+            f.seek(tail_start)
+            tail = f.read()
+            closing = tail.rfind(b'</HealthData>')
+            body_end = tail_start + closing if closing != -1 else size
+
+            boundaries = [body_start]
+            for i in range(1, chunks):
+                target = body_start + (body_end - body_start) * i // chunks
+                if target <= boundaries[-1]:
+                    continue
+                f.seek(target)
+                f.readline()  # skip the partial line
+                while f.tell() < body_end:
+                    line_start = f.tell()
+                    line = f.readline()
+                    if line.startswith(b' <') and not line.startswith(b' </'):
+                        if line_start > boundaries[-1]:
+                            boundaries.append(line_start)
+                        break
+            boundaries.append(body_end)
+
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def _new_state(self) -> Dict:
+        return {
+            'personal_info': {},
+            'height_weight': {'height': None, 'weight': None, 'weight_date': None},
+            'sleep_sessions': self._new_sleep_sessions(),
+            'daily_activities': self._new_daily_activities(),
+            'vital_records': [],
+            'record_count': 0,
+            'skipped_records': 0,
+            'latest_start_dates': {}
+        }
+
+    def _consume(self, elements: Iterator[ET.Element], since: Optional[Dict[str, str]] = None,
+                 progress: Optional[Callable[[int], None]] = None, progress_every: int = 10000) -> Dict:
+        """Hand each top-level element to every extractor, accumulating into a fresh state"""
+        cutoffs = self._watermark_cutoffs(since or {})
+        state = self._new_state()
+        latest_start_dates = state['latest_start_dates']
+        height_weight = state['height_weight']
+        sleep_sessions = state['sleep_sessions']
+        daily_activities = state['daily_activities']
+        vital_records = state['vital_records']
+
+        for elem in elements:
+            if elem.tag == 'Record':
+                state['record_count'] += 1
+                if progress and state['record_count'] % progress_every == 0:
+                    progress(state['record_count'])
+
+                # "YYYY-MM-DD hh:mm:ss +zzzz" sorts chronologically as text
+                # (up to the timezone offset, which the overlap absorbs)
+                record_type = elem.get('type')
+                start_str = elem.get('startDate') or ''
+                if start_str > latest_start_dates.get(record_type, ''):
+                    latest_start_dates[record_type] = start_str
+                cutoff = cutoffs.get(record_type)
+                if cutoff and start_str < cutoff:
+                    state['skipped_records'] += 1
+                    continue
+
+                self._add_height_weight(elem, height_weight)
+                self._add_sleep(elem, sleep_sessions)
+                self._add_activity(elem, daily_activities)
+                vital_data = self._extract_vital(elem)
+                if vital_data:
+                    vital_records.append(vital_data)
+            elif elem.tag == 'Me':
+                state['personal_info'] = self._personal_info_from(elem)
+
+        return state
+
+    def _merge_state(self, state: Dict, part: Dict):
+        """Fold the state of a later chunk into the state of the chunks before it"""
+        if part['personal_info']:
+            state['personal_info'] = part['personal_info']
+
+        # Later values win, exactly as when reading the records in order
+        for key, value in part['height_weight'].items():
+            if value is not None:
+                state['height_weight'][key] = value
+
+        sleep_sessions = state['sleep_sessions']
+        for sleep_date, data in part['sleep_sessions'].items():
+            if sleep_date not in sleep_sessions:
+                sleep_sessions[sleep_date] = data
+                continue
+            session = sleep_sessions[sleep_date]
+            if session['start'] is None or (data['start'] is not None and data['start'] < session['start']):
+                session['start'] = data['start']
+            if session['end'] is None or (data['end'] is not None and data['end'] > session['end']):
+                session['end'] = data['end']
+            for stage in ('deep', 'core', 'rem'):
+                session[stage] += data[stage]
+
+        daily_activities = state['daily_activities']
+        for activity_date, data in part['daily_activities'].items():
+            if activity_date not in daily_activities:
+                daily_activities[activity_date] = data
+                continue
+            for field, value in data.items():
+                daily_activities[activity_date][field] += value
+
+        state['vital_records'].extend(part['vital_records'])
+        state['record_count'] += part['record_count']
+        state['skipped_records'] += part['skipped_records']
+        for record_type, start_str in part['latest_start_dates'].items():
+            if start_str > state['latest_start_dates'].get(record_type, ''):
+                state['latest_start_dates'][record_type] = start_str
+
+    def _stream_result(self, state: Dict) -> Dict:
+        height_weight = state['height_weight']
+        return {
+            'personal_info': state['personal_info'],
+            'height': height_weight['height'],
+            'weight': height_weight['weight'],
+            'weight_date': height_weight['weight_date'],
+            'sleep_records': self._finalize_sleep(state['sleep_sessions']),
+            'activity_records': self._finalize_activity(state['daily_activities']),
+            'vital_records': state['vital_records'],
+            'latest_start_dates': state['latest_start_dates'],
+            'skipped_records': state['skipped_records']
+        }
+
+    def _watermark_cutoffs(self, since: Dict[str, str]) -> Dict[str, str]:
+        """Turn per-type watermarks into 'YYYY-MM-DD' cutoffs, WATERMARK_OVERLAP_DAYS earlier"""
+        cutoffs = {}
+        for record_type, start_str in since.items():
+            try:
+                watermark_date = datetime.strptime(start_str[:10], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                continue
+            cutoffs[record_type] = (watermark_date - timedelta(days=WATERMARK_OVERLAP_DAYS)).isoformat()
+
+        # Daily activity rows hold every activity type and are overwritten as a
+        # whole, so all activity types share the earliest cutoff: a day is either
+        # rebuilt from all of its records or not touched at all
+        activity_cutoffs = [cutoffs[t] for t in ACTIVITY_TYPES if t in cutoffs]
+        if activity_cutoffs:
+            activity_cutoff = min(activity_cutoffs)
+            for record_type in ACTIVITY_TYPES:
+                cutoffs[record_type] = activity_cutoff
+        return cutoffs
+
     def get_personal_info(self) -> Dict:
         """Extract personal information from <Me> element"""
         me_element = self.root.find('Me')
         if me_element is None:
             return {}
-            
+        return self._personal_info_from(me_element)
+
+    def get_height_weight(self) -> Tuple[int, int, datetime]:
+        """Extract height and weight from records"""
+        height_weight = {'height': None, 'weight': None, 'weight_date': None}
+        for record in self.root.findall('Record'):
+            self._add_height_weight(record, height_weight)
+        return height_weight['height'], height_weight['weight'], height_weight['weight_date']
+
+    def get_sleep_records(self) -> List[Dict]:
+        """Extract sleep analysis records"""
+        sleep_sessions = self._new_sleep_sessions()
+        for record in self.root.findall('Record'):
+            self._add_sleep(record, sleep_sessions)
+        return self._finalize_sleep(sleep_sessions)
+
+    def get_activity_records(self) -> List[Dict]:
+        """Extract activity records (steps, distance, calories, flights)"""
+        daily_activities = self._new_daily_activities()
+        for record in self.root.findall('Record'):
+            self._add_activity(record, daily_activities)
+        return self._finalize_activity(daily_activities)
+
+    def get_vital_records(self) -> List[Dict]:
+        """Extract vital signs (heart rate, oxygen saturation)"""
+        vital_records = []
+        for record in self.root.findall('Record'):
+            vital_data = self._extract_vital(record)
+            if vital_data:
+                vital_records.append(vital_data)
+        return vital_records
+
+    # Per-record extractors shared by the tree and streaming modes
+
+    def _personal_info_from(self, me_element: ET.Element) -> Dict:
+        """Build personal info from a <Me> element"""
         # Parse date of birth
         dob_str = me_element.get('HKCharacteristicTypeIdentifierDateOfBirth')
         dob = datetime.strptime(dob_str, '%Y-%m-%d').date() if dob_str else None
@@ -45,77 +442,67 @@ class AppleHealthParser:
             'biological_sex': biological_sex,
             'blood_type': blood_type
         }
-    
-    def get_height_weight(self) -> Tuple[int, int, datetime]:
-        """Extract height and weight from records"""
-        height = None
-        weight = None
-        weight_date = None
+
+    def _add_height_weight(self, record: ET.Element, state: Dict):
+        """Track the latest height and weight seen so far"""
+        record_type = record.get('type')
         
-        for record in self.root.findall('Record'):
-            record_type = record.get('type')
+        if record_type == 'HKQuantityTypeIdentifierHeight':
+            height_value = record.get('value')
+            if height_value:
+                state['height'] = int(float(height_value))
+                
+        elif record_type == 'HKQuantityTypeIdentifierBodyMass':
+            weight_value = record.get('value')
+            if weight_value:
+                state['weight'] = int(float(weight_value))
+                # Get the date of the weight measurement
+                date_str = record.get('startDate')
+                if date_str:
+                    state['weight_date'] = self._parse_datetime(date_str)
+
+    def _new_sleep_sessions(self) -> Dict:
+        return defaultdict(_empty_sleep_session)
+
+    def _add_sleep(self, record: ET.Element, sleep_sessions: Dict):
+        """Fold a sleep analysis record into its nightly session"""
+        if record.get('type') != 'HKCategoryTypeIdentifierSleepAnalysis':
+            return
             
-            if record_type == 'HKQuantityTypeIdentifierHeight':
-                height_value = record.get('value')
-                if height_value:
-                    height = int(float(height_value))
-                    
-            elif record_type == 'HKQuantityTypeIdentifierBodyMass':
-                weight_value = record.get('value')
-                if weight_value:
-                    weight = int(float(weight_value))
-                    # Get the date of the weight measurement
-                    date_str = record.get('startDate')
-                    if date_str:
-                        weight_date = self._parse_datetime(date_str)
+        start_str = record.get('startDate')
+        end_str = record.get('endDate')
+        value = record.get('value')
         
-        return height, weight, weight_date
-    
-    def get_sleep_records(self) -> List[Dict]:
-        """Extract sleep analysis records"""
-        sleep_sessions = defaultdict(lambda: {
-            'start': None,
-            'end': None,
-            'deep': 0,
-            'core': 0,
-            'rem': 0
-        })
+        if not start_str or not end_str:
+            return
+            
+        start_dt = self._parse_datetime(start_str)
+        end_dt = self._parse_datetime(end_str)
         
-        for record in self.root.findall('Record'):
-            if record.get('type') == 'HKCategoryTypeIdentifierSleepAnalysis':
-                start_str = record.get('startDate')
-                end_str = record.get('endDate')
-                value = record.get('value')
-                
-                if not start_str or not end_str:
-                    continue
-                    
-                start_dt = self._parse_datetime(start_str)
-                end_dt = self._parse_datetime(end_str)
-                
-                # Group by date (use the date of sleep end)
-                sleep_date = end_dt.date()
-                
-                # Update session times
-                if sleep_sessions[sleep_date]['start'] is None or start_dt < sleep_sessions[sleep_date]['start']:
-                    sleep_sessions[sleep_date]['start'] = start_dt
-                if sleep_sessions[sleep_date]['end'] is None or end_dt > sleep_sessions[sleep_date]['end']:
-                    sleep_sessions[sleep_date]['end'] = end_dt
-                
-                # Calculate duration in minutes
-                duration = int((end_dt - start_dt).total_seconds() / 60)
-                
-                # Categorize sleep stage based on the category value string
-                # Apple Health uses strings like 'HKCategoryValueSleepAnalysisAsleepDeep'
-                if value:
-                    value_str = value.lower()
-                    if 'deep' in value_str or 'asleepdeep' in value_str:
-                        sleep_sessions[sleep_date]['deep'] += duration
-                    elif 'core' in value_str or 'asleepcore' in value_str:
-                        sleep_sessions[sleep_date]['core'] += duration
-                    elif 'rem' in value_str or 'asleeprem' in value_str:
-                        sleep_sessions[sleep_date]['rem'] += duration
+        # Group by date (use the date of sleep end)
+        sleep_date = end_dt.date()
+        
+        # Update session times
+        if sleep_sessions[sleep_date]['start'] is None or start_dt < sleep_sessions[sleep_date]['start']:
+            sleep_sessions[sleep_date]['start'] = start_dt
+        if sleep_sessions[sleep_date]['end'] is None or end_dt > sleep_sessions[sleep_date]['end']:
+            sleep_sessions[sleep_date]['end'] = end_dt
         
+        # Calculate duration in minutes
+        duration = int((end_dt - start_dt).total_seconds() / 60)
+        
+        # Categorize sleep stage based on the category value string
+        # Apple Health uses strings like 'HKCategoryValueSleepAnalysisAsleepDeep'
+        if value:
+            value_str = value.lower()
+            if 'deep' in value_str or 'asleepdeep' in value_str:
+                sleep_sessions[sleep_date]['deep'] += duration
+            elif 'core' in value_str or 'asleepcore' in value_str:
+                sleep_sessions[sleep_date]['core'] += duration
+            elif 'rem' in value_str or 'asleeprem' in value_str:
+                sleep_sessions[sleep_date]['rem'] += duration
+
+    def _finalize_sleep(self, sleep_sessions: Dict) -> List[Dict]:
         # Convert to list of records
         sleep_records = []
         for sleep_date, data in sleep_sessions.items():
@@ -132,62 +519,60 @@ class AppleHealthParser:
                 })
         
         return sleep_records
-    
-    def get_activity_records(self) -> List[Dict]:
-        """Extract activity records (steps, distance, calories, flights)"""
-        daily_activities = defaultdict(lambda: {
-            'steps': 0,
-            'distance': 0,
-            'flights_climbed': 0,
-            'active_calories': 0,
-            'basal_calories': 0
-        })
+
+    def _new_daily_activities(self) -> Dict:
+        return defaultdict(_empty_daily_activity)
+
+    def _add_activity(self, record: ET.Element, daily_activities: Dict):
+        """Fold an activity record into its daily totals"""
+        record_type = record.get('type')
+        if record_type not in ACTIVITY_TYPES:
+            return
+
+        value_str = record.get('value')
+        date_str = record.get('startDate')
         
-        for record in self.root.findall('Record'):
-            record_type = record.get('type')
-            value_str = record.get('value')
-            date_str = record.get('startDate')
+        if not value_str or not date_str:
+            return
+        
+        # Skip records with non-numeric values
+        try:
+            value = float(value_str)
+        except ValueError:
+            return
             
-            if not value_str or not date_str:
-                continue
+        record_date = self._parse_datetime(date_str).date()
+        
+        if record_type == 'HKQuantityTypeIdentifierStepCount':
+            daily_activities[record_date]['steps'] += int(value)
             
-            # Skip records with non-numeric values (e.g., category type records like sleep analysis)
-            try:
-                value = float(value_str)
-            except ValueError:
-                continue
+        elif record_type == 'HKQuantityTypeIdentifierDistanceWalkingRunning':
+            # Convert to meters
+            unit = record.get('unit')
+            if unit == 'km':
+                daily_activities[record_date]['distance'] += int(value * 1000)
+            elif unit == 'm':
+                daily_activities[record_date]['distance'] += int(value)
                 
-            record_date = self._parse_datetime(date_str).date()
+        elif record_type == 'HKQuantityTypeIdentifierFlightsClimbed':
+            daily_activities[record_date]['flights_climbed'] += int(value)
             
-            if record_type == 'HKQuantityTypeIdentifierStepCount':
-                daily_activities[record_date]['steps'] += int(value)
+        elif record_type == 'HKQuantityTypeIdentifierActiveEnergyBurned':
+            # Convert to kcal
+            unit = record.get('unit')
+            if unit == 'kcal':
+                daily_activities[record_date]['active_calories'] += int(value)
+            elif unit == 'Cal':
+                daily_activities[record_date]['active_calories'] += int(value)
                 
-            elif record_type == 'HKQuantityTypeIdentifierDistanceWalkingRunning':
-                # Convert to meters
-                unit = record.get('unit')
-                if unit == 'km':
-                    daily_activities[record_date]['distance'] += int(value * 1000)
-                elif unit == 'm':
-                    daily_activities[record_date]['distance'] += int(value)
-                    
-            elif record_type == 'HKQuantityTypeIdentifierFlightsClimbed':
-                daily_activities[record_date]['flights_climbed'] += int(value)
-                
-            elif record_type == 'HKQuantityTypeIdentifierActiveEnergyBurned':
-                # Convert to kcal
-                unit = record.get('unit')
-                if unit == 'kcal':
-                    daily_activities[record_date]['active_calories'] += int(value)
-                elif unit == 'Cal':
-                    daily_activities[record_date]['active_calories'] += int(value)
-                    
-            elif record_type == 'HKQuantityTypeIdentifierBasalEnergyBurned':
-                unit = record.get('unit')
-                if unit == 'kcal':
-                    daily_activities[record_date]['basal_calories'] += int(value)
-                elif unit == 'Cal':
-                    daily_activities[record_date]['basal_calories'] += int(value)
-        
+        elif record_type == 'HKQuantityTypeIdentifierBasalEnergyBurned':
+            unit = record.get('unit')
+            if unit == 'kcal':
+                daily_activities[record_date]['basal_calories'] += int(value)
+            elif unit == 'Cal':
+                daily_activities[record_date]['basal_calories'] += int(value)
+
+    def _finalize_activity(self, daily_activities: Dict) -> List[Dict]:
         # Convert to list
         activity_records = []
         for activity_date, data in daily_activities.items():
@@ -197,43 +582,58 @@ class AppleHealthParser:
             })
         
         return activity_records
-    
-    def get_vital_records(self) -> List[Dict]:
-        """Extract vital signs (heart rate, oxygen saturation)"""
-        vital_records = []
+
+    def _extract_vital(self, record: ET.Element) -> Optional[Dict]:
+        """Build a vital sign sample (heart rate, oxygen saturation) from a record"""
+        record_type = record.get('type')
+        if record_type not in VITAL_TYPES:
+            return None
+
+        value_str = record.get('value')
+        date_str = record.get('startDate')
         
-        for record in self.root.findall('Record'):
-            record_type = record.get('type')
-            value_str = record.get('value')
-            date_str = record.get('startDate')
-            
-            if not value_str or not date_str:
-                continue
-            
-            # Skip records with non-numeric values (e.g., category type records like sleep analysis)
-            try:
-                value = int(float(value_str))
-            except ValueError:
-                continue
-                
-            recorded_at = self._parse_datetime(date_str)
+        if not value_str or not date_str:
+            return None
+        
+        # Skip records with non-numeric values
+        try:
+            value = int(float(value_str))
+        except ValueError:
+            return None
             
-            vital_data = {'recorded_at': recorded_at}
+        vital_data = {'recorded_at': self._parse_datetime(date_str)}
+        
+        if record_type == 'HKQuantityTypeIdentifierHeartRate':
+            vital_data['heart_rate'] = value
             
-            if record_type == 'HKQuantityTypeIdentifierHeartRate':
-                vital_data['heart_rate'] = value
-                vital_records.append(vital_data)
-                
-            elif record_type == 'HKQuantityTypeIdentifierOxygenSaturation':
-                # Convert from decimal to percentage
-                vital_data['oxygen_saturation'] = int(value * 100) if value < 1 else value
-                vital_records.append(vital_data)
+        elif record_type == 'HKQuantityTypeIdentifierOxygenSaturation':
+            # Convert from decimal to percentage
+            vital_data['oxygen_saturation'] = int(value * 100) if value < 1 else value
         
-        return vital_records
+        return vital_data
     
     def _parse_datetime(self, date_str: str) -> datetime:
         """Parse datetime string from Apple Health format"""
-        # Format: "2025-09-26 20:38:07 +0530"
+        # Format: "2025-09-26 20:38:07 +0530". Exports use this fixed layout, so
+        # slice the fields directly and reuse one tzinfo per offset string;
+        # anything else goes through the general strptime path.
+        if len(date_str) == 25 and date_str[10] == ' ' and date_str[19] == ' ':
+            tz = _TZ_CACHE.get(date_str[20:])
+            if tz is None:
+                tz = _fixed_offset(date_str[20:])
+            if tz is not None:
+                year, month, day = date_str[0:4], date_str[5:7], date_str[8:10]
+                hour, minute, second = date_str[11:13], date_str[14:16], date_str[17:19]
+                if (date_str[4] == '-' and date_str[7] == '-' and date_str[13] == ':' and date_str[16] == ':'
+                        and (year + month + day + hour + minute + second).isdigit()):
+                    try:
+                        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=tz)
+                    except ValueError:
+                        pass
+        return self._parse_datetime_strptime(date_str)
+
+    def _parse_datetime_strptime(self, date_str: str) -> datetime:
+        """General (slower) parser for Apple Health datetime strings"""
         try:
             # Remove timezone info and parse
             dt_str = date_str.rsplit(' ', 1)[0]
@@ -0,0 +1,236 @@
+"""
+Collection layout for the health_insights Qdrant collection.
+
+Every search, scroll and delete filters on user_id (plus data_type or a row ID),
+so those fields get payload indexes; without them Qdrant checks the filter
+point by point across all tenants during HNSW traversal.
+
+In multitenant mode (QDRANT_MULTITENANT=true) each point also carries a
+tenant_id keyword indexed with is_tenant, so storage is grouped per user, and
+the collection is built with m=0 / payload_m so HNSW graphs are built per
+tenant instead of one global graph. Searches then only touch the user's own
+graph. The mode is fixed when the collection is created; switching it on for an
+existing collection requires a reindex. Until then the app searches with the
+layout the live collection was built with and logs the mismatch at startup.
+
+New collections also get a sparse "text-sparse" vector (local BM25-style, see
+app.services.sparse_encoder) next to the dense one, and searches fuse both
+with reciprocal-rank fusion. Collections created before it keep dense-only
+search until reindexed.
+
+Dense vectors can be quantized (QDRANT_QUANTIZATION=scalar for int8, or binary)
+with the quantized copy kept in RAM and the float32 originals optionally on disk
+(QDRANT_VECTORS_ON_DISK=true). Searches oversample on the quantized vectors and
+rescore with the originals. Unlike the sparse vector, these settings can be
+changed on an existing collection (scripts/migrate_qdrant_collection.py).
+
+The app addresses the collection by an alias ("health_insights") pointing at a
+versioned collection ("health_insights_v20251018120000"). A reindex builds the
+next version and moves the alias in one atomic alias update
+(app.services.reindex); running processes notice the move within
+QDRANT_LAYOUT_CHECK_SECONDS and adopt the new collection's layout.
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from qdrant_client.http import models as qmodels
+
+logger = logging.getLogger(__name__)
+
+# Payload fields used in filters and their index types
+PAYLOAD_INDEXES: Dict[str, qmodels.PayloadSchemaType] = {
+    "user_id": qmodels.PayloadSchemaType.INTEGER,
+    "data_type": qmodels.PayloadSchemaType.KEYWORD,
+    "record_id": qmodels.PayloadSchemaType.INTEGER,
+    "medication_id": qmodels.PayloadSchemaType.INTEGER,
+    "appointment_id": qmodels.PayloadSchemaType.INTEGER,
+}
+
+TENANT_FIELD = "tenant_id"
+# Named sparse vector stored next to the unnamed dense one for hybrid search
+SPARSE_VECTOR_NAME = "text-sparse"
+# Links per node in each tenant's graph (Qdrant's default m)
+TENANT_PAYLOAD_M = 16
+# Candidates fetched from each of the dense and sparse lists before fusion
+HYBRID_PREFETCH_FACTOR = 3
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+# Candidates scored on quantized vectors per result, before rescoring with the originals
+QUANTIZATION_OVERSAMPLING = {"scalar": 1.5, "binary": 3.0}
+
+
+def tenant_value(user_id: int) -> str:
+    return str(user_id)
+
+
+def hnsw_config(multitenant: bool):
+    """HNSW settings for a new collection; per-tenant graphs only in multitenant mode"""
+    if multitenant:
+        return qmodels.HnswConfigDiff(m=0, payload_m=TENANT_PAYLOAD_M)
+    return None
+
+
+def dense_vector_params(size: int, on_disk: bool = False) -> qmodels.VectorParams:
+    return qmodels.VectorParams(size=size, distance=qmodels.Distance.COSINE, on_disk=on_disk or None)
+
+
+def dense_vector_size(client, collection_name: str) -> int:
+    vectors = client.get_collection(collection_name).config.params.vectors
+    if isinstance(vectors, dict):
+        vectors = vectors[""]
+    return vectors.size
+
+
+def is_multitenant(client, collection_name: str) -> bool:
+    """Whether the collection was built with per-tenant HNSW graphs (m=0); only a Qdrant server reports it"""
+    return client.get_collection(collection_name).config.hnsw_config.m == 0
+
+
+def quantization_config(mode: str):
+    """Quantized copy of the dense vectors, always held in RAM"""
+    if mode == "scalar":
+        return qmodels.ScalarQuantization(
+            scalar=qmodels.ScalarQuantizationConfig(type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return qmodels.BinaryQuantization(binary=qmodels.BinaryQuantizationConfig(always_ram=True))
+    if mode != "none":
+        raise ValueError(f"Unknown quantization mode {mode!r}, expected one of {QUANTIZATION_MODES}")
+    return None
+
+
+def quantization_search_params(mode: str) -> Optional[qmodels.SearchParams]:
+    if mode == "none":
+        return None
+    return qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(
+        rescore=True, oversampling=QUANTIZATION_OVERSAMPLING[mode]
+    ))
+
+
+def storage_updates(client, collection_name: str, quantization: str, on_disk: bool) -> Dict:
+    """update_collection arguments that bring an existing collection's quantization / on_disk in line"""
+    config = client.get_collection(collection_name).config
+    current = config.quantization_config
+    current_mode = (
+        "scalar" if isinstance(current, qmodels.ScalarQuantization)
+        else "binary" if isinstance(current, qmodels.BinaryQuantization)
+        else "none"
+    )
+    updates = {}
+    if current_mode != quantization:
+        updates["quantization_config"] = quantization_config(quantization) or qmodels.Disabled.DISABLED
+    vectors = config.params.vectors
+    if isinstance(vectors, qmodels.VectorParams) and bool(vectors.on_disk) != on_disk:
+        updates["vectors_config"] = {"": qmodels.VectorParamsDiff(on_disk=on_disk)}
+    return updates
+
+
+def sparse_vectors_config():
+    """BM25-style sparse vector; Qdrant applies the IDF weighting at query time"""
+    return {SPARSE_VECTOR_NAME: qmodels.SparseVectorParams(modifier=qmodels.Modifier.IDF)}
+
+
+def has_sparse_vectors(client, collection_name: str) -> bool:
+    """Sparse vectors can't be added to an existing collection; older ones need a reindex"""
+    sparse = client.get_collection(collection_name).config.params.sparse_vectors or {}
+    return SPARSE_VECTOR_NAME in sparse
+
+
+def search_request(collection_name: str, dense: List[float], conditions: List[qmodels.FieldCondition],
+                   limit: int, sparse: Optional[qmodels.SparseVector] = None, quantization: str = "none") -> Dict:
+    """
+    query_points arguments for a filtered search. With a sparse query vector, the
+    dense and sparse candidate lists are fused with reciprocal-rank fusion.
+    """
+    query_filter = qmodels.Filter(must=conditions)
+    params = quantization_search_params(quantization)
+    if sparse is None:
+        return dict(collection_name=collection_name, query=dense, query_filter=query_filter,
+                    search_params=params, limit=limit)
+    prefetch_limit = limit * HYBRID_PREFETCH_FACTOR
+    return dict(
+        collection_name=collection_name,
+        prefetch=[
+            qmodels.Prefetch(query=dense, filter=query_filter, params=params, limit=prefetch_limit),
+            qmodels.Prefetch(query=sparse, using=SPARSE_VECTOR_NAME, filter=query_filter, limit=prefetch_limit),
+        ],
+        query=qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+        limit=limit
+    )
+
+
+def ensure_payload_indexes(client, collection_name: str, multitenant: bool = False):
+    """Create any missing payload index (idempotent, run at startup)"""
+    existing = set(client.get_collection(collection_name).payload_schema or {})
+    schemas: Dict[str, object] = dict(PAYLOAD_INDEXES)
+    if multitenant:
+        schemas[TENANT_FIELD] = qmodels.KeywordIndexParams(type=qmodels.KeywordIndexType.KEYWORD, is_tenant=True)
+
+    for field_name, schema in schemas.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+            wait=True
+        )
+        logger.info(f"Created payload index on {collection_name}.{field_name}")
+
+
+def user_conditions(user_id: int, multitenant: bool = False) -> List[qmodels.FieldCondition]:
+    """
+    Search conditions restricting a query to one user's points. Deletes and
+    scrolls keep filtering on user_id, so they also match points written before
+    tenant_id existed.
+    """
+    if multitenant:
+        return [qmodels.FieldCondition(key=TENANT_FIELD, match=qmodels.MatchValue(value=tenant_value(user_id)))]
+    return [qmodels.FieldCondition(key="user_id", match=qmodels.MatchValue(value=user_id))]
+
+
+def versioned_collection_name(alias: str) -> str:
+    return f"{alias}_v{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def alias_target(client, alias: str) -> Optional[str]:
+    """Collection the alias points to, or None if there is no such alias"""
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def live_collection(client, alias: str) -> Optional[str]:
+    """
+    Collection currently served under the alias name: the alias target, or a
+    collection created with that name before aliases were used. None if neither exists.
+    """
+    target = alias_target(client, alias)
+    if target:
+        return target
+    if alias in {c.name for c in client.get_collections().collections}:
+        return alias
+    return None
+
+
+def switch_alias(client, alias: str, collection_name: str) -> Optional[str]:
+    """
+    Point alias at collection_name in one alias update and return the collection
+    it pointed to before. A pre-alias collection with the alias name has to be
+    deleted first, so that one-time cutover leaves a brief gap.
+    """
+    previous = alias_target(client, alias)
+    operations = []
+    if previous:
+        operations.append(qmodels.DeleteAliasOperation(delete_alias=qmodels.DeleteAlias(alias_name=alias)))
+    elif live_collection(client, alias) == alias:
+        logger.warning(f"Deleting pre-alias collection {alias} to replace it with an alias")
+        client.delete_collection(alias)
+    operations.append(qmodels.CreateAliasOperation(
+        create_alias=qmodels.CreateAlias(collection_name=collection_name, alias_name=alias)
+    ))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"Alias {alias} now points to {collection_name} (was {previous or 'unset'})")
+    return previous
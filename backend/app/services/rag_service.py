@@ -4,13 +4,117 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
 from openai import OpenAI
 import cohere
+import copy
+import hashlib
 import logging
 import json
+import time
+from app.services.answer_cache import SemanticAnswerCache, documents_fingerprint
+from app.services.context_builder import context_builder
+from app.services.embedders import create_embedder
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rerank_policy import RerankPolicy
+from app.services.qdrant_layout import (
+    SPARSE_VECTOR_NAME, TENANT_FIELD, dense_vector_params, dense_vector_size, ensure_payload_indexes, has_sparse_vectors,
+    hnsw_config, is_multitenant, live_collection, quantization_config, search_request, sparse_vectors_config,
+    storage_updates, switch_alias, tenant_value, user_conditions, versioned_collection_name
+)
+from app.services.sparse_encoder import sparse_encoder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local state that has to survive restarts (the embedding cache)
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(BACKEND_DIR, "data"))
+
+CHAT_MODEL = "gpt-4o"
+RERANK_MODEL = "rerank-english-v3.0"
+
+INSIGHT_SYSTEM_PROMPT = """You are an advanced AI health assistant with STRICT USER DATA ISOLATION requirements.
+
+        CRITICAL SECURITY RULES - MUST FOLLOW:
+        1. You MUST ONLY use information from the provided context below
+        2. The context contains data EXCLUSIVELY for the currently authenticated user
+        3. NEVER reference, mention, or infer information about other users/patients
+        4. If the context is empty or insufficient, clearly state "I don't have enough data for this user"
+        5. NEVER make assumptions or generate data not present in the context
+        6. If asked about data belonging to another user, respond: "I can only access your personal health data"
+
+        USER DATA ISOLATION:
+        - All data in the context belongs to ONE user only
+        - You are forbidden from accessing or mentioning any other user's data
+        - Treat this as a HIPAA compliance requirement
+
+        RESPONSE FORMAT:
+        Return a valid JSON object with this structure:
+        {
+            "summary": "Brief summary based ONLY on provided context (1-2 sentences)",
+            "metrics": [
+                {
+                    "label": "Metric Name",
+                    "value": "Value with units",
+                    "status": "Normal" | "High" | "Low" | "Warning" | "Good",
+                    "insight": "Brief explanation"
+                }
+            ],
+            "analysis": "Detailed analysis in markdown format using ONLY context data",
+            "recommendations": [
+                "Actionable recommendation based on context"
+            ]
+        }
+
+        HANDLING INSUFFICIENT DATA:
+        - If context is empty: Return empty metrics array and explain in summary: "I don't have enough health data for your account yet. Please add health records, medications, or appointments to get personalized insights."
+        - If context is partial: Only analyze what's available
+        - NEVER fabricate medical data or diagnoses
+
+        Guidelines:
+        - Provide personalized, actionable, empathetic insights
+        - Cite specific data from the context
+        - Do NOT make up medical diagnoses
+        - Ensure JSON is valid and parseable
+        """
+
+DOCTOR_SYSTEM_PROMPT = """You are a clinical AI assistant helping a doctor review a patient's health data.
+            
+            CRITICAL RULES:
+            1. You have access ONLY to the provided context data for this specific patient.
+            2. Do NOT make up information. If the answer is not in the context, say "I don't see that information in the patient's records."
+            3. Be concise, professional, and clinically relevant.
+            4. Do not provide medical advice or diagnosis to the doctor; simply summarize the available data to aid their decision.
+            
+            CONTEXT DATA:
+            The context below contains the patient's personal info, medications, health records, and recent activity/sleep summaries.
+            """
+
+
+def build_context(docs: List[Dict], user_id: Optional[int] = None) -> str:
+    """Prompt context of the best documents within the token budget"""
+    context = context_builder.build(docs)
+    logger.info(
+        f"RAG context for user {user_id}: {context.tokens}/{context_builder.max_tokens} tokens, "
+        f"{context.documents} documents, {context.duplicates} duplicates, "
+        f"{context.truncated} truncated, {context.dropped} dropped"
+    )
+    return context.text
+
+
+def document_summaries(docs: List[Dict]) -> List[Dict]:
+    """What a client may see about the context documents (no content)"""
+    return [
+        {
+            "data_type": doc["metadata"].get("data_type"),
+            "source_key": doc["metadata"].get("source_key"),
+            "score": doc.get("score"),
+            "rerank_score": doc.get("rerank_score")
+        }
+        for doc in docs
+    ]
+
+
 class RAGService:
     def __init__(self):
         self.qdrant_url = os.getenv("QDRANT_URL")
@@ -23,7 +127,7 @@ class RAGService:
             self.qdrant = QdrantClient(url=self.qdrant_url, api_key=self.qdrant_api_key)
         else:
             # Fallback to local storage
-            storage_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "qdrant_data")
+            storage_path = os.path.join(BACKEND_DIR, "qdrant_data")
             os.makedirs(storage_path, exist_ok=True)
             self.qdrant = QdrantClient(path=storage_path)
             logger.info(f"Using local Qdrant storage at {storage_path}")
@@ -31,43 +135,230 @@ class RAGService:
         self.openai = OpenAI(api_key=self.openai_api_key)
         self.cohere = cohere.Client(self.cohere_api_key)
         
+        # Alias of the live versioned collection; every read and write goes through it
         self.collection_name = "health_insights"
-        self.embedding_model = "text-embedding-3-small"
-        self.vector_size = 1536  # Size for text-embedding-3-small
+        # OpenAI, a local CPU model or feature hashing (see app.services.embedders)
+        self.embedder = create_embedder(
+            os.getenv("EMBEDDING_BACKEND", "openai").lower(),
+            openai_client=self.openai,
+            local_model=os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5"),
+            local_batch_size=int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32")),
+            local_workers=int(os.getenv("LOCAL_EMBEDDING_WORKERS", "2")),
+            local_threads=int(os.getenv("LOCAL_EMBEDDING_THREADS", "0")) or None
+        )
+        self.embedding_model = self.embedder.name
+        self.upsert_batch_size = 256
+        # Per-tenant HNSW graphs; only takes effect when the collection is created,
+        # searches follow the layout the live collection was built with
+        self.multitenant_enabled = os.getenv("QDRANT_MULTITENANT", "false").lower() == "true"
+        self.multitenant = self.multitenant_enabled
+        # Dense + sparse (BM25) retrieval fused with RRF; on once the collection has sparse vectors
+        self.hybrid_search_enabled = os.getenv("RAG_HYBRID_SEARCH", "true").lower() == "true"
+        self.hybrid = False
+        # How often the alias target is re-checked, so running processes pick up the layout
+        # (sparse vectors, multitenant) of a collection a reindex or migration switched to
+        self.layout_check_seconds = float(os.getenv("QDRANT_LAYOUT_CHECK_SECONDS", "30"))
+        self.live_collection: Optional[str] = None
+        self._layout_checked_at = 0.0
+        # Rerank candidate pool; hybrid recall lets it be smaller (see scripts/eval_retrieval.py)
+        self.dense_search_limit = int(os.getenv("RAG_SEARCH_LIMIT", "10"))
+        self.hybrid_search_limit = int(os.getenv("RAG_HYBRID_SEARCH_LIMIT", "6"))
+        # Quantized dense vectors in RAM ("none", "scalar" int8 or "binary"), float32 originals optionally on disk
+        self.quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+        self.vectors_on_disk = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+        
+        # Embeddings of content seen before are served from memory / local SQLite in
+        # DATA_DIR (backend/data by default, next to qdrant_data and uploads); set
+        # EMBEDDING_CACHE_PATH to move the file or to an empty string for a memory-only cache
+        self.embedding_cache = EmbeddingCache(
+            path=os.getenv("EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "embedding_cache.sqlite3")),
+            max_memory_entries=int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+        )
+        
+        # Concurrent embed_text calls (queries, single-record indexing) share embeddings requests
+        self.embedding_batcher = EmbeddingBatcher(
+            self._embed_request,
+            max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+        )
+
+        # Answers to near-identical questions over unchanged documents skip rerank and generation
+        self.answer_cache = SemanticAnswerCache(
+            similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+        )
+
+        # Skips the Cohere call when it cannot change the kept documents, and caches its results
+        self.rerank_policy = RerankPolicy(
+            score_margin=float(os.getenv("RERANK_SCORE_MARGIN", "0.15")),
+            # Hybrid search scores are RRF sums, not cosine; 0 always reranks them
+            fused_score_margin=float(os.getenv("RERANK_FUSED_SCORE_MARGIN", "0")),
+            cache_ttl_seconds=float(os.getenv("RERANK_CACHE_TTL_SECONDS", "3600"))
+        )
+
+    @property
+    def vector_size(self) -> int:
+        return self.embedder.vector_size
+
+    def create_collection(self, collection_name: str):
+        """Create a collection with the configured layout and its payload indexes"""
+        self.qdrant.create_collection(
+            collection_name=collection_name,
+            vectors_config=dense_vector_params(self.vector_size, self.vectors_on_disk),
+            sparse_vectors_config=sparse_vectors_config() if self.hybrid_search_enabled else None,
+            hnsw_config=hnsw_config(self.multitenant_enabled),
+            quantization_config=quantization_config(self.quantization)
+        )
+        ensure_payload_indexes(self.qdrant, collection_name, self.multitenant_enabled)
+        logger.info(
+            f"Created collection: {collection_name} (multitenant={self.multitenant_enabled}, "
+            f"quantization={self.quantization}, on_disk={self.vectors_on_disk})"
+        )
 
     def initialize_collection(self):
-        """Initialize Qdrant collection if it doesn't exist"""
+        """Create the first versioned collection and its alias if neither exists, and check the live one"""
         try:
-            collections = self.qdrant.get_collections()
-            collection_names = [c.name for c in collections.collections]
-            
-            if self.collection_name not in collection_names:
-                self.qdrant.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=qmodels.VectorParams(
-                        size=self.vector_size,
-                        distance=qmodels.Distance.COSINE
-                    )
-                )
-                logger.info(f"Created collection: {self.collection_name}")
+            # Loads a local model now rather than on the first request
+            self.embedder.warm_up()
+            live = live_collection(self.qdrant, self.collection_name)
+
+            if live is None:
+                live = versioned_collection_name(self.collection_name)
+                self.create_collection(live)
+                switch_alias(self.qdrant, self.collection_name, live)
             else:
-                logger.info(f"Collection {self.collection_name} already exists")
+                logger.info(f"Collection {self.collection_name} already exists ({live})")
+                size = dense_vector_size(self.qdrant, live)
+                if size != self.vector_size:
+                    raise RuntimeError(
+                        f"Collection {live} holds {size}-dim vectors but the {self.embedding_model} embedder "
+                        f"produces {self.vector_size}; run scripts/reindex_collection.py before switching embedders"
+                    )
+                self.multitenant = self.collection_multitenant(live)
+                if self.multitenant != self.multitenant_enabled:
+                    logger.warning(
+                        f"Collection {live} was built with multitenant={self.multitenant} but QDRANT_MULTITENANT is "
+                        f"{str(self.multitenant_enabled).lower()}; keeping the collection's layout "
+                        f"({'tenant_id' if self.multitenant else 'user_id'} filter) until it is reindexed"
+                    )
+                ensure_payload_indexes(self.qdrant, live, self.multitenant)
+                # Local Qdrant keeps no quantization config, so only a server can be out of date
+                if self.qdrant_url and storage_updates(self.qdrant, live, self.quantization, self.vectors_on_disk):
+                    logger.warning(
+                        f"Collection {live} quantization/on_disk differ from the configuration; "
+                        f"run scripts/migrate_qdrant_collection.py to apply them"
+                    )
+
+            self.hybrid = self.hybrid_search_enabled and has_sparse_vectors(self.qdrant, live)
+            if self.hybrid_search_enabled and not self.hybrid:
+                logger.warning(f"Collection {live} has no sparse vectors; using dense-only search until it is reindexed")
+            self.live_collection = live
+            self._layout_checked_at = time.monotonic()
         except Exception as e:
             logger.error(f"Error initializing collection: {e}")
             raise
 
+    def layout_check_due(self) -> bool:
+        return time.monotonic() - self._layout_checked_at >= self.layout_check_seconds
+
+    def check_layout(self) -> bool:
+        """
+        If the alias has moved to another collection since the last check, adopt
+        that collection's hybrid / multitenant layout. Checked at most every
+        layout_check_seconds; returns whether the layout changed. The dense size
+        comes from the embedder, so a collection of another size only works after
+        a restart with the matching embedder configuration.
+        """
+        if not self.layout_check_due():
+            return False
+        self._layout_checked_at = time.monotonic()
+        live = live_collection(self.qdrant, self.collection_name)
+        if live is None or live == self.live_collection:
+            return False
+
+        self.live_collection = live
+        size = dense_vector_size(self.qdrant, live)
+        if size != self.vector_size:
+            logger.error(
+                f"{self.collection_name} now points to {live} with {size}-dim vectors but the {self.embedding_model} "
+                f"embedder produces {self.vector_size}; restart with the embedder it was built with"
+            )
+        layout = (self.hybrid_search_enabled and has_sparse_vectors(self.qdrant, live), self.collection_multitenant(live))
+        changed = layout != (self.hybrid, self.multitenant)
+        self.hybrid, self.multitenant = layout
+        logger.info(f"{self.collection_name} now points to {live} (hybrid={self.hybrid}, multitenant={self.multitenant})")
+        return changed
+
+    def for_collection(self, collection_name: str) -> "RAGService":
+        """
+        A view of this service that reads and writes collection_name instead of
+        the alias, sharing clients and caches; used to fill a collection being built.
+        """
+        view = copy.copy(self)
+        view.collection_name = collection_name
+        view.hybrid = self.hybrid_search_enabled and has_sparse_vectors(self.qdrant, collection_name)
+        view.multitenant = view.collection_multitenant(collection_name)
+        return view
+
+    def collection_multitenant(self, collection_name: str) -> bool:
+        """Layout collection_name was built with; local Qdrant keeps no HNSW config, so it follows the setting"""
+        if not self.qdrant_url:
+            return self.multitenant_enabled
+        return is_multitenant(self.qdrant, collection_name)
+
     def embed_text(self, text: str) -> List[float]:
-        """Generate embeddings for text using OpenAI"""
+        """Generate embeddings for text with the configured embedder (cached, micro-batched with concurrent callers)"""
         try:
-            response = self.openai.embeddings.create(
-                input=text,
-                model=self.embedding_model
-            )
-            return response.data[0].embedding
+            embedding = self.embedding_cache.get(self.embedding_model, text)
+            if embedding is None:
+                embedding = self.embedding_batcher.embed(text)
+                self.embedding_cache.put(self.embedding_model, text, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
 
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeddings for many texts. Cached content is not embedded again; the rest
+        goes to the embedder in one call.
+        """
+        embeddings = self.embedding_cache.get_many(self.embedding_model, texts)
+        # Each distinct uncached text is embedded once
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            fresh = self._embed_request(missing)
+            self.embedding_cache.put_many(self.embedding_model, missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            embeddings = [embedding if embedding is not None else by_text[text] for text, embedding in zip(texts, embeddings)]
+        return embeddings
+
+    def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        """One embedder call; results come back in input order"""
+        return self.embedder.embed(texts)
+
+    def point_id(self, user_id: int, data_type: str, content: str) -> str:
+        # Deterministic ID based on content to avoid duplicates
+        return hashlib.md5(f"{user_id}_{data_type}_{content}".encode()).hexdigest()
+
+    @property
+    def search_limit(self) -> int:
+        return self.hybrid_search_limit if self.hybrid else self.dense_search_limit
+
+    def _point_vector(self, embedding: List[float], content: str):
+        if not self.hybrid:
+            return embedding
+        return {"": embedding, SPARSE_VECTOR_NAME: sparse_encoder.encode_document(content)}
+
+    def _payload(self, user_id: int, data_type: str, content: str, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            TENANT_FIELD: tenant_value(user_id),
+            "data_type": data_type,
+            "content": content,
+            **(metadata or {})
+        }
+
     def upsert_data(self, user_id: int, data_type: str, content: str, metadata: Dict[str, Any] = None):
         """Store data in Qdrant"""
         try:
@@ -75,54 +366,75 @@ class RAGService:
                 return
 
             embedding = self.embed_text(content)
-            
-            payload = {
-                "user_id": user_id,
-                "data_type": data_type,
-                "content": content,
-                **(metadata or {})
-            }
-            
-            # Generate a deterministic ID based on content to avoid duplicates
-            import hashlib
-            point_id = hashlib.md5(f"{user_id}_{data_type}_{content}".encode()).hexdigest()
+            self.check_layout()
             
             self.qdrant.upsert(
                 collection_name=self.collection_name,
                 points=[
                     qmodels.PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload=payload
+                        id=self.point_id(user_id, data_type, content),
+                        vector=self._point_vector(embedding, content),
+                        payload=self._payload(user_id, data_type, content, metadata)
                     )
                 ]
             )
+            self.answer_cache.invalidate_user(user_id)
             logger.info(f"Upserted {data_type} for user {user_id}")
         except Exception as e:
             logger.error(f"Error upserting data: {e}")
             raise
 
-    def search(self, user_id: int, query: str, limit: int = 10) -> List[Dict]:
+    def upsert_many(self, user_id: int, items: List[Dict[str, Any]]) -> int:
+        """
+        Store many documents for a user with batched embedding and upsert calls.
+        Each item is {"data_type": ..., "content": ..., "metadata": {...}}. Returns points written.
+        """
+        try:
+            items = [item for item in items if item.get("content")]
+            if not items:
+                return 0
+
+            embeddings = self.embed_batch([item["content"] for item in items])
+            self.check_layout()
+            points = [
+                qmodels.PointStruct(
+                    id=self.point_id(user_id, item["data_type"], item["content"]),
+                    vector=self._point_vector(embedding, item["content"]),
+                    payload=self._payload(user_id, item["data_type"], item["content"], item.get("metadata"))
+                )
+                for item, embedding in zip(items, embeddings)
+            ]
+            for i in range(0, len(points), self.upsert_batch_size):
+                self.qdrant.upsert(
+                    collection_name=self.collection_name,
+                    points=points[i:i + self.upsert_batch_size]
+                )
+            self.answer_cache.invalidate_user(user_id)
+            logger.info(f"Upserted {len(points)} documents for user {user_id}")
+            return len(points)
+        except Exception as e:
+            logger.error(f"Error upserting data: {e}")
+            raise
+
+    def search(self, user_id: int, query: str, limit: int = 10, query_vector: Optional[List[float]] = None) -> List[Dict]:
         """Retrieve relevant documents from Qdrant"""
         try:
-            query_vector = self.embed_text(query)
+            if query_vector is None:
+                query_vector = self.embed_text(query)
+            self.check_layout()
             
-            search_result = self.qdrant.query_points(
-                collection_name=self.collection_name,
-                query=query_vector,
-                query_filter=qmodels.Filter(
-                    must=[
-                        qmodels.FieldCondition(
-                            key="user_id",
-                            match=qmodels.MatchValue(value=user_id)
-                        )
-                    ]
-                ),
-                limit=limit
-            ).points
+            search_result = self.qdrant.query_points(**search_request(
+                self.collection_name,
+                query_vector,
+                user_conditions(user_id, self.multitenant),
+                limit,
+                sparse=sparse_encoder.encode_query(query) if self.hybrid else None,
+                quantization=self.quantization
+            )).points
             
             return [
                 {
+                    "id": str(hit.id),
                     "content": hit.payload.get("content"),
                     "metadata": hit.payload,
                     "score": hit.score
@@ -134,10 +446,14 @@ class RAGService:
             raise
 
     def rerank(self, query: str, docs: List[Dict], top_n: int = 5) -> List[Dict]:
-        """Rerank documents using Cohere"""
+        """Rerank documents using Cohere, unless the rerank policy can answer without it"""
         try:
             if not docs:
                 return []
+            
+            local = self.rerank_policy.local_result(query, docs, top_n, fused=self.hybrid)
+            if local is not None:
+                return local
                 
             documents = [doc["content"] for doc in docs]
             
@@ -145,7 +461,7 @@ class RAGService:
                 query=query,
                 documents=documents,
                 top_n=top_n,
-                model="rerank-english-v3.0"
+                model=RERANK_MODEL
             )
             
             reranked_docs = []
@@ -153,15 +469,20 @@ class RAGService:
                 doc = docs[hit.index]
                 doc["rerank_score"] = hit.relevance_score
                 reranked_docs.append(doc)
-                
+            
+            self.rerank_policy.store(query, docs, top_n, reranked_docs)
             return reranked_docs
         except Exception as e:
             logger.error(f"Error reranking data: {e}")
+            self.rerank_policy.record("error")
             # Fallback to original order if reranking fails
             return docs[:top_n]
 
     def delete_by_metadata(self, user_id: int, data_type: str, metadata_key: str, metadata_value: Any):
-        """Delete documents from Qdrant by metadata filter"""
+        """
+        Delete documents from Qdrant by metadata filter.
+        Chunked documents repeat their metadata (e.g. record_id) on every chunk, so all chunks are removed.
+        """
         try:
             # Delete points matching the filter
             self.qdrant.delete(
@@ -185,23 +506,82 @@ class RAGService:
                     )
                 )
             )
+            self.answer_cache.invalidate_user(user_id)
             logger.info(f"Deleted {data_type} with {metadata_key}={metadata_value} for user {user_id} from RAG")
         except Exception as e:
             logger.error(f"Error deleting from RAG: {e}")
             # Don't raise - deletion from RAG shouldn't block the main operation
 
-    def delete_by_id(self, point_id: str):
-        """Delete a specific document by its point ID"""
-        try:
-            self.qdrant.delete(
+    def indexed_points(self, user_id: int, data_types: List[str]) -> List[Dict]:
+        """id, source_key and source_fingerprint of every point a user has for the given data types"""
+        points = []
+        offset = None
+        while True:
+            batch, offset = self.qdrant.scroll(
                 collection_name=self.collection_name,
-                points_selector=qmodels.PointIdsList(
-                    points=[point_id]
-                )
+                scroll_filter=qmodels.Filter(
+                    must=[
+                        qmodels.FieldCondition(key="user_id", match=qmodels.MatchValue(value=user_id)),
+                        qmodels.FieldCondition(key="data_type", match=qmodels.MatchAny(any=data_types))
+                    ]
+                ),
+                limit=256,
+                offset=offset,
+                with_payload=["source_key", "source_fingerprint"],
+                with_vectors=False
             )
-            logger.info(f"Deleted point {point_id} from RAG")
-        except Exception as e:
-            logger.error(f"Error deleting point from RAG: {e}")
+            points.extend(
+                {
+                    "id": str(point.id),
+                    "source_key": point.payload.get("source_key"),
+                    "source_fingerprint": point.payload.get("source_fingerprint")
+                }
+                for point in batch
+            )
+            if offset is None:
+                return points
+
+    def delete_points(self, point_ids: List[str], user_id: Optional[int] = None):
+        """Delete documents by point ID in one request; user_id is the owner, for cache invalidation"""
+        if not point_ids:
+            return
+        self.qdrant.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.PointIdsList(points=point_ids)
+        )
+        if user_id is not None:
+            self.answer_cache.invalidate_user(user_id)
+        logger.info(f"Deleted {len(point_ids)} points from RAG")
+
+    def user_collections(self) -> List[str]:
+        """Every collection that can hold user points: the live one and other versions (kept or being built)"""
+        names = [c.name for c in self.qdrant.get_collections().collections]
+        return [name for name in names if name == self.collection_name or name.startswith(f"{self.collection_name}_v")]
+
+    def purge_user_batch(self, user_id: int, collection_name: str, batch_size: int = 500) -> int:
+        """
+        Delete up to batch_size of the user's points from collection_name, and their
+        cached embeddings. Returns how many were deleted; 0 once none are left.
+        """
+        points, _ = self.qdrant.scroll(
+            collection_name=collection_name,
+            scroll_filter=qmodels.Filter(must=[
+                qmodels.FieldCondition(key="user_id", match=qmodels.MatchValue(value=user_id))
+            ]),
+            limit=batch_size,
+            with_payload=["content"],
+            with_vectors=False
+        )
+        if not points:
+            return 0
+        self.qdrant.delete(
+            collection_name=collection_name,
+            points_selector=qmodels.PointIdsList(points=[point.id for point in points]),
+            wait=True
+        )
+        self.embedding_cache.delete_many([point.payload.get("content") or "" for point in points])
+        self.answer_cache.invalidate_user(user_id)
+        return len(points)
 
     def generate_insight(self, user_id: int, query: str) -> str:
         """Generate insight using RAG pipeline with security audit logging"""
@@ -210,9 +590,16 @@ class RAGService:
             logger.info(f"[SECURITY AUDIT] RAG query initiated - User ID: {user_id}, Query: '{query[:100]}'")
             
             # 1. Retrieve
-            retrieved_docs = self.search(user_id, query, limit=10)
+            query_vector = self.embed_text(query)
+            retrieved_docs = self.search(user_id, query, limit=self.search_limit, query_vector=query_vector)
             logger.info(f"[SECURITY AUDIT] Retrieved {len(retrieved_docs)} documents for user {user_id}")
             
+            documents = documents_fingerprint(retrieved_docs)
+            cached = self.answer_cache.get(user_id, "insight", query_vector, documents)
+            if cached:
+                logger.info(f"[SECURITY AUDIT] Served insight from answer cache for user {user_id}")
+                return cached["answer"]
+            
             # 2. Rerank
             reranked_docs = self.rerank(query, retrieved_docs, top_n=5)
             logger.info(f"[SECURITY AUDIT] Reranked to {len(reranked_docs)} documents for user {user_id}")
@@ -222,66 +609,23 @@ class RAGService:
                 logger.warning(f"[SECURITY AUDIT] No context data available for user {user_id}")
             
             # 3. Generate
-            context = "\n\n".join([f"Document {i+1}: {doc['content']}" for i, doc in enumerate(reranked_docs)])
+            context = build_context(reranked_docs, user_id)
             
-            system_prompt = """You are an advanced AI health assistant with STRICT USER DATA ISOLATION requirements.
-
-        CRITICAL SECURITY RULES - MUST FOLLOW:
-        1. You MUST ONLY use information from the provided context below
-        2. The context contains data EXCLUSIVELY for the currently authenticated user
-        3. NEVER reference, mention, or infer information about other users/patients
-        4. If the context is empty or insufficient, clearly state "I don't have enough data for this user"
-        5. NEVER make assumptions or generate data not present in the context
-        6. If asked about data belonging to another user, respond: "I can only access your personal health data"
-
-        USER DATA ISOLATION:
-        - All data in the context belongs to ONE user only
-        - You are forbidden from accessing or mentioning any other user's data
-        - Treat this as a HIPAA compliance requirement
-
-        RESPONSE FORMAT:
-        Return a valid JSON object with this structure:
-        {
-            "summary": "Brief summary based ONLY on provided context (1-2 sentences)",
-            "metrics": [
-                {
-                    "label": "Metric Name",
-                    "value": "Value with units",
-                    "status": "Normal" | "High" | "Low" | "Warning" | "Good",
-                    "insight": "Brief explanation"
-                }
-            ],
-            "analysis": "Detailed analysis in markdown format using ONLY context data",
-            "recommendations": [
-                "Actionable recommendation based on context"
-            ]
-        }
-
-        HANDLING INSUFFICIENT DATA:
-        - If context is empty: Return empty metrics array and explain in summary: "I don't have enough health data for your account yet. Please add health records, medications, or appointments to get personalized insights."
-        - If context is partial: Only analyze what's available
-        - NEVER fabricate medical data or diagnoses
-
-        Guidelines:
-        - Provide personalized, actionable, empathetic insights
-        - Cite specific data from the context
-        - Do NOT make up medical diagnoses
-        - Ensure JSON is valid and parseable
-        """
-        
             user_prompt = f"Context:\n{context}\n\nUser Question: {query}\n\nResponse (JSON):"
             
             response = self.openai.chat.completions.create(
-                model="gpt-4o",
+                model=CHAT_MODEL,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": INSIGHT_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.7,
                 response_format={"type": "json_object"}
             )
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            self.answer_cache.put(user_id, "insight", query_vector, documents, answer, document_summaries(reranked_docs))
+            return answer
         except Exception as e:
             logger.error(f"Error generating insight: {e}")
             raise
@@ -295,39 +639,36 @@ class RAGService:
             logger.info(f"[SECURITY AUDIT] Doctor RAG query initiated - Patient ID: {patient_id}, Query: '{query[:100]}'")
             
             # 1. Retrieve
-            retrieved_docs = self.search(patient_id, query, limit=10)
+            query_vector = self.embed_text(query)
+            retrieved_docs = self.search(patient_id, query, limit=self.search_limit, query_vector=query_vector)
             logger.info(f"[SECURITY AUDIT] Retrieved {len(retrieved_docs)} documents for patient {patient_id}")
             
+            documents = documents_fingerprint(retrieved_docs)
+            cached = self.answer_cache.get(patient_id, "doctor", query_vector, documents)
+            if cached:
+                logger.info(f"[SECURITY AUDIT] Served doctor answer from answer cache for patient {patient_id}")
+                return cached["answer"]
+            
             # 2. Rerank
             reranked_docs = self.rerank(query, retrieved_docs, top_n=5)
             
             # 3. Generate
-            context = "\n\n".join([f"Document {i+1}: {doc['content']}" for i, doc in enumerate(reranked_docs)])
-            
-            system_prompt = """You are a clinical AI assistant helping a doctor review a patient's health data.
-            
-            CRITICAL RULES:
-            1. You have access ONLY to the provided context data for this specific patient.
-            2. Do NOT make up information. If the answer is not in the context, say "I don't see that information in the patient's records."
-            3. Be concise, professional, and clinically relevant.
-            4. Do not provide medical advice or diagnosis to the doctor; simply summarize the available data to aid their decision.
-            
-            CONTEXT DATA:
-            The context below contains the patient's personal info, medications, health records, and recent activity/sleep summaries.
-            """
+            context = build_context(reranked_docs, patient_id)
             
             user_prompt = f"Context:\n{context}\n\nDoctor's Question: {query}\n\nAnswer:"
             
             response = self.openai.chat.completions.create(
-                model="gpt-4o",
+                model=CHAT_MODEL,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": DOCTOR_SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.3, # Lower temperature for more factual responses
             )
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            self.answer_cache.put(patient_id, "doctor", query_vector, documents, answer, document_summaries(reranked_docs))
+            return answer
         except Exception as e:
             logger.error(f"Error answering doctor query: {e}")
             raise
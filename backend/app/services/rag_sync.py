@@ -0,0 +1,102 @@
+"""
+Incremental sync of a user's RAG documents with their SQL rows.
+
+Every indexed point carries a source_key (e.g. "medication:12") and a
+source_fingerprint of the row it was built from. A refresh fingerprints the
+current rows, rebuilds and re-embeds only sources whose fingerprint changed,
+and deletes points whose source no longer exists. Building a document (e.g.
+extracting text from a PDF) is deferred until its source is known to have changed.
+"""
+import hashlib
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of the row fields a document is built from"""
+    return hashlib.sha256(json.dumps(parts, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class RAGSource:
+    """
+    One document-producing source row. build() returns the document content, a
+    list of chunks (indexed as one point each, with chunk_index), or None to skip it.
+    """
+
+    def __init__(self, key: str, data_type: str, fingerprint: str,
+                 build: Callable[[], Union[str, List[str], None]],
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.data_type = data_type
+        self.fingerprint = fingerprint
+        self.build = build
+        self.metadata = metadata or {}
+
+
+def _normalize_id(point_id: str) -> str:
+    # Qdrant returns string IDs in canonical UUID form; we generate md5 hex
+    return str(uuid.UUID(str(point_id)))
+
+
+def sync_user_documents(rag, user_id: int, data_types: List[str], sources: List[RAGSource]) -> Dict[str, int]:
+    """
+    Bring the user's points for data_types in line with sources.
+    Points of those types without a source_key (indexed before fingerprints
+    existed, or by single-record writes) are replaced. Returns counts of
+    unchanged, updated and deleted sources.
+    """
+    points_by_key = defaultdict(list)
+    for point in rag.indexed_points(user_id, data_types):
+        points_by_key[point["source_key"]].append(point)
+
+    counts = {"unchanged": 0, "updated": 0, "deleted": 0}
+    documents = []
+    stale_ids = []
+    for source in sources:
+        points = points_by_key.pop(source.key, [])
+        if points and all(p["source_fingerprint"] == source.fingerprint for p in points):
+            counts["unchanged"] += 1
+            continue
+
+        stale_ids.extend(p["id"] for p in points)
+        content = source.build()
+        if not content:
+            if points:
+                counts["deleted"] += 1
+            continue
+        metadata = {**source.metadata, "source_key": source.key, "source_fingerprint": source.fingerprint}
+        if isinstance(content, str):
+            documents.append({"data_type": source.data_type, "content": content, "metadata": metadata})
+        else:
+            documents.extend(
+                {
+                    "data_type": source.data_type,
+                    "content": chunk,
+                    "metadata": {**metadata, "chunk_index": i, "chunk_count": len(content)}
+                }
+                for i, chunk in enumerate(content)
+            )
+        counts["updated"] += 1
+
+    rag.upsert_many(user_id, documents)
+
+    # Unchanged content keeps its point ID; don't delete what was just written
+    fresh_ids = {_normalize_id(rag.point_id(user_id, d["data_type"], d["content"])) for d in documents}
+    stale_ids = [point_id for point_id in stale_ids if _normalize_id(point_id) not in fresh_ids]
+
+    # Sources that no longer exist, plus legacy points without a source_key
+    for key, points in points_by_key.items():
+        removed = [p["id"] for p in points if _normalize_id(p["id"]) not in fresh_ids]
+        stale_ids.extend(removed)
+        if removed:
+            counts["deleted"] += len(removed) if key is None else 1
+
+    rag.delete_points(stale_ids, user_id)
+
+    logger.info(f"RAG sync for user {user_id}: {counts}")
+    return counts
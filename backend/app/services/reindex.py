@@ -0,0 +1,132 @@
+"""
+Blue/green rebuild of the RAG collection from SQL rows.
+
+A new versioned collection is created with the current layout, embedder and
+chunking, and filled user by user from their SQL rows (the same sources as an
+embedding refresh, embedded in batches) by a bounded pool of workers. Searches
+keep using the old collection through the alias meanwhile. When every user is
+built, the alias is moved in one atomic update. Writes that landed in the old
+collection during the build are then caught up with a fingerprint sync, which
+only re-embeds sources that changed since they were built.
+
+Per-upload summary points that are not derived from SQL rows are not carried
+over. After switching embedders, restart the app with the new
+EMBEDDING_BACKEND so queries are embedded by the same model.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.services.qdrant_layout import switch_alias, versioned_collection_name
+from app.services.rag_sync import RAGSource, sync_user_documents
+
+logger = logging.getLogger(__name__)
+
+
+class ReindexProgress:
+    """Thread-safe counters for a running pass"""
+
+    def __init__(self, stage: str, total: int):
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self.failed: List[int] = []
+        self.documents = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, user_id: int, counts: Optional[Dict[str, int]]):
+        with self._lock:
+            self.done += 1
+            if counts is None:
+                self.failed.append(user_id)
+            else:
+                self.documents += counts["updated"]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            return {
+                "stage": self.stage,
+                "done": self.done,
+                "total": self.total,
+                "failed": len(self.failed),
+                "documents": self.documents,
+                "elapsed_seconds": round(elapsed, 1),
+                "eta_seconds": round((self.total - self.done) / rate, 1) if rate else None,
+            }
+
+
+class Reindexer:
+    """
+    build_sources(user_id, db) returns a user's RAGSources for data_types;
+    session_factory opens a database session per user.
+    """
+
+    def __init__(self, rag, session_factory: Callable, build_sources: Callable[[int, object], List[RAGSource]],
+                 data_types: List[str], concurrency: int = 4,
+                 on_progress: Optional[Callable[[Dict], None]] = None):
+        self.rag = rag
+        self.session_factory = session_factory
+        self.build_sources = build_sources
+        self.data_types = data_types
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+
+    def _sync_user(self, rag, user_id: int) -> Dict[str, int]:
+        db = self.session_factory()
+        try:
+            return sync_user_documents(rag, user_id, self.data_types, self.build_sources(user_id, db))
+        finally:
+            db.close()
+
+    def sync_all(self, rag, user_ids: List[int], stage: str) -> ReindexProgress:
+        """Sync every user into rag's collection on a bounded pool; a failing user doesn't stop the others"""
+        progress = ReindexProgress(stage, len(user_ids))
+
+        def run(user_id: int):
+            try:
+                counts = self._sync_user(rag, user_id)
+            except Exception as e:
+                logger.error(f"Reindex {stage} failed for user {user_id}: {e}")
+                counts = None
+            progress.record(user_id, counts)
+            if self.on_progress:
+                self.on_progress(progress.snapshot())
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="reindex") as pool:
+            list(pool.map(run, user_ids))
+        return progress
+
+    def run(self, list_user_ids: Callable[[], List[int]], keep_previous: bool = False) -> Dict:
+        """
+        Build a new collection for every user and switch the alias to it. If any
+        user fails, the alias is left alone and the new collection kept for
+        inspection. Returns a summary of both passes.
+        """
+        user_ids = list_user_ids()
+        alias = self.rag.collection_name
+        target = versioned_collection_name(alias)
+        self.rag.create_collection(target)
+        logger.info(f"Reindexing {len(user_ids)} users into {target}")
+
+        build = self.sync_all(self.rag.for_collection(target), user_ids, "build")
+        summary = {"collection": target, "build": build.snapshot(), "switched": False}
+        if build.failed:
+            logger.error(f"Reindex into {target} failed for users {build.failed}; alias {alias} not switched")
+            return summary
+
+        previous = switch_alias(self.rag.qdrant, alias, target)
+        summary["switched"] = True
+        summary["previous"] = previous
+        # Writes made through the alias during the build went to the old collection;
+        # the user list is re-read to include anyone who signed up meanwhile
+        summary["catch_up"] = self.sync_all(self.rag.for_collection(target), list_user_ids(), "catch_up").snapshot()
+
+        if previous and not keep_previous:
+            self.rag.qdrant.delete_collection(previous)
+            logger.info(f"Deleted previous collection {previous}")
+        return summary
@@ -0,0 +1,101 @@
+"""
+Decides when a Cohere rerank call is needed.
+
+The remote rerank is skipped when:
+  - search returned no more than top_n candidates (rerank could only reorder them), or
+  - the vector scores already separate the top_n from the rest by at least
+    score_margin, so rerank would not change which documents are kept;
+and a previous rerank of the same query over the same candidates is reused.
+
+score_margin is a cosine-similarity gap. Hybrid search returns reciprocal-rank
+fusion scores instead (a sum of 1 / (k + rank) over the dense and sparse lists),
+where a gap says how many lists found a document and at which ranks, not how
+similar it is; those are compared against fused_score_margin, which is off (0)
+unless set.
+Counts of each path are kept for stats() and logged periodically.
+"""
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PATHS = ("skipped_few_candidates", "skipped_score_margin", "cache_hit", "remote", "error")
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def doc_key(doc: Dict) -> str:
+    """Point ID of a search hit, or its content hash"""
+    return str(doc.get("id") or _hash(doc.get("content")))
+
+
+class RerankPolicy:
+    def __init__(self, score_margin: float = 0.15, fused_score_margin: float = 0.0, cache_ttl_seconds: float = 3600,
+                 cache_max_entries: int = 5000, log_every: int = 100):
+        self.score_margin = score_margin
+        self.fused_score_margin = fused_score_margin
+        self.cache = TTLCache(cache_ttl_seconds, max_entries=cache_max_entries)
+        self.log_every = log_every
+        self._counts = {path: 0 for path in PATHS}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(query: str, docs: List[Dict], top_n: int) -> Tuple:
+        return (_hash(query), top_n, tuple(sorted(doc_key(doc) for doc in docs)))
+
+    def local_result(self, query: str, docs: List[Dict], top_n: int, fused: bool = False) -> Optional[List[Dict]]:
+        """
+        Reranked docs without calling the reranker, or None if a remote rerank is needed.
+        fused: the scores come from hybrid (RRF) search rather than cosine similarity.
+        """
+        if len(docs) <= top_n:
+            self.record("skipped_few_candidates")
+            return docs
+
+        margin = self.fused_score_margin if fused else self.score_margin
+        by_score = sorted(docs, key=lambda doc: doc.get("score") or 0.0, reverse=True)
+        if margin > 0 and (by_score[top_n - 1].get("score") or 0.0) - (by_score[top_n].get("score") or 0.0) >= margin:
+            self.record("skipped_score_margin")
+            return by_score[:top_n]
+
+        ranking = self.cache.get(self.cache_key(query, docs, top_n))
+        if ranking is None:
+            return None
+        by_key = {doc_key(doc): doc for doc in docs}
+        reranked_docs = []
+        for key, relevance_score in ranking:
+            doc = by_key[key]
+            doc["rerank_score"] = relevance_score
+            reranked_docs.append(doc)
+        self.record("cache_hit")
+        return reranked_docs
+
+    def store(self, query: str, docs: List[Dict], top_n: int, reranked_docs: List[Dict]):
+        """Remember a remote rerank of docs"""
+        self.record("remote")
+        self.cache.set(
+            self.cache_key(query, docs, top_n),
+            [(doc_key(doc), doc.get("rerank_score")) for doc in reranked_docs]
+        )
+
+    def record(self, path: str):
+        with self._lock:
+            self._counts[path] += 1
+            total = sum(self._counts.values())
+            if self.log_every and total % self.log_every == 0:
+                logger.info(f"Rerank paths after {total} queries: {self._counts}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                **self._counts,
+                "total": total,
+                "remote_rate": round((self._counts["remote"] + self._counts["error"]) / total, 3) if total else 0.0
+            }
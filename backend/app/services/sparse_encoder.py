@@ -0,0 +1,74 @@
+"""
+Local BM25-style sparse vectors for exact-term retrieval.
+
+Dense embeddings blur exact tokens such as lab names ("HbA1c"), values and
+medication names ("metformin 500mg"). Documents are encoded as hashed term IDs
+with BM25 term-frequency saturation; the IDF part is applied by Qdrant
+(Modifier.IDF on the sparse vector), so no corpus statistics are kept here.
+Queries are encoded as one weight per distinct term. No network is involved.
+"""
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client.http import models as qmodels
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+# Splits mixed tokens such as "500mg" or "hba1c" into their number / word parts
+PART_PATTERN = re.compile(r"[a-z]+|[0-9]+(?:\.[0-9]+)?")
+
+STOPWORDS = frozenset(
+    "a about after all am an and any are as at be been before did do does for from had has have how i in "
+    "is it last me my of on or our over than that the their them this to was we were what when where which "
+    "who why will with you your".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Typical length of an indexed document (a record or one chunk) in terms
+AVG_DOC_TERMS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+def term_id(term: str) -> int:
+    # Stable across processes, unlike hash()
+    return zlib.crc32(term.encode("utf-8")) & 0x7FFFFFFF
+
+
+class SparseEncoder:
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B, avg_doc_terms: int = AVG_DOC_TERMS):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_terms = avg_doc_terms
+
+    def _vector(self, weights: dict) -> qmodels.SparseVector:
+        by_id: dict = {}
+        for term, weight in weights.items():
+            index = term_id(term)
+            by_id[index] = by_id.get(index, 0.0) + weight
+        indices = sorted(by_id)
+        return qmodels.SparseVector(indices=indices, values=[by_id[i] for i in indices])
+
+    def encode_document(self, text: str) -> qmodels.SparseVector:
+        terms = tokenize(text)
+        counts = Counter(terms)
+        norm = self.k1 * (1 - self.b + self.b * len(terms) / self.avg_doc_terms)
+        return self._vector({term: tf * (self.k1 + 1) / (tf + norm) for term, tf in counts.items()})
+
+    def encode_query(self, text: str) -> qmodels.SparseVector:
+        return self._vector({term: 1.0 for term in set(tokenize(text))})
+
+
+sparse_encoder = SparseEncoder()
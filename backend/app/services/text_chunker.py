@@ -0,0 +1,90 @@
+"""
+Token-aware chunking of long documents for RAG indexing.
+
+Text is split into overlapping windows of tiktoken tokens (cl100k_base, the
+encoding of text-embedding-3-small), so every chunk fits the embedding model
+and retrieval can match the relevant part of a long report instead of the
+whole document.
+"""
+import logging
+import os
+from typing import List, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "60"))
+# Chars per token assumed only if the tokenizer cannot be loaded; on the low side,
+# since digits and non-ASCII text take more tokens than English prose
+FALLBACK_CHARS_PER_TOKEN = 3
+
+
+class TextChunker:
+    def __init__(self, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 encoding_name: str = "cl100k_base", encoding=None):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.encoding_name = encoding_name
+        self._encoding = encoding
+        self._encoding_failed = False
+
+    @property
+    def encoding(self):
+        if self._encoding is None and not self._encoding_failed:
+            try:
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                # First use downloads the BPE file; don't fail indexing when that is not possible
+                logger.error(f"Could not load tiktoken encoding {self.encoding_name}, chunking by characters: {e}")
+                self._encoding_failed = True
+        return self._encoding
+
+    def encode(self, text: str) -> List[int]:
+        """Token ids of text; special-token strings (e.g. "<|endoftext|>") in documents are plain text"""
+        return self.encoding.encode(text, disallowed_special=())
+
+    def count_tokens(self, text: str) -> int:
+        """Token count of text, or a character estimate if the tokenizer is unavailable"""
+        if self.encoding is None:
+            return len(text) // FALLBACK_CHARS_PER_TOKEN + 1
+        return len(self.encode(text))
+
+    def split(self, text: str) -> List[str]:
+        """Overlapping windows of at most chunk_tokens tokens"""
+        if not text or not text.strip():
+            return []
+        encoding = self.encoding
+        if encoding is None:
+            return self._windows(text, self.chunk_tokens * FALLBACK_CHARS_PER_TOKEN,
+                                 self.overlap_tokens * FALLBACK_CHARS_PER_TOKEN)
+
+        tokens = self.encode(text)
+        if len(tokens) <= self.chunk_tokens:
+            return [text]
+        return [encoding.decode(window) for window in self._windows(tokens, self.chunk_tokens, self.overlap_tokens)]
+
+    @staticmethod
+    def _windows(seq, size: int, overlap: int) -> list:
+        if len(seq) <= size:
+            return [seq]
+        # The last window ends at len(seq); none is made of overlap alone
+        return [seq[i:i + size] for i in range(0, len(seq) - overlap, size - overlap)]
+
+    def chunk_document(self, header: str, body: Optional[str]) -> List[str]:
+        """
+        Chunks of body, each prefixed with the document header (title, type, date)
+        so a chunk is meaningful on its own. A document without body is one chunk.
+        """
+        chunks = self.split(body) if body else []
+        if not chunks:
+            return [header]
+        if len(chunks) == 1:
+            return [f"{header}\n\nExtracted File Content:\n{chunks[0]}"]
+        return [f"{header}\n\nExtracted File Content (part {i + 1}/{len(chunks)}):\n{chunk}" for i, chunk in enumerate(chunks)]
+
+
+text_chunker = TextChunker()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Build hourly/daily vital rollups from the raw vital_records already stored.
+
+Imports maintain the rollups from then on; run this once after upgrading and
+before enabling VITAL_RAW_RETENTION_DAYS, which prunes raw samples.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app import models
+from app.modules.dashboard.ingestion import HealthDataIngestor
+
+
+def backfill_vital_rollups():
+    db = SessionLocal()
+    try:
+        user_ids = [row.user_id for row in db.query(models.VitalRecord.user_id).distinct()]
+        print(f"Rebuilding vital rollups for {len(user_ids)} users...")
+        for user_id in user_ids:
+            buckets = HealthDataIngestor(db, user_id).rebuild_vital_rollups()
+            db.commit()
+            print(f"  user {user_id}: {buckets} buckets")
+        print("Done.")
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_vital_rollups()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for Apple Health timestamp parsing.
+
+Builds a synthetic export, then times the fixed-layout _parse_datetime against
+the old strptime path, both in isolation and as part of a full parse_stream.
+
+    python scripts/benchmark_health_parser.py --records 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.health_parser import AppleHealthParser
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<HealthData locale="en_IN">
+ <ExportDate value="2025-09-27 12:00:00 +0530"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1990-05-15" HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale"/>
+"""
+
+
+def write_export(path: str, records: int):
+    """Step count / heart rate / sleep records, cycling through a year of days"""
+    start = date(2025, 1, 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for i in range(records):
+            d = (start + timedelta(days=(i // 48) % 365)).isoformat()
+            minute = i % 48 * 30
+            ts = f"{d} {minute // 60:02d}:{minute % 60:02d}:00 +0530"
+            kind = i % 3
+            if kind == 0:
+                f.write(f' <Record type="HKQuantityTypeIdentifierStepCount" unit="count" startDate="{ts}" endDate="{ts}" value="{i % 500}"/>\n')
+            elif kind == 1:
+                f.write(f' <Record type="HKQuantityTypeIdentifierHeartRate" unit="count/min" startDate="{ts}" endDate="{ts}" value="{60 + i % 40}"/>\n')
+            else:
+                f.write(f' <Record type="HKCategoryTypeIdentifierSleepAnalysis" startDate="{ts}" endDate="{ts}" value="HKCategoryValueSleepAnalysisAsleepCore"/>\n')
+        f.write('</HealthData>\n')
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--records', type=int, default=200000, help='Records in the synthetic export')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.xml')
+        write_export(path, args.records)
+        parser = AppleHealthParser(path)
+        stamps = [elem.get('startDate') for elem in parser.iter_elements() if elem.tag == 'Record']
+
+        print(f"Timestamps ({len(stamps)}):")
+        slow, slow_s = timed(lambda: [parser._parse_datetime_strptime(s) for s in stamps])
+        fast, fast_s = timed(lambda: [parser._parse_datetime(s) for s in stamps])
+        assert slow == fast, "fast path disagrees with strptime"
+        print(f"  strptime: {len(stamps) / slow_s:>12,.0f} /s")
+        print(f"  fast:     {len(stamps) / fast_s:>12,.0f} /s  ({slow_s / fast_s:.1f}x)")
+
+        print(f"parse_stream ({args.records} records):")
+        slow_parser = AppleHealthParser(path)
+        slow_parser._parse_datetime = slow_parser._parse_datetime_strptime
+        slow_result, slow_s = timed(slow_parser.parse_stream)
+        fast_result, fast_s = timed(AppleHealthParser(path).parse_stream)
+        assert slow_result == fast_result, "parse_stream output differs"
+        print(f"  strptime: {args.records / slow_s:>12,.0f} records/s")
+        print(f"  fast:     {args.records / fast_s:>12,.0f} records/s  ({slow_s / fast_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
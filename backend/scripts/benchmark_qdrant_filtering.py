@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-user filtered search in Qdrant.
+
+Loads synthetic points for many users into three collections and times
+user-filtered searches against each:
+
+  baseline     no payload indexes, one global HNSW graph (the old layout)
+  indexed      payload indexes from app.services.qdrant_layout
+  multitenant  payload indexes plus tenant_id (is_tenant) and per-tenant HNSW
+
+By default it runs against local-path Qdrant in a temporary directory. Local
+Qdrant does a flat scan and ignores payload indexes, so the three layouts
+should measure about the same there; pass --url to measure a Qdrant server,
+where the indexes take effect.
+
+    python scripts/benchmark_qdrant_filtering.py --users 10000
+    python scripts/benchmark_qdrant_filtering.py --users 10000 --url http://localhost:6333
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from app.services.qdrant_layout import TENANT_FIELD, ensure_payload_indexes, hnsw_config, tenant_value, user_conditions
+
+DATA_TYPES = ["personal_info", "appointment", "medication", "health_record", "sleep_summary", "activity_summary"]
+LAYOUTS = ["baseline", "indexed", "multitenant"]
+
+
+def random_vector(rng: random.Random, dim: int):
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+def load_collection(client: QdrantClient, name: str, layout: str, users: int, points_per_user: int, dim: int, seed: int):
+    multitenant = layout == "multitenant"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE),
+        hnsw_config=hnsw_config(multitenant)
+    )
+    if layout != "baseline":
+        ensure_payload_indexes(client, name, multitenant)
+
+    rng = random.Random(seed)
+    batch = []
+    point_id = 0
+    for user_id in range(1, users + 1):
+        for i in range(points_per_user):
+            data_type = DATA_TYPES[i % len(DATA_TYPES)]
+            batch.append(qmodels.PointStruct(
+                id=point_id,
+                vector=random_vector(rng, dim),
+                payload={
+                    "user_id": user_id,
+                    TENANT_FIELD: tenant_value(user_id),
+                    "data_type": data_type,
+                    "content": f"{data_type} document {i} for user {user_id}"
+                }
+            ))
+            point_id += 1
+            if len(batch) >= 1000:
+                client.upsert(collection_name=name, points=batch, wait=True)
+                batch = []
+    if batch:
+        client.upsert(collection_name=name, points=batch, wait=True)
+
+
+def time_searches(client: QdrantClient, name: str, layout: str, users: int, queries: int, dim: int, seed: int):
+    rng = random.Random(seed)
+    multitenant = layout == "multitenant"
+    latencies = []
+    for _ in range(queries):
+        user_id = rng.randint(1, users)
+        vector = random_vector(rng, dim)
+        start = time.perf_counter()
+        hits = client.query_points(
+            collection_name=name,
+            query=vector,
+            query_filter=qmodels.Filter(must=user_conditions(user_id, multitenant)),
+            limit=10
+        ).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert all(hit.payload["user_id"] == user_id for hit in hits), "search returned another user's points"
+    return latencies
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--users", type=int, default=10000)
+    arg_parser.add_argument("--points-per-user", type=int, default=6)
+    arg_parser.add_argument("--dim", type=int, default=128, help="vector size (the app uses 1536)")
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--url", help="Qdrant server URL; default is local-path Qdrant in a temp dir")
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    tmp_dir = None
+    if args.url:
+        client = QdrantClient(url=args.url, api_key=os.getenv("QDRANT_API_KEY"))
+        target = args.url
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="qdrant_bench_")
+        client = QdrantClient(path=tmp_dir)
+        target = f"local path {tmp_dir}"
+
+    total = args.users * args.points_per_user
+    print(f"{args.users} users x {args.points_per_user} points = {total} points, dim {args.dim}, {target}")
+    try:
+        for layout in LAYOUTS:
+            name = f"bench_filtering_{layout}"
+            start = time.perf_counter()
+            load_collection(client, name, layout, args.users, args.points_per_user, args.dim, args.seed)
+            load_s = time.perf_counter() - start
+            if args.url:
+                # Let the optimizer finish building HNSW/payload indexes before timing
+                while client.get_collection(name).status != qmodels.CollectionStatus.GREEN:
+                    time.sleep(0.5)
+
+            latencies = time_searches(client, name, layout, args.users, args.queries, args.dim, args.seed)
+            print(f"  {layout:<12} load {load_s:6.1f}s   p50 {percentile(latencies, 50):7.2f} ms   "
+                  f"p99 {percentile(latencies, 99):7.2f} ms   mean {statistics.mean(latencies):7.2f} ms")
+            client.delete_collection(name)
+    finally:
+        client.close()
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Memory / recall / latency trade-off of quantized dense vectors.
+
+Prints the vector storage needed per million points for each
+QDRANT_QUANTIZATION mode, split into what must stay in RAM and what can move
+to disk with QDRANT_VECTORS_ON_DISK (HNSW links and payloads not included).
+
+Then measures recall@k against exact float32 search on synthetic vectors with
+low intrinsic dimension (like text embeddings), emulating Qdrant's quantization
+in numpy: int8 with the 0.99 quantile range, and binary (one sign bit per
+dimension, scored by Hamming distance). Each mode is measured without
+rescoring and with rescoring an oversampled candidate set
+(QUANTIZATION_OVERSAMPLING) on the float32 originals, as searches do.
+
+Latency depends on Qdrant's SIMD kernels and on disk reads for rescoring, so
+it is only measured with --url, end to end on a Qdrant server (local Qdrant
+ignores quantization settings).
+
+    python scripts/benchmark_qdrant_quantization.py
+    python scripts/benchmark_qdrant_quantization.py --points 20000 --url http://localhost:6333
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.qdrant_layout import (
+    QUANTIZATION_MODES, QUANTIZATION_OVERSAMPLING, dense_vector_params, quantization_config, quantization_search_params
+)
+
+BYTES_PER_DIM = {"none": 4, "scalar": 1, "binary": 1 / 8}
+
+
+def memory_table(dim: int, points: int = 1_000_000):
+    mib = 1024 * 1024
+    original = dim * 4 * points / mib
+    print(f"Vector storage per {points:,} points of {dim} dims (MiB)")
+    print(f"  {'mode':<8} {'on_disk':<8} {'RAM':>9} {'disk':>9}")
+    for mode in QUANTIZATION_MODES:
+        quantized = dim * BYTES_PER_DIM[mode] * points / mib if mode != "none" else 0
+        for on_disk in (False, True):
+            ram = quantized + (0 if on_disk else original)
+            disk = original if on_disk else 0
+            print(f"  {mode:<8} {str(on_disk):<8} {ram:>9.0f} {disk:>9.0f}")
+
+
+def embedding_like_vectors(rng, count: int, dim: int, latent: int = 64, noise: float = 0.3):
+    """Unit vectors near a random latent-dimensional subspace"""
+    basis = rng.standard_normal((latent, dim)).astype(np.float32)
+    vectors = rng.standard_normal((count, latent)).astype(np.float32) @ basis
+    vectors += noise * np.sqrt(latent) * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class Int8Index:
+    def __init__(self, vectors):
+        self.low, self.high = np.quantile(vectors, [0.005, 0.995])
+        self.scale = (self.high - self.low) / 255
+        codes = np.clip(np.round((vectors - self.low) / self.scale), 0, 255)
+        self.decoded = (codes * self.scale + self.low).astype(np.float32)
+
+    def scores(self, query):
+        return self.decoded @ query
+
+
+class BinaryIndex:
+    def __init__(self, vectors):
+        self.codes = np.packbits(vectors > 0, axis=1)
+
+    def scores(self, query):
+        query_bits = np.packbits(query > 0)
+        return -np.unpackbits(self.codes ^ query_bits, axis=1).sum(axis=1, dtype=np.int32)
+
+
+def top(scores, k):
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def emulate(vectors, queries, k: int):
+    exact = [set(top(vectors @ query, k)) for query in queries]
+    indexes = {"scalar": Int8Index(vectors), "binary": BinaryIndex(vectors)}
+
+    print(f"\nRecall@{k} vs exact float32 ({len(vectors):,} points, {len(queries)} queries, numpy emulation)")
+    print(f"  {'mode':<8} {'rescore':<12} {'recall':>7}")
+    for mode in QUANTIZATION_MODES:
+        variants = [("-", None)] if mode == "none" else [("no", None), (f"x{QUANTIZATION_OVERSAMPLING[mode]}", QUANTIZATION_OVERSAMPLING[mode])]
+        for label, oversampling in variants:
+            recalls = []
+            for query, truth in zip(queries, exact):
+                if mode == "none":
+                    hits = top(vectors @ query, k)
+                else:
+                    candidates = top(indexes[mode].scores(query), int(k * (oversampling or 1)))
+                    if oversampling:
+                        candidates = candidates[top(vectors[candidates] @ query, k)]
+                    hits = candidates[:k]
+                recalls.append(len(truth & set(hits)) / k)
+            print(f"  {mode:<8} {label:<12} {statistics.mean(recalls):>7.3f}")
+
+
+def server(url: str, vectors, queries, k: int):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qmodels
+
+    client = QdrantClient(url=url)
+    print(f"\nQdrant server at {url}: recall@{k} vs exact search")
+    print(f"  {'mode':<8} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in QUANTIZATION_MODES:
+        name = f"benchmark_quantization_{mode}"
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        client.create_collection(
+            collection_name=name,
+            vectors_config=dense_vector_params(vectors.shape[1], on_disk=mode != "none"),
+            quantization_config=quantization_config(mode)
+        )
+        for start in range(0, len(vectors), 1000):
+            client.upsert(name, points=[
+                qmodels.PointStruct(id=start + i, vector=vector.tolist())
+                for i, vector in enumerate(vectors[start:start + 1000])
+            ], wait=True)
+
+        recalls, timings = [], []
+        for query in queries:
+            exact = client.query_points(name, query=query.tolist(), limit=k,
+                                        search_params=qmodels.SearchParams(exact=True)).points
+            started = time.perf_counter()
+            hits = client.query_points(name, query=query.tolist(), limit=k,
+                                       search_params=quantization_search_params(mode)).points
+            timings.append((time.perf_counter() - started) * 1000)
+            recalls.append(len({p.id for p in exact} & {p.id for p in hits}) / k)
+        timings.sort()
+        print(f"  {mode:<8} {statistics.mean(recalls):>7.3f} {timings[len(timings) // 2]:>8.2f} "
+              f"{timings[int(len(timings) * 0.99) - 1]:>8.2f}")
+        client.delete_collection(name)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--points", type=int, default=20000)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--dim", type=int, default=1536)
+    arg_parser.add_argument("--k", type=int, default=10)
+    arg_parser.add_argument("--seed", type=int, default=7)
+    arg_parser.add_argument("--url", help="also measure a Qdrant server")
+    args = arg_parser.parse_args()
+
+    memory_table(args.dim)
+    rng = np.random.default_rng(args.seed)
+    vectors = embedding_like_vectors(rng, args.points + args.queries, args.dim)
+    vectors, queries = vectors[:args.points], vectors[args.points:]
+    emulate(vectors, queries, args.k)
+    if args.url:
+        server(args.url, vectors, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
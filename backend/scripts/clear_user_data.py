@@ -11,7 +11,7 @@ from app.modules.auth.models import User
 from app.modules.health_records.models import HealthRecord
 from app.modules.medications.models import Medication
 from app.modules.appointments.models import Appointment
-from app.modules.dashboard.models import HealthProfile, SleepRecord, ActivityRecord, VitalRecord, BodyMeasurement
+from app.modules.dashboard.models import HealthProfile, SleepRecord, ActivityRecord, VitalRecord, VitalRollup, BodyMeasurement
 from app.modules.chat.models import ChatConversation
 
 USER_EMAIL = "vineet.k@palpx.com"
@@ -93,6 +93,10 @@ def clear_user_data():
             db.delete(record)
         total_deleted += count
         
+        count = db.query(VitalRollup).filter(VitalRollup.user_id == user_id).delete()
+        print(f"🗑️  Deleting {count} vital rollups...")
+        total_deleted += count
+        
         body_measurements = db.query(BodyMeasurement).filter(BodyMeasurement.user_id == user_id).all()
         count = len(body_measurements)
         print(f"🗑️  Deleting {count} body measurements...")
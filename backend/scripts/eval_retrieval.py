@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval eval: dense vs sparse (BM25) vs hybrid (RRF) search.
+
+Builds a synthetic multi-user corpus in the document formats the app indexes
+(medications, appointments, lab-report chunks, sleep/activity summaries),
+asks exact-term and descriptive questions with a known relevant document, and
+reports Recall@k and MRR for each retrieval mode, filtered per user like
+RAGService.search. Recall at small k decides how far the rerank candidate
+pool (RAG_SEARCH_LIMIT / RAG_HYBRID_SEARCH_LIMIT) can shrink.
+
+Dense vectors come from the app's embedding model (OpenAI, through the
+embedding cache, so re-runs are free). --embedder hashing uses a local
+feature-hashing stand-in that only checks the plumbing; its dense numbers say
+nothing about real embeddings.
+
+    python scripts/eval_retrieval.py --users 20
+    python scripts/eval_retrieval.py --users 20 --embedder hashing
+"""
+import argparse
+import os
+import random
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from app.services.embedders import HashingEmbedder
+from app.services.qdrant_layout import SPARSE_VECTOR_NAME, search_request, sparse_vectors_config, user_conditions
+from app.services.sparse_encoder import sparse_encoder
+
+MEDICATIONS = [
+    ("Metformin", "500mg", "twice daily with meals"), ("Atorvastatin", "20mg", "once daily at night"),
+    ("Lisinopril", "10mg", "once daily"), ("Levothyroxine", "50mcg", "every morning before breakfast"),
+    ("Amlodipine", "5mg", "once daily"), ("Omeprazole", "20mg", "before breakfast"),
+    ("Sertraline", "50mg", "once daily"), ("Vitamin D3", "1000 IU", "once daily"),
+    ("Aspirin", "75mg", "once daily after lunch"), ("Salbutamol inhaler", "100mcg", "as needed for wheezing"),
+]
+SPECIALTIES = [
+    ("Cardiology", "follow-up on blood pressure and chest tightness"),
+    ("Endocrinology", "diabetes review and insulin adjustment"),
+    ("Dermatology", "persistent rash on forearms"),
+    ("Orthopedics", "knee pain after running"),
+    ("Ophthalmology", "annual eye exam and blurry vision"),
+    ("General Practice", "routine checkup and vaccination"),
+]
+LAB_TESTS = [
+    ("HbA1c", "%", (5.2, 8.5)), ("LDL cholesterol", "mg/dL", (70, 190)), ("HDL cholesterol", "mg/dL", (30, 80)),
+    ("Triglycerides", "mg/dL", (80, 260)), ("TSH", "mIU/L", (0.4, 6.0)), ("Vitamin D", "ng/mL", (12, 60)),
+    ("Creatinine", "mg/dL", (0.6, 1.5)), ("Hemoglobin", "g/dL", (11, 17)), ("Ferritin", "ng/mL", (15, 300)),
+    ("ALT", "U/L", (10, 60)),
+]
+FILLER = (
+    "Sample collected after overnight fasting. Results reviewed by the attending physician. "
+    "Reference ranges are laboratory specific; please discuss any flagged values at your next visit. "
+)
+
+
+def build_user(rng, user_id):
+    """(documents, questions) for one user; each question names the index of its relevant document"""
+    docs, questions = [], []
+
+    def add(content):
+        docs.append(content)
+        return len(docs) - 1
+
+    add(f"Personal Info: DOB: 19{rng.randint(50, 99)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}, Sex: "
+        f"{rng.choice(['Male', 'Female'])}, Blood Type: {rng.choice(['A+', 'O+', 'B-', 'AB+'])}, "
+        f"Height: {rng.randint(150, 195)}cm, Weight: {rng.randint(50, 110)}kg")
+
+    for name, dosage, frequency in rng.sample(MEDICATIONS, rng.randint(3, 6)):
+        index = add(f"Medication: {name}, Dosage: {dosage}, Frequency: {frequency}, Start Date: 2025-0{rng.randint(1, 9)}-01, Notes: None")
+        questions.append((f"{name.split()[0].lower()} dosage", index))
+        questions.append((f"how often should I take my {name.split()[0].lower()}", index))
+
+    for specialty, reason in rng.sample(SPECIALTIES, rng.randint(2, 4)):
+        index = add(f"Appointment: Dr. {rng.choice(['Mehta', 'Rao', 'Smith', 'Garcia', 'Chen'])} ({specialty}), "
+                    f"Date: 2025-1{rng.randint(0, 2)}-{rng.randint(10, 28)} 10:30:00, Reason: {reason}")
+        questions.append((f"when is my {specialty.lower()} appointment", index))
+
+    # Lab reports split into chunks of three tests each, like long PDFs
+    tests = rng.sample(LAB_TESTS, 9)
+    for part in range(3):
+        lines = " ".join(
+            f"{test} {round(rng.uniform(*value_range), 1)} {unit} (ref range varies)."
+            for test, unit, value_range in tests[part * 3:part * 3 + 3]
+        )
+        index = add(f"Health Record: Blood panel {2024 + part} (Lab Report), Date: 202{4 + part}-03-15\n\n"
+                    f"Extracted File Content (part {part + 1}/3):\n{FILLER}{lines} {FILLER}")
+        for test, _, _ in tests[part * 3:part * 3 + 3]:
+            questions.append((f"what was my {test}", index))
+
+    sleep = add(f"Sleep Summary (Last 30 records): Average Duration: {rng.randint(330, 480)}.0 mins. "
+                f"Latest: 2025-09-2{rng.randint(0, 9)} - {rng.randint(300, 500)} mins.")
+    questions.append(("how has my sleep been recently", sleep))
+    activity = add(f"Activity Summary (Last 30 records): Average Steps: {rng.randint(3000, 12000)}. "
+                   f"Latest: 2025-09-2{rng.randint(0, 9)} - {rng.randint(2000, 15000)} steps.")
+    questions.append(("am I walking enough each day", activity))
+    return docs, questions
+
+
+def hashing_embedder():
+    embedder = HashingEmbedder()
+    return embedder.embed, embedder.vector_size
+
+
+def openai_embedder():
+    from app.services.rag_service import rag_service
+    return rag_service.embed_batch, rag_service.vector_size
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--users", type=int, default=20)
+    arg_parser.add_argument("--embedder", choices=["openai", "hashing"], default="openai")
+    arg_parser.add_argument("--seed", type=int, default=11)
+    args = arg_parser.parse_args()
+
+    embed, dim = openai_embedder() if args.embedder == "openai" else hashing_embedder()
+    rng = random.Random(args.seed)
+
+    client = QdrantClient(location=":memory:")
+    name = "eval_retrieval"
+    client.create_collection(
+        collection_name=name,
+        vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE),
+        sparse_vectors_config=sparse_vectors_config()
+    )
+
+    all_questions = []
+    point_id = 0
+    for user_id in range(1, args.users + 1):
+        docs, questions = build_user(rng, user_id)
+        ids = list(range(point_id, point_id + len(docs)))
+        point_id += len(docs)
+        client.upsert(name, points=[
+            qmodels.PointStruct(
+                id=pid,
+                vector={"": dense, SPARSE_VECTOR_NAME: sparse_encoder.encode_document(content)},
+                payload={"user_id": user_id, "content": content}
+            )
+            for pid, content, dense in zip(ids, docs, embed(docs))
+        ])
+        all_questions.extend((user_id, query, ids[index]) for query, index in questions)
+
+    query_vectors = embed([query for _, query, _ in all_questions])
+    ks = (3, 5, 6, 10)
+    ranks = defaultdict(list)
+    for (user_id, query, relevant), dense in zip(all_questions, query_vectors):
+        conditions = user_conditions(user_id)
+        sparse = sparse_encoder.encode_query(query)
+        requests = {
+            "dense": search_request(name, dense, conditions, max(ks)),
+            "sparse": dict(collection_name=name, query=sparse, using=SPARSE_VECTOR_NAME,
+                           query_filter=qmodels.Filter(must=conditions), limit=max(ks)),
+            "hybrid": search_request(name, dense, conditions, max(ks), sparse=sparse),
+        }
+        for mode, request in requests.items():
+            hit_ids = [point.id for point in client.query_points(**request).points]
+            ranks[mode].append(hit_ids.index(relevant) + 1 if relevant in hit_ids else None)
+
+    print(f"{len(all_questions)} questions over {point_id} documents ({args.users} users), embedder: {args.embedder}")
+    print(f"  {'mode':<8}" + "".join(f"  R@{k:<4}" for k in ks) + "  MRR@10")
+    for mode, mode_ranks in ranks.items():
+        recalls = [sum(1 for r in mode_ranks if r is not None and r <= k) / len(mode_ranks) for k in ks]
+        mrr = sum(1 / r for r in mode_ranks if r is not None) / len(mode_ranks)
+        print(f"  {mode:<8}" + "".join(f"  {recall:.3f}" for recall in recalls) + f"  {mrr:.3f}")
+
+
+if __name__ == "__main__":
+    main()
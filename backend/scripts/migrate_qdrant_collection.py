@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Bring the existing health_insights collection in line with the configured layout.
+
+By default, applies QDRANT_QUANTIZATION / QDRANT_VECTORS_ON_DISK in place with
+update_collection; Qdrant re-quantizes and moves vectors in the background
+while the collection stays searchable.
+
+--recreate copies the points into a new versioned collection with the full
+current layout, for settings that can't be changed in place (the sparse vector
+for hybrid search, multitenant HNSW), and moves the alias to it. Points keep
+their stored embeddings (no embeddings API calls) and sparse vectors are
+computed from the stored content; running backend processes switch to the new
+layout within QDRANT_LAYOUT_CHECK_SECONDS. To change the embedder or chunking, use
+scripts/reindex_collection.py instead. Without QDRANT_URL stop the backend
+first (local Qdrant allows only one process to open its storage).
+
+    python scripts/migrate_qdrant_collection.py --dry-run
+    QDRANT_QUANTIZATION=scalar QDRANT_VECTORS_ON_DISK=true python scripts/migrate_qdrant_collection.py
+    python scripts/migrate_qdrant_collection.py --recreate
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: F401  (loads .env)
+from qdrant_client.http import models as qmodels
+
+from app.services.qdrant_layout import (
+    SPARSE_VECTOR_NAME, TENANT_FIELD, live_collection, storage_updates, switch_alias, tenant_value,
+    versioned_collection_name
+)
+from app.services.rag_service import rag_service
+from app.services.sparse_encoder import sparse_encoder
+
+BATCH_SIZE = 256
+
+
+def _dense(vector):
+    return vector.get("") if isinstance(vector, dict) else vector
+
+
+def copy_points(source: str, target: str) -> int:
+    """Copy every point from source to target in the configured point format"""
+    copied = 0
+    offset = None
+    while True:
+        points, offset = rag_service.qdrant.scroll(
+            collection_name=source, limit=BATCH_SIZE, offset=offset, with_payload=True, with_vectors=True
+        )
+        batch = []
+        for point in points:
+            payload = dict(point.payload)
+            if "user_id" in payload:
+                payload.setdefault(TENANT_FIELD, tenant_value(payload["user_id"]))
+            vector = _dense(point.vector)
+            if rag_service.hybrid_search_enabled:
+                vector = {"": vector, SPARSE_VECTOR_NAME: sparse_encoder.encode_document(payload.get("content") or "")}
+            batch.append(qmodels.PointStruct(id=point.id, vector=vector, payload=payload))
+        if batch:
+            rag_service.qdrant.upsert(collection_name=target, points=batch, wait=True)
+            copied += len(batch)
+        if offset is None:
+            return copied
+
+
+def migrate_in_place(name: str, dry_run: bool):
+    updates = storage_updates(rag_service.qdrant, name, rag_service.quantization, rag_service.vectors_on_disk)
+    if not updates:
+        print(f"{name} already uses quantization={rag_service.quantization}, on_disk={rag_service.vectors_on_disk}")
+        return
+    print(f"Updating {name}: {updates}")
+    if not dry_run:
+        rag_service.qdrant.update_collection(collection_name=name, **updates)
+        print("Done; Qdrant applies the change in the background (collection status turns green when finished).")
+
+
+def recreate(name: str, dry_run: bool):
+    target = versioned_collection_name(rag_service.collection_name)
+    total = rag_service.qdrant.count(collection_name=name, exact=True).count
+    print(f"Copying {name} ({total} points) to {target} with quantization={rag_service.quantization}, "
+          f"on_disk={rag_service.vectors_on_disk}, hybrid={rag_service.hybrid_search_enabled}, "
+          f"multitenant={rag_service.multitenant_enabled}")
+    if dry_run:
+        return
+
+    rag_service.create_collection(target)
+    print(f"  copied {copy_points(name, target)} points to {target}")
+    previous = switch_alias(rag_service.qdrant, rag_service.collection_name, target)
+    # A pre-alias collection is already gone after the switch
+    if previous:
+        rag_service.qdrant.delete_collection(previous)
+    print(f"Done; {rag_service.collection_name} -> {target}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--recreate", action="store_true", help="rebuild the collection with the full layout")
+    arg_parser.add_argument("--dry-run", action="store_true")
+    args = arg_parser.parse_args()
+
+    try:
+        name = live_collection(rag_service.qdrant, rag_service.collection_name)
+        if name is None:
+            print(f"{rag_service.collection_name} does not exist yet; it is created with the configured layout at startup.")
+        elif args.recreate:
+            recreate(name, args.dry_run)
+        else:
+            migrate_in_place(name, args.dry_run)
+    finally:
+        rag_service.qdrant.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Rebuild the RAG collection from SQL rows without interrupting searches.
+
+Builds a new versioned collection (health_insights_v<timestamp>) with the
+current embedder, chunking and Qdrant layout, then moves the health_insights
+alias to it and deletes the previous collection (--keep-previous keeps it for
+rollback with --switch-to). Run from the backend directory so uploaded files
+are found. Local-path Qdrant allows only one process and its client is not
+thread-safe, so without QDRANT_URL stop the backend first; users are then
+built one at a time.
+
+Running backend processes pick up the new collection's layout (sparse vectors,
+multitenant) within QDRANT_LAYOUT_CHECK_SECONDS (30 by default). A reindex for
+a different embedder or vector size needs every backend process restarted with
+that embedder configured.
+
+    python scripts/reindex_collection.py --concurrency 4
+    python scripts/reindex_collection.py --keep-previous
+    python scripts/reindex_collection.py --switch-to health_insights_v20251018120000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app import models  # noqa: F401  (registers every model for relationship lookups)
+from app.modules.auth.models import User
+from app.modules.doctors import models as doctors_models  # noqa: F401
+from app.modules.reviews import models as reviews_models  # noqa: F401
+from app.modules.dashboard.service import REFRESH_DATA_TYPES, dashboard_service
+from app.services.qdrant_layout import live_collection, switch_alias
+from app.services.rag_service import rag_service
+from app.services.reindex import Reindexer
+
+
+def list_user_ids():
+    db = SessionLocal()
+    try:
+        return [row.id for row in db.query(User.id).order_by(User.id)]
+    finally:
+        db.close()
+
+
+def print_progress(progress):
+    eta = f"{progress['eta_seconds']:.0f}s" if progress["eta_seconds"] is not None else "?"
+    print(
+        f"\r  {progress['stage']}: {progress['done']}/{progress['total']} users, {progress['documents']} documents, "
+        f"{progress['failed']} failed, {progress['elapsed_seconds']:.0f}s elapsed, ETA {eta}   ",
+        end="" if progress["done"] < progress["total"] else "\n", flush=True
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--concurrency", type=int, default=4, help="users built in parallel")
+    arg_parser.add_argument("--keep-previous", action="store_true", help="don't delete the previous collection")
+    arg_parser.add_argument("--switch-to", metavar="COLLECTION", help="only point the alias at an existing collection")
+    args = arg_parser.parse_args()
+
+    alias = rag_service.collection_name
+    try:
+        if args.switch_to:
+            previous = switch_alias(rag_service.qdrant, alias, args.switch_to)
+            print(f"{alias} -> {args.switch_to} (was {previous})")
+            return
+
+        concurrency = args.concurrency if rag_service.qdrant_url else 1
+        print(f"Reindexing {alias} (currently {live_collection(rag_service.qdrant, alias)}) "
+              f"with {rag_service.embedding_model}, {rag_service.vector_size} dims")
+        reindexer = Reindexer(
+            rag_service, SessionLocal, dashboard_service.rag_sources, REFRESH_DATA_TYPES,
+            concurrency=concurrency, on_progress=print_progress
+        )
+        summary = reindexer.run(list_user_ids, keep_previous=args.keep_previous)
+        if summary["switched"]:
+            print(f"{alias} -> {summary['collection']} (was {summary['previous']})")
+        else:
+            print(f"Not switched: {summary['build']['failed']} users failed; {summary['collection']} kept for inspection")
+            sys.exit(1)
+    finally:
+        rag_service.qdrant.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ def reset_db():
         db.query(models.SleepRecord).delete()
         db.query(models.ActivityRecord).delete()
         db.query(models.VitalRecord).delete()
+        db.query(models.VitalRollup).delete()
         db.query(models.BodyMeasurement).delete()
         db.query(models.ContactMessage).delete() # Not linked to user but good to clear? Maybe keep. User said "delete all accounts".
         
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The rag_service singleton opens its embedding cache on import; tests get a throwaway one, not DATA_DIR's
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="embedding-cache-"), "embedding_cache.sqlite3")
+
+from app.core.database import Base
+
+# Import all models to ensure they are registered with Base (mirrors app.main)
+from app.modules.auth import models as auth_models  # noqa: F401
+from app.modules.contact import models as contact_models  # noqa: F401
+from app.modules.chat import models as chat_models  # noqa: F401
+from app.modules.health_records import models as health_records_models  # noqa: F401
+from app.modules.medications import models as medications_models  # noqa: F401
+from app.modules.appointments import models as appointments_models  # noqa: F401
+from app.modules.voice_agent import models as voice_agent_models  # noqa: F401
+from app.modules.dashboard import models as dashboard_models  # noqa: F401
+from app.modules.doctors import models as doctors_models  # noqa: F401
+from app.modules.reviews import models as reviews_models  # noqa: F401
+from app.modules.privacy import models as privacy_models  # noqa: F401
+
+
+@pytest.fixture
+def db():
+    """Session bound to a fresh in-memory SQLite database"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,41 @@
+"""
+Tests for the per-user semantic answer cache.
+"""
+
+from app.services.answer_cache import SemanticAnswerCache, documents_fingerprint
+
+DOCS = documents_fingerprint([{"content": "Sleep: 7h"}, {"content": "Steps: 9000"}])
+
+
+def test_similar_query_over_same_documents_hits():
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.put(1, "insight", [1.0, 0.0, 0.0], DOCS, "answer", context=[{"data_type": "sleep_summary"}])
+
+    # Document order does not matter, scale does not matter
+    same_docs = documents_fingerprint([{"content": "Steps: 9000"}, {"content": "Sleep: 7h"}])
+    assert cache.get(1, "insight", [2.0, 0.1, 0.0], same_docs) == {"answer": "answer", "context": [{"data_type": "sleep_summary"}]}
+
+    assert cache.get(1, "insight", [0.0, 1.0, 0.0], DOCS) is None
+    assert cache.get(1, "insight", [1.0, 0.0, 0.0], documents_fingerprint([{"content": "Sleep: 5h"}])) is None
+    assert cache.get(1, "doctor", [1.0, 0.0, 0.0], DOCS) is None
+    assert cache.get(2, "insight", [1.0, 0.0, 0.0], DOCS) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 4)
+
+
+def test_invalidation_lru_and_ttl():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.put(1, "insight", [1.0, 0.0], DOCS, "first")
+    cache.put(2, "insight", [1.0, 0.0], DOCS, "second")
+    cache.invalidate_user(1)
+    assert cache.get(1, "insight", [1.0, 0.0], DOCS) is None
+    assert cache.get(2, "insight", [1.0, 0.0], DOCS)["answer"] == "second"
+
+    cache.put(3, "insight", [1.0, 0.0], DOCS, "third")
+    cache.put(4, "insight", [1.0, 0.0], DOCS, "fourth")
+    # User 2's entry was least recently used
+    assert cache.get(2, "insight", [1.0, 0.0], DOCS) is None
+    assert cache.stats()["entries"] == 2
+
+    expired = SemanticAnswerCache(ttl_seconds=-1)
+    expired.put(1, "insight", [1.0, 0.0], DOCS, "answer")
+    assert expired.get(1, "insight", [1.0, 0.0], DOCS) is None
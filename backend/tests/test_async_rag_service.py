@@ -0,0 +1,182 @@
+"""
+Tests for the async RAG pipeline: stage ordering, cache use and per-stage timeouts.
+OpenAI and Cohere are replaced by small async fakes; Qdrant runs in memory.
+"""
+import asyncio
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.async_rag_service import AsyncRAGService, RAGTimeoutError
+from app.services.embedders import OpenAIEmbedder
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rerank_policy import RerankPolicy
+
+DIM = 4
+
+
+class FakeOpenAI:
+    def __init__(self, completion_delay=0.0):
+        self.embedded = []
+        self.prompts = []
+        self.completion_delay = completion_delay
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    async def _embed(self, input, model):
+        self.embedded.extend(input)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[1.0] * DIM) for i in range(len(input))])
+
+    async def _complete(self, model, messages, stream=False, **kwargs):
+        await asyncio.sleep(self.completion_delay)
+        self.prompts.append(messages[-1]["content"])
+        if stream:
+            return FakeStream(['{"summary"', ': "ok"}'])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"summary": "ok"}'))])
+
+
+class FakeStream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.closed = False
+
+    async def __aiter__(self):
+        for delta in self.deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self):
+        self.closed = True
+
+
+class SlowCohere:
+    async def rerank(self, **kwargs):
+        await asyncio.sleep(1)
+
+
+def _service(openai):
+    qdrant = QdrantClient(location=":memory:")
+    qdrant.create_collection("health_insights", vectors_config=qmodels.VectorParams(size=DIM, distance=qmodels.Distance.COSINE))
+    qdrant.upsert("health_insights", points=[
+        qmodels.PointStruct(id=1, vector=[1.0] * DIM, payload={"user_id": 1, "content": "Medication: Aspirin"}),
+        qmodels.PointStruct(id=2, vector=[1.0] * DIM, payload={"user_id": 2, "content": "Medication: Other"}),
+    ])
+    sync = SimpleNamespace(
+        openai_api_key="test", cohere_api_key="test", qdrant_url=None, qdrant_api_key=None, qdrant=qdrant,
+        embedding_cache=EmbeddingCache(path=None), answer_cache=SemanticAnswerCache(), rerank_policy=RerankPolicy(),
+        embedder=OpenAIEmbedder(None), collection_name="health_insights", multitenant=False,
+        hybrid=False, search_limit=10, quantization="none", layout_check_due=lambda: False
+    )
+    service = AsyncRAGService(sync)
+    service.openai = openai
+    service.cohere = SlowCohere()
+    service.rerank_timeout = 0.05
+    return service
+
+
+def test_generate_insight_uses_only_the_users_documents():
+    openai = FakeOpenAI()
+    service = _service(openai)
+
+    # A single candidate needs no rerank
+    assert asyncio.run(service.generate_insight(1, "my meds")) == '{"summary": "ok"}'
+    assert "Medication: Aspirin" in openai.prompts[0]
+    assert "Medication: Other" not in openai.prompts[0]
+
+    # The repeated question is answered from the caches: no embedding or completion call
+    asyncio.run(service.generate_insight(1, "my meds"))
+    assert openai.embedded == ["my meds"]
+    assert len(openai.prompts) == 1
+
+    service.sync.answer_cache.invalidate_user(1)
+    asyncio.run(service.generate_insight(1, "my meds"))
+    assert len(openai.prompts) == 2
+
+
+class ThreadRecordingCache(EmbeddingCache):
+    """Notes which thread each disk-tier call runs on"""
+
+    def __init__(self, path):
+        super().__init__(path=path)
+        self.threads = []
+
+    def get_many(self, model, texts):
+        self.threads.append(threading.current_thread())
+        return super().get_many(model, texts)
+
+    def put_many(self, model, texts, vectors):
+        self.threads.append(threading.current_thread())
+        super().put_many(model, texts, vectors)
+
+
+def test_embedding_cache_disk_tier_stays_off_the_event_loop(tmp_path):
+    openai = FakeOpenAI()
+    service = _service(openai)
+    service.sync.embedding_cache = cache = ThreadRecordingCache(str(tmp_path / "cache.sqlite3"))
+
+    async def embed_twice():
+        return await service.embed_text("my sleep"), await service.embed_text("my sleep"), threading.current_thread()
+
+    first, second, loop_thread = asyncio.run(embed_twice())
+    assert first == second and openai.embedded == ["my sleep"]
+    # One disk miss and one write, both in worker threads; the repeat is a memory hit
+    assert len(cache.threads) == 2 and loop_thread not in cache.threads
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_rerank_timeout_falls_back_to_retrieval_order():
+    service = _service(FakeOpenAI())
+    docs = [{"id": str(i), "content": f"doc {i}", "score": 0.5} for i in range(6)]
+
+    assert asyncio.run(service.rerank("q", docs, top_n=5)) == docs[:5]
+    assert service.sync.rerank_policy.stats()["error"] == 1
+
+
+def test_slow_generation_raises_stage_timeout():
+    service = _service(FakeOpenAI(completion_delay=1))
+    service.generate_timeout = 0.05
+
+    with pytest.raises(RAGTimeoutError) as exc_info:
+        asyncio.run(service.generate_insight(1, "my meds"))
+    assert exc_info.value.stage == "generation"
+
+
+def test_stream_insight_sends_retrieval_before_tokens():
+    service = _service(FakeOpenAI())
+
+    async def collect():
+        return [event async for event in service.stream_insight(1, "my meds")]
+
+    events = asyncio.run(collect())
+    assert [name for name, _ in events] == ["retrieval", "token", "token", "completion"]
+    assert len(events[0][1]) == 1
+    assert events[-1][1] == '{"summary": "ok"}'
+
+
+def test_stream_insight_caches_only_validated_answers():
+    openai = FakeOpenAI()
+    service = _service(openai)
+
+    def reject(answer):
+        raise ValueError("not an insight")
+
+    async def collect(validate):
+        return [event async for event in service.stream_insight(1, "my meds", validate)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(collect(reject))
+    assert service.sync.answer_cache.stats()["entries"] == 0
+
+    events = asyncio.run(collect(json.loads))
+    assert events[-1] == ("completion", {"summary": "ok"})
+    assert len(openai.prompts) == 2
+
@@ -0,0 +1,70 @@
+"""
+Tests for token-budgeted RAG context assembly.
+A word-level encoding stands in for tiktoken so budgets are easy to count.
+"""
+
+from app.services.context_builder import ContextBuilder
+from app.services.text_chunker import TextChunker
+
+
+class WordEncoding:
+    def encode(self, text, disallowed_special="all"):
+        # Like tiktoken, refuses special-token strings unless told they are plain text
+        if disallowed_special == "all" and "<|endoftext|>" in text:
+            raise ValueError("special token in text")
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def _builder(max_tokens, min_truncated_tokens=5):
+    chunker = TextChunker(chunk_tokens=100, overlap_tokens=10, encoding=WordEncoding())
+    return ContextBuilder(max_tokens=max_tokens, chunker=chunker, min_truncated_tokens=min_truncated_tokens)
+
+
+def _doc(text, rerank_score):
+    return {"content": text, "rerank_score": rerank_score}
+
+
+def test_packs_by_rerank_score_and_skips_near_duplicates():
+    docs = [
+        _doc("Medication: Metformin 500mg twice daily with meals", 0.4),
+        _doc("Sleep summary: average 6.5 hours over the last week", 0.9),
+        _doc("Sleep  summary: average 6.5 hours over the last week", 0.8),
+    ]
+    context = _builder(100).build(docs)
+
+    assert context.text == (
+        "Document 1: Sleep summary: average 6.5 hours over the last week\n\n"
+        "Document 2: Medication: Metformin 500mg twice daily with meals"
+    )
+    assert (context.documents, context.duplicates, context.truncated, context.dropped) == (2, 1, 0, 0)
+    # (2 prefix + 9 content) + 1 separator + (2 prefix + 7 content) words
+    assert context.tokens == 21
+
+
+def test_lowest_ranked_documents_are_truncated_then_dropped():
+    long_text = " ".join(f"lab{i}" for i in range(50))
+    docs = [
+        _doc("Top result " + " ".join(f"a{i}" for i in range(10)), 0.9),
+        _doc(long_text, 0.5),
+        _doc("Low ranked note that no longer fits", 0.1),
+    ]
+    context = _builder(30).build(docs)
+
+    first, second = context.text.split("\n\n")
+    assert first.startswith("Document 1: Top result")
+    assert second.startswith("Document 2: lab0 lab1") and second.endswith("[...]")
+    assert (context.documents, context.truncated, context.dropped) == (2, 1, 1)
+    assert context.tokens <= 30
+
+
+def test_special_token_strings_do_not_break_the_context():
+    builder = _builder(max_tokens=12)
+    docs = [{"content": "pasted note <|endoftext|> " + " ".join(f"w{i}" for i in range(20)), "score": 0.9}]
+
+    context = builder.build(docs)
+
+    assert context.truncated == 1 and "<|endoftext|>" in context.text
+
@@ -0,0 +1,74 @@
+"""
+Tests for the aggregated, cached dashboard summary.
+Runs against the in-memory SQLite `db` fixture from conftest.py.
+"""
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from app.modules.dashboard.ingestion import HealthDataIngestor
+from app.modules.dashboard.service import dashboard_service, dashboard_cache
+
+IST = pytz.FixedOffset(330)
+
+
+def _seed(db, user_id=1):
+    today = date.today()
+    ingestor = HealthDataIngestor(db, user_id)
+    ingestor.upsert_activity_records([
+        {'date': today - timedelta(days=offset), 'steps': steps, 'distance': steps // 2,
+         'flights_climbed': 0, 'active_calories': steps // 20, 'basal_calories': 1500}
+        for offset, steps in [(0, 4000), (3, 8000), (20, 12000), (40, 99999)]
+    ])
+    ingestor.upsert_sleep_records([
+        {'date': today - timedelta(days=offset), 'sleep_start': None, 'sleep_end': None,
+         'total_duration': minutes, 'deep_sleep': 0, 'core_sleep': minutes, 'rem_sleep': 0}
+        for offset, minutes in [(0, 420), (2, 360), (15, 480)]
+    ])
+    now = datetime.now(IST).replace(microsecond=0)
+    ingestor.update_vital_rollups(ingestor.insert_vital_records([
+        {'recorded_at': now - timedelta(days=5), 'heart_rate': 60},
+        {'recorded_at': now - timedelta(hours=1), 'heart_rate': 80},
+        {'recorded_at': now - timedelta(days=45), 'heart_rate': 150},
+    ]))
+    db.commit()
+
+
+def test_dashboard_summary_aggregates(db):
+    dashboard_cache.clear()
+    _seed(db)
+    today = date.today()
+
+    summary = dashboard_service.get_dashboard_summary(db, 1)
+
+    assert summary.profile is None
+    assert summary.today_stats == {
+        'steps': 4000, 'active_calories': 200, 'distance': 2000, 'sleep_duration': 420, 'heart_rate': 80
+    }
+    assert summary.week_trends == {
+        'daily_steps': [
+            {'date': str(today - timedelta(days=3)), 'steps': 8000},
+            {'date': str(today), 'steps': 4000}
+        ],
+        'daily_sleep': [
+            {'date': str(today - timedelta(days=2)), 'duration': 360},
+            {'date': str(today), 'duration': 420}
+        ],
+        'total_steps': 12000,
+        'avg_sleep': 390
+    }
+    assert summary.month_averages == {
+        'avg_steps': 8000, 'avg_sleep': 420, 'avg_heart_rate': 70, 'total_distance': 12000
+    }
+
+
+def test_dashboard_summary_is_cached_until_invalidated(db):
+    dashboard_cache.clear()
+    first = dashboard_service.get_dashboard_summary(db, 1)
+    assert first.today_stats['steps'] == 0
+
+    _seed(db)
+    assert dashboard_service.get_dashboard_summary(db, 1) is first
+
+    dashboard_service.invalidate_dashboard(1)
+    assert dashboard_service.get_dashboard_summary(db, 1).today_stats['steps'] == 4000
@@ -0,0 +1,97 @@
+"""
+Tests for the embedding backends.
+No model files or network: the local backend gets a stand-in model.
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.async_rag_service import AsyncRAGService
+from app.services.embedders import Embedder, HashingEmbedder, LocalEmbedder, OpenAIEmbedder, create_embedder
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+
+
+class FakeModel:
+    """Stands in for fastembed.TextEmbedding"""
+
+    def __init__(self):
+        self.threads = set()
+
+    def embed(self, texts, batch_size=256):
+        self.threads.add(threading.current_thread().name)
+        for text in texts:
+            yield np.array([float(len(text)), 1.0])
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        # Out of order on purpose: results are matched back by index
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+    first, second, other = embedder.embed(["metformin 500mg daily", "metformin 500mg daily", "knee pain"])
+    assert first == second and first != other
+    assert len(first) == embedder.vector_size == 64
+    assert abs(sum(x * x for x in first) - 1.0) < 1e-9
+
+
+def test_openai_embedder_keeps_input_order_across_requests(monkeypatch):
+    monkeypatch.setattr("app.services.embedders.token_batches", lambda texts: [texts[:2], texts[2:]])
+    client = SimpleNamespace(embeddings=FakeEmbeddings())
+    embedder = OpenAIEmbedder(client)
+    assert embedder.embed(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+    assert client.embeddings.calls == [["a", "bb"], ["ccc"]]
+    assert (embedder.name, embedder.vector_size, embedder.remote) == ("text-embedding-3-small", 1536, True)
+
+
+def test_local_embedder_runs_batches_on_its_pool_in_order():
+    embedder = LocalEmbedder("test-model", batch_size=2, workers=2)
+    embedder._model, embedder._vector_size = FakeModel(), 2
+
+    texts = [f"t{'x' * i}" for i in range(5)]
+    assert embedder.embed(texts) == [[float(len(text)), 1.0] for text in texts]
+    assert all(name.startswith("local-embedder") for name in embedder._model.threads)
+    assert embedder.embed([]) == []
+    assert (embedder.name, embedder.vector_size, embedder.remote) == ("local:test-model", 2, False)
+
+
+def test_unknown_backend_is_rejected():
+    assert isinstance(create_embedder("hashing"), HashingEmbedder)
+    with pytest.raises(ValueError):
+        create_embedder("word2vec")
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoEmbed(Embedder):
+        name = "incomplete"
+
+        @property
+        def vector_size(self):
+            return 2
+
+    with pytest.raises(TypeError):
+        NoEmbed()
+
+
+def test_async_embedding_with_a_local_backend_skips_the_api():
+    embedder = HashingEmbedder(dim=16)
+    sync = SimpleNamespace(
+        openai_api_key="test", cohere_api_key="test", qdrant_url=None, qdrant_api_key=None,
+        embedder=embedder, embedding_cache=EmbeddingCache(path=None), embedding_batcher=EmbeddingBatcher(embedder.embed)
+    )
+    service = AsyncRAGService(sync)
+    service.openai = None
+
+    assert asyncio.run(service.embed_text("my sleep")) == embedder.embed(["my sleep"])[0]
+    assert sync.embedding_cache.get(embedder.name, "my sleep") is not None
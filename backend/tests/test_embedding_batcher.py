@@ -0,0 +1,93 @@
+"""
+Tests for embedding request batching.
+The embeddings endpoint is replaced by a local function that records each call.
+"""
+import threading
+
+import pytest
+
+from app.services import embedding_batcher
+from app.services.embedding_batcher import EmbeddingBatcher, count_tokens, token_batches
+
+
+class RecordingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+def test_token_batches_respect_input_and_token_limits():
+    texts = [f"text {i}" for i in range(10)]
+    assert [len(batch) for batch in token_batches(texts, max_inputs=4)] == [4, 4, 2]
+
+    per_text = count_tokens(texts[0])
+    batches = list(token_batches(texts, max_tokens=per_text * 3))
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [text for batch in batches for text in batch] == texts
+
+    # A text over the batch limit on its own still gets a batch of its own
+    assert list(token_batches(["x" * 300, "y"], max_tokens=10, max_input_tokens=1000)) == [["x" * 300], ["y"]]
+
+
+class CharEncoding:
+    """Stands in for cl100k_base: one token per character"""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text)
+
+
+def test_tokens_are_counted_with_the_tokenizer_and_oversized_inputs_rejected(monkeypatch):
+    monkeypatch.setattr(embedding_batcher.text_chunker, "_encoding", CharEncoding())
+    # Digits tokenize far worse than the 3-chars-per-token estimate
+    assert count_tokens("HbA1c 6.8 88231990") == 18
+
+    batches = list(token_batches(["1234", "5678", "90"], max_tokens=8))
+    assert batches == [["1234", "5678"], ["90"]]
+    with pytest.raises(ValueError):
+        list(token_batches(["ok", "x" * 11], max_input_tokens=10))
+
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_input_tokens=10)
+    with pytest.raises(ValueError):
+        batcher.embed("x" * 11)
+    assert batcher.embed("short") == [5.0]
+    assert embedder.calls == [["short"]]
+
+
+def test_concurrent_requests_share_one_call():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_wait_ms=200)
+    start = threading.Barrier(8)
+    results = {}
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.embed("q" * i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: [float(i)] for i in range(8)}
+    assert len(embedder.calls) < 8
+    assert sum(len(call) for call in embedder.calls) == 8
+
+
+def test_batch_errors_reach_every_waiting_caller():
+    def failing(texts):
+        raise RuntimeError("rate limited")
+
+    batcher = EmbeddingBatcher(failing, max_wait_ms=50)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+    # The worker keeps serving later requests
+    batcher.embed_batch = RecordingEmbedder()
+    assert batcher.embed("ok") == [2.0]
@@ -0,0 +1,36 @@
+"""
+Tests for the content-hash embedding cache.
+"""
+
+from app.services.embedding_cache import EmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def test_memory_tier_hits_and_misses():
+    cache = EmbeddingCache(path=None)
+    assert cache.get(MODEL, "hello") is None
+
+    cache.put(MODEL, "hello", [0.5, 0.25])
+    assert cache.get_many(MODEL, ["hello", "other", "hello"]) == [[0.5, 0.25], None, [0.5, 0.25]]
+    # Vectors are keyed by model as well as content
+    assert cache.get("text-embedding-3-large", "hello") is None
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (2, 0, 3)
+
+
+def test_disk_tier_survives_restart_and_lru_eviction(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path=path, max_memory_entries=2)
+    cache.put_many(MODEL, ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+    assert cache.stats()["memory_entries"] == 2
+
+    # "a" was evicted from memory but is still on disk
+    assert cache.get(MODEL, "a") == [1.0]
+    assert cache.stats()["disk_hits"] == 1
+
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get_many(MODEL, ["c", "b", "a", "d"]) == [[3.0], [2.0], [1.0], None]
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (3, 1)
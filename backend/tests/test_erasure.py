@@ -0,0 +1,273 @@
+"""
+Tests for batched, resumable user data erasure.
+Jobs run synchronously against a temporary SQLite file; Qdrant is a stand-in point store.
+"""
+import os
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from app.core.database import Base, get_db
+from app.core.security import get_current_user
+from app.modules.appointments.router import router as appointments_router
+from app.modules.auth.models import User
+from app.modules.contact.models import ContactMessage
+from app.modules.dashboard import import_jobs
+from app.modules.dashboard.models import HealthImportJob
+from app.modules.health_records.models import HealthRecord
+from app.modules.health_records.router import router as health_records_router
+from app.modules.medications.router import router as medications_router
+from app.modules.medications.models import Medication
+from app.modules.privacy import erasure
+from app.modules.privacy.erasure import ErasureJobRunner, erasure_pending
+from app.modules.privacy.models import ErasureJob
+from app.services.embedding_cache import EmbeddingCache
+
+
+class PointStore:
+    """RAGService stand-in holding (user_id, content) points per collection"""
+
+    def __init__(self):
+        self.collections = {
+            "health_insights_v1": [(1, f"Medication {i}") for i in range(5)] + [(2, "Medication other")],
+            "health_insights_v2": [(1, "Medication 0")],
+        }
+        self.batches = []
+        self.invalidated = []
+        self.answer_cache = self
+
+    def user_collections(self):
+        return list(self.collections)
+
+    def purge_user_batch(self, user_id, collection_name, batch_size=500):
+        points = self.collections[collection_name]
+        mine = [p for p in points if p[0] == user_id][:batch_size]
+        self.collections[collection_name] = [p for p in points if p not in mine]
+        if mine:
+            self.batches.append(len(mine))
+        return len(mine)
+
+    def invalidate_user(self, user_id):
+        self.invalidated.append(user_id)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'erasure.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    store = PointStore()
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(erasure, "SessionLocal", session_factory)
+    monkeypatch.setattr(import_jobs, "SessionLocal", session_factory)
+    monkeypatch.setattr(erasure, "rag_service", store)
+    monkeypatch.setattr(erasure, "UPLOAD_DIR", str(uploads))
+
+    db = session_factory()
+    for user_id in (1, 2):
+        db.add(User(id=user_id, email=f"user{user_id}@example.com", full_name="Test"))
+        (uploads / f"scan{user_id}.pdf").write_bytes(b"%PDF")
+        db.add(HealthRecord(user_id=user_id, title="Scan", file_url=f"/uploads/health_records/scan{user_id}.pdf",
+                            record_date=date(2025, 1, 1)))
+        for i in range(5):
+            db.add(Medication(user_id=user_id, medication_name=f"Medication {i}", start_date=date(2025, 1, 1)))
+        db.add(ContactMessage(name="Test", email=f"user{user_id}@example.com", message="Hello"))
+    db.commit()
+    yield db, store, uploads
+    db.close()
+    engine.dispose()
+
+
+def _queue(db, user_id, scope, stage="queued"):
+    job = ErasureJob(id=f"job-{scope}-{stage}", user_id=user_id, scope=scope, stage=stage,
+                     points_deleted=0, files_deleted=0, rows_deleted=0, attempts=0)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def _job(db, job_id):
+    db.expire_all()
+    return db.query(ErasureJob).filter(ErasureJob.id == job_id).one()
+
+
+def _job_stage(db, job_id):
+    db.expire_all()
+    return db.query(HealthImportJob.stage).filter(HealthImportJob.id == job_id).scalar()
+
+
+def test_account_erasure_deletes_every_store_in_batches(env):
+    db, store, uploads = env
+    runner = ErasureJobRunner(max_workers=1, batch_size=2, batch_pause_ms=0)
+    job_id = _queue(db, 1, "account")
+
+    runner._run(job_id)
+
+    job = _job(db, job_id)
+    assert job.stage == "completed" and job.error is None and job.attempts == 1
+    # 6 points in batches of at most 2, across both collection versions
+    assert job.points_deleted == 6 and store.batches == [2, 2, 1, 1]
+    assert store.collections["health_insights_v1"] == [(2, "Medication other")]
+    assert job.files_deleted == 1 and sorted(os.listdir(uploads)) == ["scan2.pdf"]
+    # 1 health record + 5 medications + 1 contact message + the user row
+    assert job.rows_deleted == 8
+    assert db.query(User.id).all() == [(2,)]
+    assert db.query(ContactMessage.email).all() == [("user2@example.com",)]
+    assert db.query(Medication).filter(Medication.user_id == 2).count() == 5
+    assert 1 in store.invalidated
+
+    # Finished jobs are not run again
+    runner._run(job_id)
+    assert _job(db, job_id).attempts == 1
+
+
+def test_vectors_scope_keeps_rows_and_files(env):
+    db, store, uploads = env
+    runner = ErasureJobRunner(max_workers=1, batch_size=500, batch_pause_ms=0)
+    job_id = _queue(db, 1, "vectors")
+
+    runner._run(job_id)
+
+    job = _job(db, job_id)
+    assert (job.stage, job.points_deleted, job.files_deleted, job.rows_deleted) == ("completed", 6, 0, 0)
+    assert db.query(Medication).filter(Medication.user_id == 1).count() == 5
+    assert "scan1.pdf" in os.listdir(uploads)
+
+
+def test_interrupted_job_resumes_from_its_stage(env):
+    db, store, uploads = env
+    runner = ErasureJobRunner(max_workers=1, batch_size=500, batch_pause_ms=0)
+    job_id = _queue(db, 1, "health_data", stage="records")
+
+    runner._run(job_id)
+
+    job = _job(db, job_id)
+    assert job.stage == "completed"
+    # Files were deleted before the interruption
+    assert "scan1.pdf" in os.listdir(uploads)
+    assert job.rows_deleted == 6 and job.points_deleted == 6
+    assert db.query(User).count() == 2
+
+
+def _import_job(db, job_id, stage, file_path=None):
+    db.add(HealthImportJob(id=job_id, user_id=1, filename="export.xml", file_path=file_path, stage=stage,
+                           records_processed=0, records_skipped=0, rows_written=0))
+    db.commit()
+
+
+def test_erasure_cancels_queued_imports_and_imports_refuse_to_start(env, monkeypatch):
+    db, store, uploads = env
+    export = uploads / "export.xml"
+    export.write_text("<HealthData/>")
+    _import_job(db, "queued-import", "queued", str(export))
+    _import_job(db, "late-import", "queued")
+    job_id = _queue(db, 1, "account")
+    assert erasure_pending(db, 1) and not erasure_pending(db, 2)
+
+    # A worker picking up an import while the erasure is pending drops it
+    imported = []
+    monkeypatch.setattr(import_jobs.dashboard_service, "import_health_file", lambda *args, **kwargs: imported.append(args))
+    import_jobs.ImportJobRunner(max_workers=1)._run("late-import")
+    assert imported == [] and _job_stage(db, "late-import") == "failed"
+
+    ErasureJobRunner(max_workers=1, batch_size=500, batch_pause_ms=0)._run(job_id)
+
+    assert _job(db, job_id).stage == "completed"
+    assert not export.exists()
+    assert not erasure_pending(db, 1)
+
+
+def test_erasure_waits_for_a_running_import(env):
+    db, store, uploads = env
+    _import_job(db, "running-import", "inserting")
+    runner = ErasureJobRunner(max_workers=1, batch_size=500, batch_pause_ms=0, import_wait_seconds=0.05)
+    runner.import_poll = 0.01
+    job_id = _queue(db, 1, "health_data")
+
+    runner._run(job_id)
+
+    job = _job(db, job_id)
+    assert job.stage == "failed" and "running-import" in job.error
+    # Nothing was deleted while the import could still write
+    assert job.rows_deleted == 0 and store.batches == []
+
+
+
+def test_writes_are_refused_while_an_erasure_is_pending(env):
+    db, store, uploads = env
+    app = FastAPI()
+    app.include_router(health_records_router, prefix="/api")
+    app.include_router(medications_router, prefix="/api")
+    app.include_router(appointments_router, prefix="/api/appointments")
+    app.dependency_overrides[get_current_user] = lambda: db.query(User).filter(User.id == 1).one()
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app, raise_server_exceptions=False)
+    record = {"record_type": "lab_report", "title": "Lipids", "description": "LDL 95", "record_date": "2025-09-01"}
+    medication = {"medication_name": "Aspirin", "dosage": "81mg", "frequency": "daily", "start_date": "2025-09-01"}
+    appointment = {"doctor_id": 1, "appointment_date": "2025-09-01", "start_time": "09:00:00", "end_time": "09:30:00"}
+
+    _queue(db, 1, "health_data")
+    assert client.post("/api/health-records", json=record).status_code == 409
+    assert client.post("/api/medications", json=medication).status_code == 409
+    # Appointments are only erased with the account
+    assert client.post("/api/appointments/book", json=appointment).status_code != 409
+
+    _queue(db, 1, "account")
+    assert client.post("/api/appointments/book", json=appointment).status_code == 409
+    assert db.query(HealthRecord).filter(HealthRecord.user_id == 1).count() == 1
+    assert db.query(Medication).filter(Medication.user_id == 1).count() == 5
+
+
+def test_submit_reuses_the_unfinished_job(env, monkeypatch):
+    db, store, uploads = env
+    runner = ErasureJobRunner(max_workers=1, batch_size=500, batch_pause_ms=0)
+    submitted = []
+    monkeypatch.setattr(runner.executor, "submit", lambda fn, job_id: submitted.append(job_id))
+
+    first = runner.submit(db, 1, "account")
+    again = runner.submit(db, 1, "account")
+    other = runner.submit(db, 1, "vectors")
+
+    assert first.id == again.id != other.id
+    assert submitted == [first.id, other.id]
+    assert runner.resume_pending() == 2
+
+
+def test_failed_stage_is_recorded(env):
+    db, store, uploads = env
+
+    def unavailable(*args):
+        raise RuntimeError("qdrant unavailable")
+
+    store.purge_user_batch = unavailable
+    runner = ErasureJobRunner(max_workers=1, batch_size=500, batch_pause_ms=0)
+    job_id = _queue(db, 1, "account")
+
+    runner._run(job_id)
+
+    job = _job(db, job_id)
+    assert job.stage == "failed" and job.error == "qdrant unavailable"
+    assert db.query(User).count() == 2
+
+
+def test_embedding_cache_forgets_erased_texts_under_every_model(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.put("model-a", "Medication 0", [1.0])
+    cache.put("model-b", "Medication 0", [2.0])
+    cache.put("model-a", "Medication other", [3.0])
+
+    cache.delete_many(["Medication 0"])
+
+    reopened = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"))
+    for current in (cache, reopened):
+        assert current.get("model-a", "Medication 0") is None
+        assert current.get("model-b", "Medication 0") is None
+        assert current.get("model-a", "Medication other") == [3.0]
@@ -0,0 +1,207 @@
+"""
+Tests for the bulk health-data ingestor.
+Runs against the in-memory SQLite `db` fixture from conftest.py.
+"""
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from app.modules.dashboard.models import SleepRecord, ActivityRecord, VitalRecord, VitalRollup
+from app.modules.dashboard.ingestion import HealthDataIngestor, raw_vitals_cutoff
+from app.services.health_parser import AppleHealthParser
+
+IST = pytz.FixedOffset(330)
+
+
+def _sleep(day):
+    end = IST.localize(datetime(2025, 9, day, 6, 30))
+    return {
+        'date': end.date(),
+        'sleep_start': end - timedelta(hours=7),
+        'sleep_end': end,
+        'total_duration': 420,
+        'deep_sleep': 60,
+        'core_sleep': 300,
+        'rem_sleep': 60
+    }
+
+
+def _activity(day, steps):
+    return {
+        'date': date(2025, 9, day),
+        'steps': steps,
+        'distance': steps,
+        'flights_climbed': 1,
+        'active_calories': 200,
+        'basal_calories': 1500
+    }
+
+
+def test_sleep_upsert_skips_existing_days(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+
+    assert ingestor.upsert_sleep_records([_sleep(1), _sleep(2)]) == 2
+    db.commit()
+    assert ingestor.upsert_sleep_records([_sleep(2), _sleep(3)]) == 1
+    db.commit()
+
+    assert db.query(SleepRecord).filter(SleepRecord.user_id == 1).count() == 3
+
+
+def test_activity_upsert_updates_existing_days(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+
+    assert ingestor.upsert_activity_records([_activity(1, 1000), _activity(2, 2000)]) == 2
+    db.commit()
+    assert ingestor.upsert_activity_records([_activity(2, 5000), _activity(3, 3000)]) == 1
+    db.commit()
+
+    steps = {a.date.day: a.steps for a in db.query(ActivityRecord).filter(ActivityRecord.user_id == 1)}
+    assert steps == {1: 1000, 2: 5000, 3: 3000}
+
+
+def test_reuploading_an_export_keeps_activity_totals(db, tmp_path):
+    # Flights stop on 2024-01-01 while steps go on, so their watermarks differ
+    path = tmp_path / "export.xml"
+    path.write_text("""<?xml version="1.0" encoding="UTF-8"?>
+<HealthData locale="en_IN">
+ <Record type="HKQuantityTypeIdentifierStepCount" startDate="2024-01-01 09:00:00 +0530" endDate="2024-01-01 09:30:00 +0530" value="5000"/>
+ <Record type="HKQuantityTypeIdentifierFlightsClimbed" startDate="2024-01-01 10:00:00 +0530" endDate="2024-01-01 10:05:00 +0530" value="4"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" startDate="2024-01-10 09:00:00 +0530" endDate="2024-01-10 09:30:00 +0530" value="7000"/>
+</HealthData>
+""", encoding="utf-8")
+    ingestor = HealthDataIngestor(db, user_id=1)
+
+    for _ in range(2):
+        parsed = AppleHealthParser(str(path)).parse_stream(since=ingestor.load_watermarks())
+        ingestor.upsert_activity_records(parsed['activity_records'])
+        ingestor.advance_watermarks(parsed['latest_start_dates'])
+        db.commit()
+
+    totals = {a.date.isoformat(): (a.steps, a.flights_climbed) for a in db.query(ActivityRecord).filter(ActivityRecord.user_id == 1)}
+    assert totals == {'2024-01-01': (5000, 4), '2024-01-10': (7000, 0)}
+
+
+def test_vitals_within_a_minute_of_stored_samples_are_skipped(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+    base = IST.localize(datetime(2025, 9, 27, 7, 0))
+
+    written = ingestor.insert_vital_records([{'recorded_at': base, 'heart_rate': 70}])
+    db.commit()
+    assert len(written) == 1
+
+    written = ingestor.insert_vital_records([
+        {'recorded_at': base + timedelta(seconds=30), 'heart_rate': 71},
+        {'recorded_at': base + timedelta(minutes=5), 'heart_rate': 90},
+        {'recorded_at': base - timedelta(minutes=3), 'oxygen_saturation': 98},
+    ])
+    db.commit()
+
+    assert [row.get('heart_rate') for row in written] == [90, None]
+    assert db.query(VitalRecord).filter(VitalRecord.user_id == 1).count() == 3
+
+
+def test_keys_are_scoped_per_user(db):
+    HealthDataIngestor(db, user_id=1).upsert_sleep_records([_sleep(1)])
+    db.commit()
+
+    assert HealthDataIngestor(db, user_id=2).upsert_sleep_records([_sleep(1)]) == 1
+
+
+def test_watermarks_only_move_forward(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+    step_type = 'HKQuantityTypeIdentifierStepCount'
+
+    ingestor.advance_watermarks({step_type: '2025-09-26 18:00:00 +0530'})
+    db.commit()
+    ingestor.advance_watermarks({
+        step_type: '2025-09-20 08:00:00 +0530',
+        'HKQuantityTypeIdentifierHeartRate': '2025-09-27 07:05:00 +0530'
+    })
+    db.commit()
+
+    assert ingestor.load_watermarks() == {
+        step_type: '2025-09-26 18:00:00 +0530',
+        'HKQuantityTypeIdentifierHeartRate': '2025-09-27 07:05:00 +0530'
+    }
+    assert HealthDataIngestor(db, user_id=2).load_watermarks() == {}
+
+
+def _rollups(db, user_id=1):
+    return {
+        (r.metric, r.granularity, r.bucket_start): (r.min_value, r.max_value, r.sum_value, r.sample_count)
+        for r in db.query(VitalRollup).filter(VitalRollup.user_id == user_id)
+    }
+
+
+def test_vital_rollups_merge_across_imports(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+    base = IST.localize(datetime(2025, 9, 27, 7, 10))
+
+    ingestor.update_vital_rollups(ingestor.insert_vital_records([
+        {'recorded_at': base, 'heart_rate': 70},
+        {'recorded_at': base + timedelta(minutes=20), 'heart_rate': 90, 'oxygen_saturation': 97},
+    ]))
+    db.commit()
+    ingestor.update_vital_rollups(ingestor.insert_vital_records([
+        {'recorded_at': base + timedelta(minutes=30), 'heart_rate': 60},
+        {'recorded_at': base + timedelta(hours=2), 'heart_rate': 100},
+    ]))
+    db.commit()
+
+    rollups = _rollups(db)
+    assert rollups[('heart_rate', 'hour', datetime(2025, 9, 27, 7))] == (60, 90, 220, 3)
+    assert rollups[('heart_rate', 'hour', datetime(2025, 9, 27, 9))] == (100, 100, 100, 1)
+    assert rollups[('heart_rate', 'day', datetime(2025, 9, 27))] == (60, 100, 320, 4)
+    assert rollups[('oxygen_saturation', 'day', datetime(2025, 9, 27))] == (97, 97, 97, 1)
+    assert len(rollups) == 5
+
+    # Rebuilding from the raw samples gives the same buckets
+    assert ingestor.rebuild_vital_rollups() == 5
+    db.commit()
+    assert _rollups(db) == rollups
+
+
+def test_prune_raw_vitals_keeps_rollups(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+    now = datetime.now(IST).replace(microsecond=0)
+    old = now - timedelta(days=40)
+
+    ingestor.update_vital_rollups(ingestor.insert_vital_records([
+        {'recorded_at': old, 'heart_rate': 65},
+        {'recorded_at': now, 'heart_rate': 75},
+    ]))
+    db.commit()
+
+    assert ingestor.prune_raw_vitals(keep_days=30) == 1
+    db.commit()
+    assert [v.heart_rate for v in db.query(VitalRecord).filter(VitalRecord.user_id == 1)] == [75]
+    old_day = ('heart_rate', 'day', old.replace(tzinfo=None, hour=0, minute=0, second=0))
+    assert old_day in _rollups(db)
+
+    # Re-importing the pruned sample neither stores it nor counts it twice
+    assert ingestor.insert_vital_records([{'recorded_at': old, 'heart_rate': 65}], not_before=raw_vitals_cutoff(30)) == []
+
+    # Rebuilding only touches days that still have raw samples
+    ingestor.rebuild_vital_rollups()
+    db.commit()
+    assert old_day in _rollups(db)
+
+
+def test_samples_outside_raw_retention_still_get_rollups(db):
+    ingestor = HealthDataIngestor(db, user_id=1)
+    now = datetime.now(IST).replace(microsecond=0)
+    samples = [{'recorded_at': now - timedelta(days=days), 'heart_rate': 60 + days % 50} for days in (1, 100, 200)]
+    cutoff = raw_vitals_cutoff(30)
+
+    for _ in range(2):
+        # The second pass is a full re-import of the same history
+        rollup_only = ingestor.unrolled_vitals_before(samples, cutoff)
+        ingestor.update_vital_rollups(ingestor.insert_vital_records(samples, not_before=cutoff) + rollup_only)
+        db.commit()
+
+    assert db.query(VitalRecord).filter(VitalRecord.user_id == 1).count() == 1
+    day_counts = {start.date(): count for (metric, granularity, start), (_, _, _, count) in _rollups(db).items()
+                  if granularity == 'day'}
+    assert day_counts == {s['recorded_at'].date(): 1 for s in samples}
+
@@ -0,0 +1,234 @@
+"""
+Tests for the Apple Health export parser.
+Checks that the streaming (iterparse) mode returns exactly what the
+in-memory ElementTree mode returns.
+"""
+import zipfile
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.health_parser import AppleHealthParser
+
+SAMPLE_EXPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Correlation|Workout)*)>
+<!ATTLIST HealthData locale CDATA #REQUIRED>
+]>
+<HealthData locale="en_IN">
+ <ExportDate value="2025-09-28 10:00:00 +0530"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1990-04-12" HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale" HKCharacteristicTypeIdentifierBloodType="HKBloodTypeOPositive"/>
+ <Record type="HKQuantityTypeIdentifierHeight" sourceName="iPhone" unit="cm" startDate="2025-01-01 09:00:00 +0530" endDate="2025-01-01 09:00:00 +0530" value="178"/>
+ <Record type="HKQuantityTypeIdentifierBodyMass" sourceName="iPhone" unit="kg" startDate="2025-09-20 08:00:00 +0530" endDate="2025-09-20 08:00:00 +0530" value="74.6"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="iPhone" unit="count" startDate="2025-09-26 08:00:00 +0530" endDate="2025-09-26 08:10:00 +0530" value="812">
+  <MetadataEntry key="HKWasUserEntered" value="0"/>
+ </Record>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="iPhone" unit="count" startDate="2025-09-26 18:00:00 +0530" endDate="2025-09-26 18:30:00 +0530" value="2301"/>
+ <Record type="HKQuantityTypeIdentifierDistanceWalkingRunning" sourceName="iPhone" unit="km" startDate="2025-09-26 18:00:00 +0530" endDate="2025-09-26 18:30:00 +0530" value="1.74"/>
+ <Record type="HKQuantityTypeIdentifierActiveEnergyBurned" sourceName="Watch" unit="kcal" startDate="2025-09-27 07:00:00 +0530" endDate="2025-09-27 07:30:00 +0530" value="143.2"/>
+ <Record type="HKQuantityTypeIdentifierBasalEnergyBurned" sourceName="Watch" unit="Cal" startDate="2025-09-27 07:00:00 +0530" endDate="2025-09-27 07:30:00 +0530" value="61"/>
+ <Record type="HKQuantityTypeIdentifierFlightsClimbed" sourceName="iPhone" unit="count" startDate="2025-09-27 09:00:00 +0530" endDate="2025-09-27 09:05:00 +0530" value="3"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" startDate="2025-09-26 23:10:00 +0530" endDate="2025-09-27 01:00:00 +0530" value="HKCategoryValueSleepAnalysisAsleepCore"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" startDate="2025-09-27 01:00:00 +0530" endDate="2025-09-27 02:30:00 +0530" value="HKCategoryValueSleepAnalysisAsleepDeep"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" startDate="2025-09-27 02:30:00 +0530" endDate="2025-09-27 03:15:00 +0530" value="HKCategoryValueSleepAnalysisAsleepREM"/>
+ <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" unit="count/min" startDate="2025-09-27 07:01:00 +0530" endDate="2025-09-27 07:01:00 +0530" value="72"/>
+ <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" unit="count/min" startDate="2025-09-27 07:05:00 -0400" endDate="2025-09-27 07:05:00 -0400" value="88.5"/>
+ <Record type="HKQuantityTypeIdentifierOxygenSaturation" sourceName="Watch" unit="%" startDate="2025-09-27 07:06:00 +0530" endDate="2025-09-27 07:06:00 +0530" value="97"/>
+ <Correlation type="HKCorrelationTypeIdentifierBloodPressure" startDate="2025-09-27 08:00:00 +0530" endDate="2025-09-27 08:00:00 +0530">
+  <Record type="HKQuantityTypeIdentifierHeartRate" unit="count/min" startDate="2025-09-27 08:00:00 +0530" endDate="2025-09-27 08:00:00 +0530" value="140"/>
+ </Correlation>
+ <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30" startDate="2025-09-26 18:00:00 +0530" endDate="2025-09-26 18:30:00 +0530"/>
+</HealthData>
+"""
+
+
+def _write_sample(tmp_path):
+    path = tmp_path / "export.xml"
+    path.write_text(SAMPLE_EXPORT, encoding="utf-8")
+    return str(path)
+
+
+def _write_sample_zip(tmp_path):
+    """Same layout as the iPhone's export.zip, including the CDA document next to export.xml"""
+    path = tmp_path / "export.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("apple_health_export/export_cda.xml", "<ClinicalDocument/>")
+        archive.writestr("apple_health_export/export.xml", SAMPLE_EXPORT)
+    return str(path)
+
+
+def test_parse_stream_matches_tree_mode(tmp_path):
+    path = _write_sample(tmp_path)
+
+    tree_parser = AppleHealthParser(path)
+    tree_parser.parse()
+    height, weight, weight_date = tree_parser.get_height_weight()
+
+    streamed = AppleHealthParser(path).parse_stream()
+
+    assert streamed['personal_info'] == tree_parser.get_personal_info()
+    assert (streamed['height'], streamed['weight'], streamed['weight_date']) == (height, weight, weight_date)
+    assert streamed['sleep_records'] == tree_parser.get_sleep_records()
+    assert streamed['activity_records'] == tree_parser.get_activity_records()
+    assert streamed['vital_records'] == tree_parser.get_vital_records()
+
+
+def test_parse_stream_extracts_expected_values(tmp_path):
+    streamed = AppleHealthParser(_write_sample(tmp_path)).parse_stream()
+
+    assert streamed['personal_info']['biological_sex'] == 'Male'
+    assert streamed['personal_info']['blood_type'] == 'OPositive'
+    assert (streamed['height'], streamed['weight']) == (178, 74)
+
+    sleep = streamed['sleep_records']
+    assert len(sleep) == 1
+    assert (sleep[0]['core_sleep'], sleep[0]['deep_sleep'], sleep[0]['rem_sleep']) == (110, 90, 45)
+    assert sleep[0]['total_duration'] == 245
+
+    activity = {a['date'].isoformat(): a for a in streamed['activity_records']}
+    assert activity['2025-09-26']['steps'] == 3113
+    assert activity['2025-09-26']['distance'] == 1740
+    assert activity['2025-09-27']['active_calories'] == 143
+
+    # Records nested in a Correlation are not top-level samples
+    assert [v.get('heart_rate') for v in streamed['vital_records'] if 'heart_rate' in v] == [72, 88]
+
+
+def test_iter_elements_only_yields_top_level_children(tmp_path):
+    parser = AppleHealthParser(_write_sample(tmp_path))
+    tags = [elem.tag for elem in parser.iter_elements()]
+
+    assert tags[:2] == ['ExportDate', 'Me']
+    assert tags.count('Record') == 14
+    assert tags[-2:] == ['Correlation', 'Workout']
+
+
+def test_parse_stream_reports_latest_start_date_per_type(tmp_path):
+    streamed = AppleHealthParser(_write_sample(tmp_path)).parse_stream()
+
+    latest = streamed['latest_start_dates']
+    assert latest['HKQuantityTypeIdentifierStepCount'] == '2025-09-26 18:00:00 +0530'
+    assert latest['HKCategoryTypeIdentifierSleepAnalysis'] == '2025-09-27 02:30:00 +0530'
+    assert streamed['skipped_records'] == 0
+
+
+def test_parse_stream_skips_records_before_watermark(tmp_path):
+    path = _write_sample(tmp_path)
+    since = {
+        # Two days of overlap: only records from 2025-09-20 onwards are kept
+        'HKQuantityTypeIdentifierHeight': '2025-09-22 09:00:00 +0530',
+        # Cutoff 2025-09-26 keeps every step record, so the day total is complete
+        'HKQuantityTypeIdentifierStepCount': '2025-09-28 07:00:00 +0530',
+        # Cutoff 2025-09-28 drops all heart rate samples
+        'HKQuantityTypeIdentifierHeartRate': '2025-09-30 07:00:00 +0530',
+    }
+
+    full = AppleHealthParser(path).parse_stream()
+    incremental = AppleHealthParser(path).parse_stream(since=since)
+
+    assert incremental['skipped_records'] == 3
+    assert incremental['height'] is None
+    assert incremental['weight'] == full['weight']
+    assert incremental['activity_records'] == full['activity_records']
+    assert incremental['sleep_records'] == full['sleep_records']
+    assert [v for v in incremental['vital_records'] if 'heart_rate' in v] == []
+    # Watermarks still advance from every record seen
+    assert incremental['latest_start_dates'] == full['latest_start_dates']
+
+
+def _write_synthetic_export(tmp_path, days=40):
+    """Export with several records per day, enough to be cut into chunks"""
+    lines = SAMPLE_EXPORT.splitlines()
+    body = []
+    for day in range(1, days + 1):
+        d = (date(2025, 7, 1) + timedelta(days=day)).isoformat()
+        body.append(f' <Record type="HKCategoryTypeIdentifierSleepAnalysis" startDate="{d} 00:30:00 +0530" endDate="{d} 03:00:00 +0530" value="HKCategoryValueSleepAnalysisAsleepCore"/>')
+        body.append(f' <Record type="HKCategoryTypeIdentifierSleepAnalysis" startDate="{d} 03:00:00 +0530" endDate="{d} 04:10:00 +0530" value="HKCategoryValueSleepAnalysisAsleepDeep"/>')
+        for hour in range(6, 22, 2):
+            body.append(f' <Record type="HKQuantityTypeIdentifierStepCount" unit="count" startDate="{d} {hour:02d}:00:00 +0530" endDate="{d} {hour:02d}:30:00 +0530" value="{100 + hour * day}"/>')
+            body.append(f' <Record type="HKQuantityTypeIdentifierHeartRate" unit="count/min" startDate="{d} {hour:02d}:05:00 +0530" endDate="{d} {hour:02d}:05:00 +0530" value="{60 + hour}"/>')
+        body.append(f' <Record type="HKQuantityTypeIdentifierBodyMass" unit="kg" startDate="{d} 08:00:00 +0530" endDate="{d} 08:00:00 +0530" value="{70 + day % 5}"/>')
+    closing = lines.index('</HealthData>')
+    path = tmp_path / "synthetic_export.xml"
+    path.write_text("\n".join(lines[:closing] + body + lines[closing:]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_parse_parallel_matches_tree_mode(tmp_path):
+    path = _write_synthetic_export(tmp_path)
+    parser = AppleHealthParser(path)
+    assert len(parser._chunk_ranges(4)) == 4
+
+    tree_parser = AppleHealthParser(path)
+    tree_parser.parse()
+    counts = []
+    parallel = parser.parse_parallel(workers=4, progress=counts.append)
+
+    assert parallel['personal_info'] == tree_parser.get_personal_info()
+    assert (parallel['height'], parallel['weight'], parallel['weight_date']) == tree_parser.get_height_weight()
+    assert parallel['sleep_records'] == tree_parser.get_sleep_records()
+    assert parallel['activity_records'] == tree_parser.get_activity_records()
+    assert parallel['vital_records'] == tree_parser.get_vital_records()
+    assert parallel == parser.parse_stream()
+    assert counts[-1] == sum(1 for elem in parser.iter_elements() if elem.tag == 'Record')
+
+
+def test_chunk_ranges_start_on_top_level_elements(tmp_path):
+    path = _write_synthetic_export(tmp_path)
+    ranges = AppleHealthParser(path)._chunk_ranges(6)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[ranges[-1][1]:].startswith(b'</HealthData>')
+    for (start, end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert end == next_start
+        assert data[next_start:next_start + 2] == b' <'
+
+
+def test_fast_datetime_parser_matches_strptime_path():
+    parser = AppleHealthParser("unused.xml")
+    samples = [
+        "2025-09-26 20:38:07 +0530",
+        "2025-09-26 20:38:07 -0400",
+        "2024-02-29 23:59:59 +0000",
+        "2025-01-01 00:00:00 -0930",
+        "2025-12-31 12:00:00 +1345",
+        "2025-09-26 20:38:07 UTC",
+        "2025-9-26 20:38:07 +0530",
+    ]
+    for date_str in samples:
+        fast = parser._parse_datetime(date_str)
+        slow = parser._parse_datetime_strptime(date_str)
+        assert fast == slow, date_str
+        assert fast.tzinfo == slow.tzinfo, date_str
+        assert fast.utcoffset() == slow.utcoffset(), date_str
+
+
+def test_fast_datetime_parser_rejects_invalid_dates_like_strptime(capsys):
+    parser = AppleHealthParser("unused.xml")
+
+    # Falls through to the strptime path, which logs and returns "now"
+    parser._parse_datetime("2025-02-30 10:00:00 +0530")
+    assert "Error parsing datetime 2025-02-30 10:00:00 +0530" in capsys.readouterr().out
+
+
+def test_zipped_export_parses_like_plain_xml(tmp_path):
+    plain = AppleHealthParser(_write_sample(tmp_path))
+    zipped = AppleHealthParser(_write_sample_zip(tmp_path))
+    assert zipped.is_zip and not plain.is_zip
+
+    assert zipped.parse_stream() == plain.parse_stream()
+    # Zipped exports cannot be split into byte ranges, so this runs in one pass
+    assert zipped.parse_parallel(workers=4) == plain.parse_stream()
+
+    zipped.parse()
+    assert zipped.get_vital_records() == plain.parse_stream()['vital_records']
+
+
+def test_zip_without_export_xml_is_rejected(tmp_path):
+    path = tmp_path / "photos.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("apple_health_export/export_cda.xml", "<ClinicalDocument/>")
+
+    with pytest.raises(ValueError):
+        AppleHealthParser(str(path)).parse_stream()
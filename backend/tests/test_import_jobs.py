@@ -0,0 +1,56 @@
+"""
+Tests for restart recovery of background health import jobs.
+Runs against a temporary SQLite file shared by the runner's sessions.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from app.core.database import Base
+from app.modules.dashboard import import_jobs
+from app.modules.dashboard.import_jobs import ImportJobRunner
+from app.modules.dashboard.models import HealthImportJob
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'imports.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(import_jobs, "SessionLocal", factory)
+    yield factory
+    engine.dispose()
+
+
+def test_interrupted_jobs_are_requeued_or_failed(session_factory, tmp_path, monkeypatch):
+    export = tmp_path / "export.xml"
+    export.write_text("<HealthData/>")
+    db = session_factory()
+    for job_id, stage, file_path in [
+        ("saved", "inserting", str(export)),
+        ("gone", "parsing", str(tmp_path / "missing.xml")),
+        ("done", "completed", None),
+    ]:
+        db.add(HealthImportJob(id=job_id, user_id=1, filename="export.xml", file_path=file_path, stage=stage,
+                               records_processed=10, records_skipped=0, rows_written=5))
+    db.commit()
+
+    runner = ImportJobRunner(max_workers=1)
+    submitted = []
+    monkeypatch.setattr(runner.executor, "submit", lambda fn, job_id: submitted.append(job_id))
+
+    assert runner.resume_pending() == 1
+
+    db.expire_all()
+    jobs = {job.id: job for job in db.query(HealthImportJob)}
+    assert submitted == ["saved"]
+    assert (jobs["saved"].stage, jobs["saved"].rows_written) == ("queued", 0)
+    assert jobs["gone"].stage == "failed" and "upload the export again" in jobs["gone"].error
+    assert jobs["gone"].finished_at is not None
+    assert jobs["done"].stage == "completed"
+    db.close()
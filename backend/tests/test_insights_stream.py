@@ -0,0 +1,77 @@
+"""
+Tests for the SSE insight endpoint: event framing, result validation and error events.
+"""
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("COHERE_API_KEY", "test")
+
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.security import get_current_user
+from app.modules.dashboard import insights_router
+from app.services.async_rag_service import RAGTimeoutError
+
+
+def _client(monkeypatch, events):
+    async def fake_stream(user_id, query, validate):
+        for event in events:
+            if isinstance(event, Exception):
+                raise event
+            name, data = event
+            yield name, validate(data) if name == "completion" else data
+
+    monkeypatch.setattr(insights_router.dashboard_service, "stream_insight", fake_stream)
+    app = FastAPI()
+    app.include_router(insights_router.router, prefix="/api/insights")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    return TestClient(app)
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_tokens_then_validated_result(monkeypatch):
+    client = _client(monkeypatch, [
+        ("retrieval", [{"data_type": "medication"}]),
+        ("token", '{"summary": "ok", '),
+        ("token", '"metrics": [{"label": "Steps", "value": 9000, "status": "Good"}]}'),
+        ("completion", '{"summary": "ok", "metrics": [{"label": "Steps", "value": 9000, "status": "Good"}]}'),
+    ])
+    response = client.post("/api/insights/query/stream", json={"query": "how am I doing"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [name for name, _ in events] == ["retrieval", "token", "token", "result"]
+    assert events[-1][1]["metrics"][0]["value"] == "9000"
+    assert events[-1][1]["recommendations"] == []
+
+
+def test_stream_reports_invalid_json_and_timeouts_as_error_events(monkeypatch):
+    client = _client(monkeypatch, [("token", "not json"), ("completion", "not json")])
+    events = _events(client.post("/api/insights/query/stream", json={"query": "q"}).text)
+    assert events[-1] == ("error", {"status": 502, "detail": "The insight response was not valid JSON"})
+
+    client = _client(monkeypatch, [("retrieval", []), RAGTimeoutError("generation", 60)])
+    events = _events(client.post("/api/insights/query/stream", json={"query": "q"}).text)
+    assert [name for name, _ in events] == ["retrieval", "error"]
+    assert events[-1][1]["status"] == 504
+
+
+def test_background_refresh_failure_is_logged_not_raised(monkeypatch):
+    def failing_refresh(user_id, db):
+        raise RuntimeError("qdrant unavailable")
+
+    monkeypatch.setattr(insights_router.dashboard_service, "process_refresh_embeddings", failing_refresh)
+    monkeypatch.setattr(insights_router, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+
+    insights_router.process_refresh_embeddings_task(1)
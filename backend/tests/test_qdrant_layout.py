@@ -0,0 +1,165 @@
+"""
+Tests for the Qdrant collection layout (payload indexes, tenant filtering, quantization).
+"""
+import copy
+import logging
+from types import SimpleNamespace
+
+from qdrant_client.http import models as qmodels
+
+from app.services.qdrant_layout import (
+    PAYLOAD_INDEXES, QUANTIZATION_OVERSAMPLING, SPARSE_VECTOR_NAME, TENANT_FIELD, dense_vector_params, ensure_payload_indexes, hnsw_config,
+    quantization_config, search_request, storage_updates, user_conditions
+)
+from app.services.rag_service import rag_service
+
+
+class RecordingClient:
+    """Stand-in for QdrantClient; local Qdrant ignores payload indexes"""
+
+    def __init__(self, existing=()):
+        self.schema = {name: None for name in existing}
+        self.created = {}
+
+    def get_collection(self, collection_name):
+        return SimpleNamespace(payload_schema=self.schema)
+
+    def create_payload_index(self, collection_name, field_name, field_schema, wait):
+        self.created[field_name] = field_schema
+        self.schema[field_name] = field_schema
+
+
+def test_missing_payload_indexes_are_created_once():
+    client = RecordingClient(existing=["user_id"])
+    ensure_payload_indexes(client, "health_insights")
+    assert set(client.created) == set(PAYLOAD_INDEXES) - {"user_id"}
+    assert client.created["record_id"] == qmodels.PayloadSchemaType.INTEGER
+
+    client.created.clear()
+    ensure_payload_indexes(client, "health_insights")
+    assert client.created == {}
+
+
+def test_multitenant_layout_uses_tenant_index_and_per_tenant_hnsw():
+    client = RecordingClient()
+    ensure_payload_indexes(client, "health_insights", multitenant=True)
+    assert client.created[TENANT_FIELD].is_tenant is True
+
+    assert hnsw_config(False) is None
+    assert hnsw_config(True).m == 0 and hnsw_config(True).payload_m > 0
+
+    assert user_conditions(7)[0].key == "user_id"
+    condition = user_conditions(7, multitenant=True)[0]
+    assert (condition.key, condition.match.value) == (TENANT_FIELD, "7")
+
+
+def test_quantization_settings_and_search_params():
+    assert quantization_config("none") is None
+    assert quantization_config("scalar").scalar.type == qmodels.ScalarType.INT8
+    assert quantization_config("binary").binary.always_ram is True
+    try:
+        quantization_config("pq")
+        assert False, "unknown mode should raise"
+    except ValueError:
+        pass
+
+    assert search_request("c", [0.1], user_conditions(1), 5)["search_params"] is None
+    params = search_request("c", [0.1], user_conditions(1), 5, quantization="binary")["search_params"]
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == QUANTIZATION_OVERSAMPLING["binary"]
+    hybrid = search_request("c", [0.1], user_conditions(1), 5, sparse=qmodels.SparseVector(indices=[1], values=[1.0]),
+                            quantization="scalar")
+    assert hybrid["prefetch"][0].params.quantization.oversampling == QUANTIZATION_OVERSAMPLING["scalar"]
+
+
+def test_storage_updates_only_lists_changed_settings():
+    def client(vectors, quantization=None):
+        config = SimpleNamespace(params=SimpleNamespace(vectors=vectors), quantization_config=quantization)
+        return SimpleNamespace(get_collection=lambda name: SimpleNamespace(config=config))
+
+    in_ram = client(dense_vector_params(8))
+    assert storage_updates(in_ram, "c", "none", False) == {}
+
+    updates = storage_updates(in_ram, "c", "scalar", True)
+    assert isinstance(updates["quantization_config"], qmodels.ScalarQuantization)
+    assert updates["vectors_config"][""].on_disk is True
+
+    quantized = client(dense_vector_params(8, on_disk=True), quantization_config("binary"))
+    assert storage_updates(quantized, "c", "binary", True) == {}
+    assert storage_updates(quantized, "c", "none", True) == {"quantization_config": qmodels.Disabled.DISABLED}
+
+
+class ServerCollection(RecordingClient):
+    """Qdrant server stand-in: a pre-alias collection built with the given HNSW m, plus any added later"""
+
+    def __init__(self, m, size):
+        super().__init__(existing=list(PAYLOAD_INDEXES))
+        self.size = size
+        self.configs = {}
+        self.alias = None
+        self.add("health_insights", m)
+
+    def add(self, collection_name, m, sparse=False):
+        self.configs[collection_name] = SimpleNamespace(
+            hnsw_config=SimpleNamespace(m=m), quantization_config=None,
+            params=SimpleNamespace(
+                vectors=dense_vector_params(self.size), sparse_vectors={SPARSE_VECTOR_NAME: None} if sparse else None
+            )
+        )
+
+    def get_collection(self, collection_name):
+        return SimpleNamespace(payload_schema=self.schema, config=self.configs[collection_name])
+
+    def get_aliases(self):
+        aliases = [SimpleNamespace(alias_name="health_insights", collection_name=self.alias)] if self.alias else []
+        return SimpleNamespace(aliases=aliases)
+
+    def get_collections(self):
+        return SimpleNamespace(collections=[SimpleNamespace(name=name) for name in self.configs])
+
+
+def _server_service():
+    service = copy.copy(rag_service)
+    service.qdrant_url = "http://qdrant:6333"
+    service.collection_name = "health_insights"
+    service.quantization, service.vectors_on_disk = "none", False
+    service.hybrid_search_enabled = True
+    return service
+
+
+def test_startup_keeps_the_layout_the_collection_was_built_with(caplog):
+    service = _server_service()
+
+    service.multitenant_enabled = True
+    service.qdrant = ServerCollection(m=16, size=service.vector_size)
+    with caplog.at_level(logging.WARNING):
+        service.initialize_collection()
+    assert service.multitenant is False
+    assert TENANT_FIELD not in service.qdrant.created
+    assert "built with multitenant=False" in caplog.text
+
+    service.multitenant_enabled = False
+    service.qdrant = ServerCollection(m=0, size=service.vector_size)
+    service.initialize_collection()
+    assert service.multitenant is True
+    assert service.qdrant.created[TENANT_FIELD].is_tenant is True
+
+
+def test_layout_is_reread_once_the_alias_moves():
+    service = _server_service()
+    service.multitenant_enabled = False
+    service.qdrant = ServerCollection(m=16, size=service.vector_size)
+    service.initialize_collection()
+    assert (service.hybrid, service.multitenant) == (False, False)
+
+    # A reindex in another process built a hybrid, multitenant collection and moved the alias
+    service.qdrant.add("health_insights_v2", m=0, sparse=True)
+    service.qdrant.alias = "health_insights_v2"
+    service.layout_check_seconds = 3600
+    assert service.check_layout() is False
+
+    service.layout_check_seconds = 0
+    assert service.check_layout() is True
+    assert (service.live_collection, service.hybrid, service.multitenant) == ("health_insights_v2", True, True)
+    assert service.check_layout() is False
+
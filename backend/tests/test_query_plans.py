@@ -0,0 +1,55 @@
+"""
+Query-plan regression tests for the per-user time-series tables.
+Asserts that SQLite answers the dashboard's per-user range queries from the
+composite (user_id, date/recorded_at) indexes instead of scanning the table.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from app.modules.dashboard import models
+
+
+def _plan(db, query) -> str:
+    compiled = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def _assert_uses_index(plan: str, index_name: str):
+    assert f"USING INDEX {index_name}" in plan or f"USING COVERING INDEX {index_name}" in plan, plan
+
+
+def test_sleep_and_activity_ranges_use_user_date_indexes(db):
+    month_ago = date.today() - timedelta(days=30)
+
+    _assert_uses_index(_plan(db, db.query(models.SleepRecord).filter(
+        models.SleepRecord.user_id == 1,
+        models.SleepRecord.date >= month_ago
+    )), "uq_sleep_records_user_date")
+    _assert_uses_index(_plan(db, db.query(models.ActivityRecord).filter(
+        models.ActivityRecord.user_id == 1,
+        models.ActivityRecord.date >= month_ago
+    )), "uq_activity_records_user_date")
+
+
+def test_vital_range_and_latest_sample_use_user_recorded_at_index(db):
+    _assert_uses_index(_plan(db, db.query(models.VitalRecord).filter(
+        models.VitalRecord.user_id == 1,
+        models.VitalRecord.recorded_at >= datetime(2025, 9, 1),
+        models.VitalRecord.recorded_at <= datetime(2025, 9, 30)
+    )), "ix_vital_records_user_recorded_at")
+
+    plan = _plan(db, db.query(models.VitalRecord).filter(
+        models.VitalRecord.user_id == 1,
+        models.VitalRecord.heart_rate.isnot(None)
+    ).order_by(models.VitalRecord.recorded_at.desc()).limit(1))
+    _assert_uses_index(plan, "ix_vital_records_user_recorded_at")
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_body_measurement_lookup_uses_user_measured_at_index(db):
+    _assert_uses_index(_plan(db, db.query(models.BodyMeasurement).filter(
+        models.BodyMeasurement.user_id == 1,
+        models.BodyMeasurement.measured_at == datetime(2025, 9, 20, 8)
+    )), "ix_body_measurements_user_measured_at")
@@ -0,0 +1,103 @@
+"""
+Tests for the incremental RAG sync engine.
+Uses a small in-memory stand-in for RAGService's point store.
+"""
+import hashlib
+import uuid
+from datetime import date
+
+from app.modules.dashboard.service import dashboard_service
+from app.modules.health_records import service as health_records_service
+from app.modules.health_records.schemas import HealthRecordCreate
+from app.services.rag_sync import RAGSource, fingerprint, sync_user_documents
+
+
+class InMemoryRAG:
+    def __init__(self):
+        self.points = {}
+        self.embedded = []
+
+    def point_id(self, user_id, data_type, content):
+        return hashlib.md5(f"{user_id}_{data_type}_{content}".encode()).hexdigest()
+
+    def indexed_points(self, user_id, data_types):
+        # Qdrant hands IDs back in canonical UUID form
+        return [
+            {"id": str(uuid.UUID(pid)), "source_key": p.get("source_key"), "source_fingerprint": p.get("source_fingerprint")}
+            for pid, p in self.points.items()
+            if p["user_id"] == user_id and p["data_type"] in data_types
+        ]
+
+    def upsert_many(self, user_id, items):
+        for item in items:
+            self.embedded.append(item["content"])
+            self.points[self.point_id(user_id, item["data_type"], item["content"])] = {
+                "user_id": user_id, "data_type": item["data_type"], "content": item["content"], **item["metadata"]
+            }
+        return len(items)
+
+    def delete_points(self, point_ids, user_id=None):
+        for point_id in point_ids:
+            self.points.pop(uuid.UUID(point_id).hex, None)
+
+
+def _medication(med_id, name, built):
+    content = f"Medication: {name}"
+
+    def build():
+        built.append(med_id)
+        return content
+    return RAGSource(f"medication:{med_id}", "medication", fingerprint(name), build, {"medication_id": med_id})
+
+
+def test_sync_only_rebuilds_changed_sources():
+    rag = InMemoryRAG()
+    built = []
+
+    counts = sync_user_documents(rag, 1, ["medication"], [_medication(1, "Aspirin", built), _medication(2, "Metformin", built)])
+    assert counts == {"unchanged": 0, "updated": 2, "deleted": 0}
+
+    built.clear()
+    rag.embedded.clear()
+    counts = sync_user_documents(rag, 1, ["medication"], [_medication(1, "Aspirin", built), _medication(2, "Metformin XR", built)])
+    assert counts == {"unchanged": 1, "updated": 1, "deleted": 0}
+    assert built == [2]
+    assert rag.embedded == ["Medication: Metformin XR"]
+    assert sorted(p["content"] for p in rag.points.values()) == ["Medication: Aspirin", "Medication: Metformin XR"]
+
+    counts = sync_user_documents(rag, 1, ["medication"], [_medication(2, "Metformin XR", built)])
+    assert counts == {"unchanged": 1, "updated": 0, "deleted": 1}
+    assert [p["content"] for p in rag.points.values()] == ["Medication: Metformin XR"]
+
+
+def test_sync_replaces_unkeyed_points_and_leaves_other_types_alone():
+    rag = InMemoryRAG()
+    built = []
+    # Written by a single-record upsert before it had a source_key
+    rag.upsert_many(1, [
+        {"data_type": "medication", "content": "Medication: Aspirin", "metadata": {"medication_id": 1}},
+        {"data_type": "sleep_records", "content": "Recent sleep records", "metadata": {}},
+    ])
+
+    counts = sync_user_documents(rag, 1, ["medication"], [_medication(1, "Aspirin", built)])
+
+    # Same content, same point ID: rewritten with its source_key, not deleted
+    assert counts == {"unchanged": 0, "updated": 1, "deleted": 0}
+    by_type = {p["data_type"]: p for p in rag.points.values()}
+    assert by_type["medication"]["source_key"] == "medication:1"
+    assert "sleep_records" in by_type
+
+
+def test_uploaded_health_record_is_left_alone_by_the_next_refresh(db, monkeypatch):
+    rag = InMemoryRAG()
+    monkeypatch.setattr(health_records_service, "rag_service", rag)
+    record = HealthRecordCreate(title="Lipid panel", record_type="lab_report", description="LDL 95", record_date=date(2025, 9, 1))
+
+    health_records_service.health_record_service.create_health_record(db, record, user_id=1)
+    rag.embedded.clear()
+
+    sources = [s for s in dashboard_service.rag_sources(1, db) if s.data_type == "health_record"]
+    counts = sync_user_documents(rag, 1, ["health_record"], sources)
+    assert counts == {"unchanged": 1, "updated": 0, "deleted": 0}
+    assert rag.embedded == []
+
@@ -0,0 +1,120 @@
+"""
+Tests for blue/green reindexing behind the collection alias.
+Alias updates run against in-memory Qdrant; points go to a stand-in store per collection.
+"""
+import hashlib
+import uuid
+from collections import defaultdict
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from app.services.qdrant_layout import alias_target, live_collection
+from app.services.rag_sync import RAGSource, fingerprint
+from app.services.reindex import Reindexer
+
+
+class CollectionRAG:
+    """RAGService stand-in: collection-level calls hit Qdrant, points live in self.stores[collection]"""
+
+    def __init__(self, qdrant, stores, collection_name="health_insights"):
+        self.qdrant = qdrant
+        self.stores = stores
+        self.collection_name = collection_name
+
+    def create_collection(self, collection_name):
+        self.qdrant.create_collection(collection_name, vectors_config=qmodels.VectorParams(size=2, distance=qmodels.Distance.COSINE))
+
+    def for_collection(self, collection_name):
+        return CollectionRAG(self.qdrant, self.stores, collection_name)
+
+    def point_id(self, user_id, data_type, content):
+        return hashlib.md5(f"{user_id}_{data_type}_{content}".encode()).hexdigest()
+
+    def indexed_points(self, user_id, data_types):
+        return [
+            {"id": str(uuid.UUID(pid)), "source_key": p["source_key"], "source_fingerprint": p["source_fingerprint"]}
+            for pid, p in self.stores[self.collection_name].items() if p["user_id"] == user_id
+        ]
+
+    def upsert_many(self, user_id, items):
+        if user_id == 13:
+            raise RuntimeError("embeddings unavailable")
+        for item in items:
+            self.stores[self.collection_name][self.point_id(user_id, item["data_type"], item["content"])] = {
+                "user_id": user_id, "content": item["content"], **item["metadata"]
+            }
+        return len(items)
+
+    def delete_points(self, point_ids, user_id=None):
+        for point_id in point_ids:
+            self.stores[self.collection_name].pop(uuid.UUID(point_id).hex, None)
+
+
+class Rows:
+    """Medication rows per user; the session factory only needs close()"""
+
+    def __init__(self):
+        self.medications = {1: ["Aspirin"], 2: ["Metformin", "Lisinopril"]}
+
+    def session(self):
+        return self
+
+    def close(self):
+        pass
+
+    def sources(self, user_id, db):
+        return [
+            RAGSource(f"medication:{name}", "medication", fingerprint(name), lambda name=name: f"Medication: {name}")
+            for name in self.medications.get(user_id, [])
+        ]
+
+
+def _contents(rag, collection):
+    return sorted(p["content"] for p in rag.stores[collection].values())
+
+
+def test_reindex_replaces_a_pre_alias_collection_and_catches_up_writes():
+    qdrant = QdrantClient(location=":memory:")
+    rag = CollectionRAG(qdrant, defaultdict(dict))
+    # Collection created under the alias name before aliases were used
+    rag.create_collection("health_insights")
+    rows = Rows()
+    passes = []
+
+    def list_user_ids():
+        passes.append(len(passes))
+        if len(passes) == 2:
+            # Written through the alias while the new collection was being built
+            rows.medications[3] = ["Omeprazole"]
+        return sorted(rows.medications)
+
+    progress = []
+    summary = Reindexer(rag, rows.session, rows.sources, ["medication"], concurrency=2, on_progress=progress.append).run(list_user_ids)
+
+    target = summary["collection"]
+    assert summary["switched"] and summary["previous"] is None
+    assert alias_target(qdrant, "health_insights") == target
+    assert live_collection(qdrant, "health_insights") == target
+    assert "health_insights" not in {c.name for c in qdrant.get_collections().collections}
+    assert summary["build"]["documents"] == 3 and summary["catch_up"]["documents"] == 1
+    assert _contents(rag, target) == ["Medication: Aspirin", "Medication: Lisinopril", "Medication: Metformin", "Medication: Omeprazole"]
+    assert progress[-1]["stage"] == "catch_up" and progress[-1]["done"] == progress[-1]["total"] == 3
+
+
+def test_failed_build_leaves_the_alias_alone():
+    qdrant = QdrantClient(location=":memory:")
+    rag = CollectionRAG(qdrant, defaultdict(dict))
+    rag.create_collection("health_insights_v1")
+    qdrant.update_collection_aliases(change_aliases_operations=[qmodels.CreateAliasOperation(
+        create_alias=qmodels.CreateAlias(collection_name="health_insights_v1", alias_name="health_insights")
+    )])
+    rows = Rows()
+    rows.medications[13] = ["Aspirin"]
+
+    summary = Reindexer(rag, rows.session, rows.sources, ["medication"]).run(lambda: sorted(rows.medications))
+
+    assert not summary["switched"] and summary["build"]["failed"] == 1
+    assert alias_target(qdrant, "health_insights") == "health_insights_v1"
+    # The half-built collection is kept for inspection
+    assert qdrant.collection_exists(summary["collection"])
@@ -0,0 +1,52 @@
+"""
+Tests for the rerank skip policy and result cache.
+"""
+
+from app.services.rerank_policy import RerankPolicy
+
+
+def _docs(*scores):
+    return [{"id": str(i), "content": f"doc {i}", "score": score} for i, score in enumerate(scores)]
+
+
+def test_few_candidates_and_decisive_margin_skip_the_reranker():
+    policy = RerankPolicy(score_margin=0.15)
+
+    docs = _docs(0.9, 0.8, 0.7)
+    assert policy.local_result("q", docs, top_n=5) == docs
+
+    # The 2nd and 3rd best are far apart: the kept pair is already decided
+    docs = _docs(0.5, 0.9, 0.3, 0.85)
+    assert [doc["id"] for doc in policy.local_result("q", docs, top_n=2)] == ["1", "3"]
+
+    # Close scores need the reranker
+    assert policy.local_result("q", _docs(0.9, 0.85, 0.8), top_n=2) is None
+
+    stats = policy.stats()
+    assert (stats["skipped_few_candidates"], stats["skipped_score_margin"], stats["total"]) == (1, 1, 2)
+
+
+def test_fused_scores_are_not_held_to_the_cosine_margin():
+    # RRF scores: found by both dense and sparse lists at rank 5, by one list at rank 0, by one at rank 6
+    docs = _docs(2 / 7, 1 / 2, 1 / 8)
+    assert [doc["id"] for doc in RerankPolicy(score_margin=0.15).local_result("q", docs, top_n=2)] == ["1", "0"]
+
+    assert RerankPolicy(score_margin=0.15).local_result("q", docs, top_n=2, fused=True) is None
+    policy = RerankPolicy(score_margin=0.15, fused_score_margin=0.1)
+    assert [doc["id"] for doc in policy.local_result("q", docs, top_n=2, fused=True)] == ["1", "0"]
+
+
+def test_remote_rerank_is_cached_per_query_and_candidate_set():
+    policy = RerankPolicy(score_margin=0.15)
+    docs = _docs(0.9, 0.85, 0.8)
+    reranked = [dict(docs[2], rerank_score=0.99), dict(docs[0], rerank_score=0.6)]
+    policy.store("how is my sleep", docs, 2, reranked)
+
+    # Same candidates in another order
+    hit = policy.local_result("how is my sleep", list(reversed(_docs(0.9, 0.85, 0.8))), top_n=2)
+    assert [(doc["id"], doc["rerank_score"]) for doc in hit] == [("2", 0.99), ("0", 0.6)]
+
+    assert policy.local_result("how is my heart", docs, top_n=2) is None
+    assert policy.local_result("how is my sleep", _docs(0.9, 0.85, 0.8, 0.79), top_n=2) is None
+    stats = policy.stats()
+    assert (stats["remote"], stats["cache_hit"]) == (1, 1)
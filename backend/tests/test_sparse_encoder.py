@@ -0,0 +1,55 @@
+"""
+Tests for the local BM25-style sparse encoder and hybrid (RRF) search.
+"""
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from app.services.qdrant_layout import SPARSE_VECTOR_NAME, has_sparse_vectors, search_request, sparse_vectors_config, user_conditions
+from app.services.sparse_encoder import SparseEncoder, term_id, tokenize
+
+
+def test_tokenize_keeps_exact_terms_and_splits_units():
+    assert tokenize("What was my HbA1c? Metformin 500mg, LDL 6.5") == [
+        "hba1c", "hba", "1", "c", "metformin", "500mg", "500", "mg", "ldl", "6.5"
+    ]
+
+
+def test_document_weights_saturate_with_term_frequency():
+    encoder = SparseEncoder()
+    vector = encoder.encode_document("metformin metformin metformin aspirin")
+    weights = dict(zip(vector.indices, vector.values))
+    assert weights[term_id("metformin")] > weights[term_id("aspirin")]
+    assert weights[term_id("metformin")] < 3 * weights[term_id("aspirin")]
+
+    query = encoder.encode_query("metformin metformin dosage")
+    assert sorted(query.values) == [1.0, 1.0]
+
+
+def test_hybrid_search_finds_exact_terms_the_dense_vectors_miss():
+    client = QdrantClient(location=":memory:")
+    client.create_collection(
+        "health_insights",
+        vectors_config=qmodels.VectorParams(size=2, distance=qmodels.Distance.COSINE),
+        sparse_vectors_config=sparse_vectors_config()
+    )
+    assert has_sparse_vectors(client, "health_insights")
+
+    encoder = SparseEncoder()
+    docs = ["Sleep Summary: 400 mins", "Activity Summary: 8000 steps", "Lab report: HbA1c 6.8 %"]
+    # Dense vectors rank the lab report last for the query below
+    dense = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]]
+    client.upsert("health_insights", points=[
+        qmodels.PointStruct(id=i, vector={"": dense[i], SPARSE_VECTOR_NAME: encoder.encode_document(doc)},
+                            payload={"user_id": 1, "content": doc})
+        for i, doc in enumerate(docs)
+    ])
+
+    conditions = user_conditions(1)
+    dense_only = client.query_points(**search_request("health_insights", [1.0, 0.0], conditions, 2)).points
+    assert 2 not in [p.id for p in dense_only]
+
+    hybrid = client.query_points(**search_request(
+        "health_insights", [1.0, 0.0], conditions, 2, sparse=encoder.encode_query("what was my HbA1c")
+    )).points
+    assert 2 in [p.id for p in hybrid]
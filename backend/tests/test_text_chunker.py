@@ -0,0 +1,64 @@
+"""
+Tests for token-window chunking of health-record text.
+A word-level encoding stands in for tiktoken so window boundaries are easy to read.
+"""
+
+import pytest
+
+from app.services.text_chunker import TextChunker
+
+
+class WordEncoding:
+    def encode(self, text, disallowed_special="all"):
+        # Like tiktoken, refuses special-token strings unless told they are plain text
+        if disallowed_special == "all" and "<|endoftext|>" in text:
+            raise ValueError("special token in text")
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def _words(n):
+    return " ".join(f"w{i}" for i in range(n))
+
+
+def test_split_makes_overlapping_windows_covering_the_text():
+    chunker = TextChunker(chunk_tokens=10, overlap_tokens=3, encoding=WordEncoding())
+
+    chunks = chunker.split(_words(25))
+
+    assert chunks == [
+        "w0 w1 w2 w3 w4 w5 w6 w7 w8 w9",
+        "w7 w8 w9 w10 w11 w12 w13 w14 w15 w16",
+        "w14 w15 w16 w17 w18 w19 w20 w21 w22 w23",
+        "w21 w22 w23 w24",
+    ]
+    assert chunker.split(_words(10)) == [_words(10)]
+    assert chunker.split("   ") == []
+
+
+def test_chunk_document_prefixes_every_chunk_with_the_header():
+    chunker = TextChunker(chunk_tokens=10, overlap_tokens=2, encoding=WordEncoding())
+    header = "Health Record: Lipid panel (lab_report), Date: 2025-09-01"
+
+    assert chunker.chunk_document(header, None) == [header]
+    assert chunker.chunk_document(header, "LDL 95") == [f"{header}\n\nExtracted File Content:\nLDL 95"]
+
+    chunks = chunker.chunk_document(header, _words(20))
+    assert len(chunks) == 3
+    assert all(chunk.startswith(header) for chunk in chunks)
+    assert "(part 2/3)" in chunks[1]
+
+
+def test_special_token_strings_are_plain_text():
+    chunker = TextChunker(chunk_tokens=10, overlap_tokens=2, encoding=WordEncoding())
+    text = "notes copied from a chat log <|endoftext|> end"
+
+    assert chunker.split(text) == [text]
+    assert chunker.count_tokens(text) == 8
+
+
+def test_overlap_must_be_smaller_than_window():
+    with pytest.raises(ValueError):
+        TextChunker(chunk_tokens=10, overlap_tokens=10)
@@ -65,12 +65,26 @@ const HealthDashboard = () => {
         }
     };
 
+    const pollImportJob = async (jobId) => {
+        while (true) {
+            const { data: job } = await axios.get(
+                `http://localhost:8000/api/health/imports/${jobId}`,
+                config
+            );
+            if (job.stage === 'completed' || job.stage === 'failed') {
+                return job;
+            }
+            setUploadStatus(`Importing health data (${job.stage})... ${job.records_processed.toLocaleString()} records processed`);
+            await new Promise((resolve) => setTimeout(resolve, 2000));
+        }
+    };
+
     const handleFileUpload = async (event) => {
         const file = event.target.files[0];
         if (!file) return;
 
-        if (!file.name.endsWith('.xml')) {
-            setError('Please upload an XML file from Apple Health export.');
+        if (!/\.(xml|zip)$/i.test(file.name)) {
+            setError('Please upload export.zip or export.xml from Apple Health export.');
             return;
         }
 
@@ -93,7 +107,13 @@ const HealthDashboard = () => {
                 }
             );
 
-            setUploadStatus(`Success! Imported ${response.data.summary.sleep_records} sleep records, ${response.data.summary.activity_records} activity records, and ${response.data.summary.vital_records} vital records.`);
+            // The import runs in the background; poll the job until it finishes
+            const job = await pollImportJob(response.data.job_id);
+            if (job.stage === 'failed') {
+                throw new Error(job.error);
+            }
+
+            setUploadStatus(`Success! Imported ${job.summary.sleep_records} sleep records, ${job.summary.activity_records} activity records, and ${job.summary.vital_records} vital records.`);
 
             setTimeout(() => {
                 fetchDashboardData();
@@ -361,13 +381,13 @@ const HealthDashboard = () => {
                                         <path strokeLinecap="round" strokeLinejoin="round" strokeWidth="2" d="M7 16a4 4 0 01-.88-7.903A5 5 0 1115.9 6L16 6a5 5 0 011 9.9M15 13l-3-3m0 0l-3 3m3-3v12" />
                                     </svg>
                                     <p className="text-xs text-gray-500 dark:text-gray-400">
-                                        <span className="font-semibold">Click to upload</span> Apple Health XML
+                                        <span className="font-semibold">Click to upload</span> Apple Health export (ZIP or XML)
                                     </p>
                                 </div>
                                 <input
                                     type="file"
                                     className="hidden"
-                                    accept=".xml"
+                                    accept=".xml,.zip"
                                     onChange={handleFileUpload}
                                     disabled={uploading}
                                 />
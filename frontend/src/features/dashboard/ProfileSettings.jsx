@@ -124,10 +124,10 @@ const ProfileSettings = () => {
         const files = event.target.files;
         if (!files || files.length === 0) return;
 
-        // Validate all files are XML
+        // Validate all files are XML or the zipped export
         for (let file of files) {
-            if (!file.name.endsWith('.xml')) {
-                setError('Please upload only XML files from Apple Health export.');
+            if (!/\.(xml|zip)$/i.test(file.name)) {
+                setError('Please upload only export.zip or XML files from Apple Health export.');
                 return;
             }
         }
@@ -169,7 +169,7 @@ const ProfileSettings = () => {
         setUploadProgress('');
 
         if (successCount > 0 && failCount === 0) {
-            setSuccess(`Successfully uploaded ${successCount} file(s)! Your health data has been imported.`);
+            setSuccess(`Successfully uploaded ${successCount} file(s)! Your health data is being imported in the background.`);
         } else if (successCount > 0 && failCount > 0) {
             setSuccess(`Uploaded ${successCount} file(s). ${failCount} file(s) failed.`);
         } else {
@@ -470,7 +470,7 @@ const ProfileSettings = () => {
                                         <li>Open the Health app on your iPhone</li>
                                         <li>Tap your profile picture in the top right</li>
                                         <li>Scroll down and tap "Export All Health Data"</li>
-                                        <li>Save the export and upload the XML file(s) here</li>
+                                        <li>Save the export and upload export.zip (or the XML file(s) inside it) here</li>
                                     </ol>
                                 </div>
                             </div>
@@ -479,7 +479,7 @@ const ProfileSettings = () => {
                                 <input
                                     type="file"
                                     id="health-data-upload"
-                                    accept=".xml"
+                                    accept=".xml,.zip"
                                     multiple
                                     onChange={handleHealthDataUpload}
                                     disabled={uploading}
@@ -496,7 +496,7 @@ const ProfileSettings = () => {
                                         {uploading ? 'Uploading...' : 'Click to upload or drag and drop'}
                                     </p>
                                     <p className="text-sm text-gray-500">
-                                        Apple Health XML files (you can select multiple files)
+                                        Apple Health export.zip or XML files (you can select multiple files)
                                     </p>
                                 </label>
                             </div>